@@ -0,0 +1,112 @@
+#bench_chat_transcript.py
+# A long chat session in the transcript: the old QScrollArea with one QPlainTextEdit (plus highlighter) per
+# message vs. the model/view ChatDisplay. Reports time to append the session, time to scroll through it and
+# how many widgets are alive at the end. Runs offscreen unless QT_QPA_PLATFORM says otherwise.
+#   python -m DEV.benchmarks.bench_chat_transcript [--messages 2000] [--code-every 10]
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QCoreApplication, QEvent
+from PyQt6.QtWidgets import (QApplication, QFrame, QLabel, QPlainTextEdit, QPushButton, QScrollArea,
+                             QVBoxLayout, QWidget)
+
+from GUX.chat_transcript import ChatDisplay, CodeBlockHighlighter
+
+WORDS = ["the", "vault", "index", "token", "merge", "editor", "```", "def", "return", "context", "model"]
+
+
+class LegacyChatDisplay(QScrollArea):
+    # What ai_chat.ChatDisplay and MessageWidget were
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.widget = QWidget()
+        self.layout = QVBoxLayout(self.widget)
+        self.setWidget(self.widget)
+        self.setWidgetResizable(True)
+
+    def add_message(self, message, is_user=False):
+        frame = QFrame()
+        frame.setFrameStyle(QFrame.Shape.StyledPanel | QFrame.Shadow.Raised)
+        layout = QVBoxLayout(frame)
+        content = QPlainTextEdit(f"{'You: ' if is_user else 'AI: '}{message}")
+        content.setReadOnly(True)
+        content.setFrameStyle(QFrame.Shape.NoFrame)
+        if not is_user:
+            CodeBlockHighlighter(content.document())
+        layout.addWidget(content)
+        self.layout.addWidget(frame)
+        self.scroll_to_bottom()
+
+    def add_widget_factory(self, factory):
+        self.layout.addWidget(factory())
+        self.scroll_to_bottom()
+
+    def scroll_to_bottom(self):
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+
+def code_block():
+    widget = QWidget()
+    layout = QVBoxLayout(widget)
+    layout.addWidget(QLabel("File: module.py"))
+    code = QPlainTextEdit("def main():\n    return 0\n")
+    code.setReadOnly(True)
+    layout.addWidget(code)
+    layout.addWidget(QPushButton("Apply Changes"))
+    return widget
+
+
+def run(label, display_class, app, messages, code_every):
+    rng = random.Random(17)
+    display = display_class()
+    display.resize(700, 800)
+    display.show()
+    app.processEvents()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    widgets_before = len(QApplication.allWidgets())
+
+    start = time.perf_counter()
+    for i in range(messages):
+        display.add_message(" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 120))), is_user=i % 2 == 0)
+        if code_every and i % code_every == code_every - 1:
+            display.add_widget_factory(code_block)
+        # One event loop pass per turn, as when a reply arrives
+        if i % 2:
+            app.processEvents()
+    app.processEvents()
+    append = time.perf_counter() - start
+
+    scroll_bar = display.verticalScrollBar()
+    start = time.perf_counter()
+    for step in range(100):
+        scroll_bar.setValue(scroll_bar.maximum() * step // 99)
+        display.viewport().repaint()
+        app.processEvents()
+    scroll = time.perf_counter() - start
+
+    # Widgets dropped off screen are deleteLater'd; a nested processEvents never gets to them
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    widgets = len(QApplication.allWidgets()) - widgets_before
+    print(f"{label:>8}: append {append:7.2f} s   scroll 100 steps {scroll * 1000:8.1f} ms   "
+          f"{widgets} live widgets")
+    display.close()
+    display.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--code-every', type=int, default=10)
+    args = parser.parse_args()
+    app = QApplication.instance() or QApplication([])
+    run("legacy", LegacyChatDisplay, app, args.messages, args.code_every)
+    run("model", ChatDisplay, app, args.messages, args.code_every)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#bench_context_manager.py
+# Adding 50 file contexts to ContextManager: cached counts and a running total vs. re-tokenizing every
+# stored context on every prune step, as prune_contexts/get_total_tokens used to.
+#   python -m DEV.benchmarks.bench_context_manager [--files 50] [--file-kb 16] [--max-tokens 32000]
+import argparse
+import logging
+import random
+import time
+
+from HMC.context_manager import ContextManager
+
+
+class MemoryManagerStub:
+    # ContextManager only appends to and pops from code_memory here
+    def __init__(self):
+        self.code_memory = []
+
+    def add_memory(self, description, content, memory_type='code'):
+        self.code_memory.append((description, content))
+
+    def clear_memory(self, memory_type=None):
+        self.code_memory = []
+
+
+class CCCoreStub:
+    def __init__(self):
+        self.model_manager = type('ModelManagerStub', (), {'memory_manager': MemoryManagerStub()})()
+
+
+class LegacyContextManager(ContextManager):
+    # The accounting as it was: every total re-tokenizes every context
+    def add_context(self, content, description, file_path=None, memory_type='code'):
+        tokens = self.tokenize(content)
+        if len(tokens) > self.max_tokens:
+            content = self.detokenize(tokens[:self.max_tokens])
+        self.memory_manager.add_memory(description, content, memory_type)
+        self.contexts.append((description, content))
+        self.prune_contexts()
+
+    def prune_contexts(self):
+        while self.get_total_tokens() > self.max_tokens:
+            self.contexts.popleft()
+            if self.contexts:
+                self.memory_manager.code_memory.pop(0)
+
+    def get_total_tokens(self):
+        return sum(len(self.tokenize(content)) for _, content in self.contexts)
+
+    def get_context_sizes_in_tokens(self):
+        return [len(self.tokenize(content)) for _, content in self.contexts]
+
+
+def make_files(count, size_kb, seed=5):
+    rng = random.Random(seed)
+    words = ["def", "class", "return", "self", "import", "value", "index", "token", "context", "(", ")", ":"]
+    files = []
+    for i in range(count):
+        lines = []
+        size = 0
+        while size < size_kb * 1024:
+            line = "    " + " ".join(rng.choice(words) for _ in range(rng.randint(3, 12)))
+            lines.append(line)
+            size += len(line) + 1
+        files.append((f"module_{i}.py", "\n".join(lines)))
+    return files
+
+
+def run(label, manager_class, files, max_tokens):
+    manager = manager_class(CCCoreStub(), max_tokens=max_tokens)
+    manager.tokenize("warm up")
+    start = time.perf_counter()
+    for name, content in files:
+        manager.add_context(content, f"File: {name}")
+        manager.get_context_sizes_in_tokens()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>8}: {elapsed * 1000:9.1f} ms  ({len(manager.contexts)} contexts kept, "
+          f"{manager.get_total_tokens()} tokens)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--file-kb', type=int, default=16)
+    parser.add_argument('--max-tokens', type=int, default=32000)
+    args = parser.parse_args()
+    # add_context logs every context's full content, which would swamp what is being measured
+    logging.disable(logging.WARNING)
+    files = make_files(args.files, args.file_kb)
+    run("legacy", LegacyContextManager, files, args.max_tokens)
+    run("cached", ContextManager, files, args.max_tokens)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#bench_diff_engine.py
+# Line diff of a generated source file against an edited copy: difflib.ndiff (what the merge tools used) vs.
+# the diff_engine algorithms, with and without intraline hints. Two kinds of edit: scattered small ones,
+# and a contiguous stretch where every line changed (a reformat or rename; ndiff pairs up its lines in
+# quadratic time). Reports time and how many lines each marks as changed (fewer is a tighter diff; myers is
+# minimal). Every result is checked to rebuild both inputs. difflib and plain myers (whose time grows with
+# lines x changed lines) are skipped above their --*-max-lines.
+#   python -m DEV.benchmarks.bench_diff_engine [--sizes 10000 100000] [--changes 0.2] [--rewrite 1000]
+#                                              [--difflib-max-lines 10000] [--myers-max-lines 10000]
+import argparse
+import difflib
+import random
+import time
+
+from NITTY_GRITTY import diff_engine
+
+NAMES = ["index", "token", "vault", "merge", "cache", "editor", "model", "chunk", "block", "session"]
+COMMON_LINES = ["", "", "    return None", "        pass", "    else:", "        continue", "    try:",
+                "    except Exception as e:", "        logging.error(str(e))"]
+
+
+def make_source(lines, rng):
+    source = []
+    while len(source) < lines:
+        name = f"{rng.choice(NAMES)}_{rng.choice(NAMES)}_{len(source)}"
+        source.append(f"def {name}(self, {rng.choice(NAMES)}):")
+        for _ in range(rng.randint(3, 15)):
+            if rng.random() < 0.35:
+                source.append(rng.choice(COMMON_LINES))
+            else:
+                source.append(f"    {rng.choice(NAMES)} = self.{rng.choice(NAMES)}({rng.randrange(1000)})")
+    return [line + "\n" for line in source[:lines]]
+
+
+def edit_source(source, fraction, rng):
+    edited = list(source)
+    for _ in range(int(len(source) * fraction)):
+        position = rng.randrange(len(edited))
+        roll = rng.random()
+        if roll < 0.5:
+            # Small in-line edit, the case ndiff spends its time on
+            line = edited[position].rstrip("\n")
+            edited[position] = line[:len(line) // 2] + rng.choice(NAMES) + line[len(line) // 2:] + "\n"
+        elif roll < 0.7:
+            edited.insert(position, f"    {rng.choice(NAMES)}.{rng.choice(NAMES)}()\n")
+        elif roll < 0.9:
+            del edited[position]
+        else:
+            # Move a small block elsewhere
+            block = edited[position:position + 5]
+            del edited[position:position + 5]
+            target = rng.randrange(len(edited) + 1)
+            edited[target:target] = block
+    return edited
+
+
+def rewrite_source(source, lines, rng):
+    edited = list(source)
+    start = rng.randrange(max(1, len(source) - lines))
+    for position in range(start, min(len(source), start + lines)):
+        edited[position] = edited[position].rstrip("\n") + "  # reviewed\n"
+    return edited
+
+
+def check(diff, a, b):
+    assert [line[2:] for line in diff if line[:1] in (" ", "-")] == a
+    assert [line[2:] for line in diff if line[:1] in (" ", "+")] == b
+
+
+def run(label, diff_function, a, b):
+    start = time.perf_counter()
+    diff = diff_function(a, b)
+    elapsed = time.perf_counter() - start
+    check(diff, a, b)
+    changed = sum(1 for line in diff if line[:1] in ("-", "+"))
+    print(f"  {label:<22} {elapsed * 1000:10.1f} ms   {changed:7d} changed lines")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--changes', type=float, default=0.2, help="edits per line of input")
+    parser.add_argument('--rewrite', type=int, default=1000, help="length of the rewritten stretch")
+    parser.add_argument('--difflib-max-lines', type=int, default=10000)
+    parser.add_argument('--myers-max-lines', type=int, default=10000)
+    args = parser.parse_args()
+    rng = random.Random(21)
+
+    for size in args.sizes:
+        a = make_source(size, rng)
+        for scenario, b in ((f"{int(size * args.changes)} scattered edits", edit_source(a, args.changes, rng)),
+                            (f"{args.rewrite} rewritten lines", rewrite_source(a, args.rewrite, rng))):
+            print(f"{size} lines, {scenario}:")
+            if size <= args.difflib_max_lines:
+                run("difflib.ndiff", lambda a, b: list(difflib.ndiff(a, b)), a, b)
+            else:
+                print(f"  {'difflib.ndiff':<22}    skipped (--difflib-max-lines {args.difflib_max_lines})")
+            for algorithm in diff_engine.ALGORITHMS:
+                if algorithm == 'myers' and size > args.myers_max_lines:
+                    print(f"  {algorithm:<22}    skipped (--myers-max-lines {args.myers_max_lines})")
+                    continue
+                run(algorithm, lambda a, b: diff_engine.ndiff(a, b, algorithm), a, b)
+            run(f"{diff_engine.DEFAULT_ALGORITHM} + intraline",
+                lambda a, b: diff_engine.ndiff(a, b, intraline=True), a, b)
+
+if __name__ == '__main__':
+    main()
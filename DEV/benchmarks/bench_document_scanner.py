@@ -0,0 +1,74 @@
+#bench_document_scanner.py
+# Throughput of the single-pass document scanner vs. the old three-regex pipeline on a synthetic vault.
+#   python -m DEV.benchmarks.bench_document_scanner [--notes 50000]
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from NITTY_GRITTY.document_scanner import scan_document
+
+WORDS = ["vault", "graph", "index", "note", "link", "editor", "merge", "token", "cache", "query"]
+
+
+def build_vault(root, notes, seed=7):
+    rng = random.Random(seed)
+    for i in range(notes):
+        lines = []
+        for _ in range(rng.randint(10, 60)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(4, 14))]
+            roll = rng.random()
+            if roll < 0.15:
+                words.append(f"[[note_{rng.randrange(notes)}]]")
+            elif roll < 0.25:
+                words.append(f"#{rng.choice(WORDS)}")
+            elif roll < 0.3:
+                words.append(f"@{rng.choice(WORDS)}")
+            lines.append(" ".join(words))
+        subdir = os.path.join(root, f"d{i % 100}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"note_{i}.md"), 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+
+
+def legacy_scan(file_path):
+    # What Vault did before: three reads, three regexes
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tags = set(re.findall(r'#(\w+)', f.read()))
+    with open(file_path, 'r', encoding='utf-8') as f:
+        links = set(re.findall(r'\[\[(.*?)\]\]', f.read()))
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    re.findall(r'\[\[(.*?)\]\]', content)
+    re.findall(r'#(\w+)', content)
+    re.findall(r'@(\w+)', content)
+    return tags, links
+
+
+def run(label, func, paths, total_bytes):
+    start = time.perf_counter()
+    for path in paths:
+        func(path)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: {elapsed:7.2f} s  {total_bytes / elapsed / 1e6:8.1f} MB/s  {len(paths) / elapsed:9.0f} files/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"Building synthetic vault with {args.notes} notes in {root} ...")
+        build_vault(root, args.notes)
+        paths = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names]
+        total_bytes = sum(os.path.getsize(p) for p in paths)
+        print(f"{len(paths)} files, {total_bytes / 1e6:.1f} MB")
+        run("legacy", legacy_scan, paths, total_bytes)
+        run("scanner", scan_document, paths, total_bytes)
+
+
+if __name__ == '__main__':
+    main()
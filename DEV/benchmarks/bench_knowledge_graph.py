@@ -0,0 +1,112 @@
+#bench_knowledge_graph.py
+# Memory and latency of the interned/CSR KnowledgeGraph against the old defaultdict(set) one.
+#   python -m DEV.benchmarks.bench_knowledge_graph [--nodes 100000]
+import argparse
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+
+from NITTY_GRITTY.knowledge_graph import KnowledgeGraph
+
+
+class LegacyKnowledgeGraph:
+    # The graph as it was: strings in defaultdict(set), aggregates flattened on every call
+    def __init__(self):
+        self.links = defaultdict(set)
+        self.tags = defaultdict(set)
+        self.references = defaultdict(set)
+        self.backlinks = defaultdict(set)
+
+    def add_link(self, source, target):
+        self.links[source].add(target)
+        self.backlinks[target].add(source)
+
+    def add_tag(self, file, tag):
+        self.tags[file].add(tag)
+
+    def add_reference(self, file, reference):
+        self.references[file].add(reference)
+
+    def get_backlinks(self, file):
+        return self.backlinks[file]
+
+    def get_all_tags(self):
+        return list(set(tag for tags in self.tags.values() for tag in tags))
+
+    def get_all_references(self):
+        return list(set(ref for refs in self.references.values() for ref in refs))
+
+    def get_all_backlinks(self):
+        return list(set(file for backlinks in self.backlinks.values() for file in backlinks))
+
+
+def make_edges(nodes, seed=11):
+    rng = random.Random(seed)
+    files = [f"notes/area_{i % 200}/note_{i}.md" for i in range(nodes)]
+    edges = []
+    for file in files:
+        links = [f"note_{rng.randrange(nodes)}" for _ in range(rng.randint(1, 8))]
+        tags = [f"tag{rng.randrange(2000)}" for _ in range(rng.randint(0, 4))]
+        refs = [f"ref{rng.randrange(5000)}" for _ in range(rng.randint(0, 2))]
+        edges.append((file, links, tags, refs))
+    return edges
+
+
+def build(graph_class, edges):
+    graph = graph_class()
+    for file, links, tags, refs in edges:
+        for link in links:
+            graph.add_link(file, link)
+        for tag in tags:
+            graph.add_tag(file, tag)
+        for ref in refs:
+            graph.add_reference(file, ref)
+    if hasattr(graph, 'compact'):
+        graph.compact()
+    return graph
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def measure(label, graph_class, edges):
+    # tracemalloc slows allocation-heavy code down a lot, so time and measure memory in separate builds
+    tracemalloc.start()
+    graph = build(graph_class, edges)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del graph
+    start = time.perf_counter()
+    graph = build(graph_class, edges)
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(3)
+    probes = [f"note_{rng.randrange(len(edges))}" for _ in range(10000)]
+    backlinks_time = timed(lambda: [graph.get_backlinks(p) for p in probes]) / len(probes)
+    tags_first = timed(graph.get_all_tags)
+    tags_again = timed(graph.get_all_tags, repeat=10)
+    refs_time = timed(graph.get_all_references, repeat=3)
+    all_backlinks = timed(graph.get_all_backlinks, repeat=3)
+    print(f"{label:>8}: build {build_time:6.2f} s  mem {memory / 1e6:7.1f} MB  "
+          f"get_backlinks {backlinks_time * 1e6:6.1f} us  get_all_tags {tags_first * 1e3:7.1f} ms "
+          f"(cached {tags_again * 1e3:6.3f} ms)  get_all_references {refs_time * 1e3:7.1f} ms  "
+          f"get_all_backlinks {all_backlinks * 1e3:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=100000)
+    args = parser.parse_args()
+    edges = make_edges(args.nodes)
+    print(f"{args.nodes} files, {sum(len(l) for _, l, _, _ in edges)} links")
+    measure("legacy", LegacyKnowledgeGraph, edges)
+    measure("compact", KnowledgeGraph, edges)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#bench_memory_index.py
+# Latency of ranking AI memories for a query: per-memory scoring (a fresh TfidfVectorizer fit for every prose
+# memory, regex word overlap for code) vs. the BM25 MemoryIndex, at a few store sizes.
+#   python -m DEV.benchmarks.bench_memory_index [--sizes 100 1000 5000] [--queries 20]
+import argparse
+import random
+import re
+import time
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from NITTY_GRITTY.memory_index import MemoryIndex
+
+CODE_WORDS = ["def", "class", "return", "self", "import", "index", "token", "vault", "graph", "merge", "cache"]
+PROSE_WORDS = ["the", "note", "about", "project", "meeting", "design", "review", "plan", "vault", "editor"]
+
+
+def legacy_top(memories, query, top_n, vectorizer):
+    # What get_relevant_memories did per query
+    scored = []
+    for desc, content in memories:
+        if any(indicator in content for indicator in ['def ', 'class ', 'import ', 'from ', 'if __name__']):
+            score = len(set(re.findall(r'\w+', query.lower())) & set(re.findall(r'\w+', content.lower())))
+        else:
+            matrix = vectorizer.fit_transform([query, content])
+            score = cosine_similarity(matrix[0:1], matrix[1:2])[0][0]
+        scored.append((desc, content, score))
+    return sorted(scored, key=lambda x: x[2], reverse=True)[:top_n]
+
+
+def make_memories(count, rng):
+    memories = []
+    for i in range(count):
+        words = CODE_WORDS if i % 2 else PROSE_WORDS
+        body = " ".join(rng.choice(words) + (str(rng.randrange(500)) if rng.random() < 0.3 else "")
+                        for _ in range(rng.randint(40, 400)))
+        memories.append((f"File: m{i}.py" if i % 2 else f"Note {i}", ("def " if i % 2 else "") + body))
+    return memories
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(9)
+
+    for size in args.sizes:
+        memories = make_memories(size, rng)
+        queries = [" ".join(rng.choice(CODE_WORDS + PROSE_WORDS) + str(rng.randrange(500)) for _ in range(4))
+                   for _ in range(args.queries)]
+        index = MemoryIndex()
+        start = time.perf_counter()
+        for _, content in memories:
+            index.add(content)
+        index.sync(memories)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        for query in queries:
+            index.top_k(query, memories, 3)
+        indexed = (time.perf_counter() - start) / len(queries)
+
+        legacy_queries = queries[:max(1, min(len(queries), 2000 // size))]
+        vectorizer = TfidfVectorizer(stop_words='english')
+        start = time.perf_counter()
+        for query in legacy_queries:
+            legacy_top(memories, query, 3, vectorizer)
+        legacy = (time.perf_counter() - start) / len(legacy_queries)
+        print(f"{size:6d} memories: legacy {legacy * 1000:9.2f} ms/query   "
+              f"index {indexed * 1000:7.2f} ms/query (build {build * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#bench_merge_engine.py
+# Three-way merge over a generated fileset: each file gets scattered edits on the editor side (ours) and on
+# the suggestion side (theirs), a share of them landing on the same lines. Some files are left untouched on
+# one side, as most files in a real fileset are. Reports files/s and lines/s, and how many hunks merged
+# automatically vs. conflicted. Every clean result is checked to contain both sides' edits.
+#   python -m DEV.benchmarks.bench_merge_engine [--files 500] [--lines 2000] [--edits 20] [--overlap 0.1]
+#                                               [--untouched 0.5]
+import argparse
+import random
+import time
+
+from NITTY_GRITTY import merge_engine
+from DEV.benchmarks.bench_diff_engine import make_source
+
+
+def edit(source, positions, tag):
+    edited = list(source)
+    for position in sorted(positions, reverse=True):
+        edited[position] = edited[position].rstrip("\n") + f"  # {tag}\n"
+    return edited
+
+
+def make_job(lines, edits, overlap, untouched, rng):
+    base = make_source(lines, rng)
+    ours_positions = rng.sample(range(lines), edits)
+    shared = [position for position in ours_positions if rng.random() < overlap]
+    theirs_positions = set(shared) | set(rng.sample(range(lines), edits - len(shared)))
+    ours = edit(base, ours_positions, "ours")
+    theirs = edit(base, theirs_positions, "theirs")
+    if rng.random() < untouched:
+        ours = list(base)
+    return base, ours, theirs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--edits', type=int, default=20, help="edited lines per side per file")
+    parser.add_argument('--overlap', type=float, default=0.1, help="share of edits both sides make")
+    parser.add_argument('--untouched', type=float, default=0.5, help="share of files the editor side left alone")
+    args = parser.parse_args()
+    rng = random.Random(24)
+
+    jobs = [(f"file_{i}.py",) + make_job(args.lines, args.edits, args.overlap, args.untouched, rng)
+            for i in range(args.files)]
+    start = time.perf_counter()
+    results = dict(merge_engine.merge_fileset(jobs))
+    elapsed = time.perf_counter() - start
+
+    for path, base, ours, theirs in jobs:
+        result = results[path]
+        if result.clean:
+            merged = result.lines()
+            assert all(line in merged for line in ours if line.endswith("# ours\n"))
+            assert all(line in merged for line in theirs if line.endswith("# theirs\n"))
+    clean = sum(1 for result in results.values() if result.clean)
+    conflicts = sum(len(result.conflicts) for result in results.values())
+    auto_merged = sum(result.auto_merged for result in results.values())
+    print(f"{args.files} files x {args.lines} lines in {elapsed * 1000:.0f} ms: "
+          f"{args.files / elapsed:.0f} files/s, {args.files * args.lines / elapsed / 1000:.0f}k lines/s")
+    print(f"  {clean} merged cleanly, {auto_merged} hunks merged automatically, {conflicts} conflicts")
+
+if __name__ == '__main__':
+    main()
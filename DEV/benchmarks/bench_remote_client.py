@@ -0,0 +1,76 @@
+#bench_remote_client.py
+# Remote generation against the local stub server (DEV.stub_model_server): the old way, a fresh client per
+# call that blocks until the whole reply is in, one request after another, vs. the pooled asyncio
+# RemoteClient streaming concurrent requests. Reports wall time, time to first text and connections opened.
+#   python -m DEV.benchmarks.bench_remote_client [--requests 20] [--tokens 128] [--token-delay 0.005]
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import httpx
+
+from DEV.stub_model_server import StubModelServer
+from NITTY_GRITTY.remote_client import RemoteClient
+
+MESSAGES = [{'role': 'user', 'content': 'Explain the vault index.'}]
+
+
+def legacy(server, requests, tokens):
+    # New client per call (openai.ChatCompletion.create / anthropic.Client did this), full response only
+    first_text = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_start = time.perf_counter()
+        with httpx.Client(base_url=server.url) as client:
+            response = client.post('/v1/chat/completions', json={'model': 'gpt-4', 'messages': MESSAGES,
+                                                                 'max_tokens': tokens, 'stream': True})
+            text = ''.join(json.loads(line[5:])['choices'][0]['delta']['content']
+                           for line in response.text.splitlines()
+                           if line.startswith('data:') and line != 'data: [DONE]')
+        assert text
+        first_text.append(time.perf_counter() - request_start)
+    return time.perf_counter() - start, first_text
+
+
+def pooled(server, requests, tokens):
+    client = RemoteClient()
+    first_text = [None] * requests
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def on_delta(i):
+        def record(text):
+            with lock:
+                if first_text[i] is None:
+                    first_text[i] = time.perf_counter() - start
+        return record
+
+    futures = [client.submit('openai', 'gpt-4', MESSAGES, tokens, 'stub', on_delta(i), base_url=server.url)
+               for i in range(requests)]
+    for future in futures:
+        assert future.result()
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed, first_text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--tokens', type=int, default=128)
+    parser.add_argument('--token-delay', type=float, default=0.005)
+    args = parser.parse_args()
+
+    for label, run in (("legacy", legacy), ("pooled", pooled)):
+        server = StubModelServer(tokens=args.tokens, token_delay=args.token_delay).start()
+        elapsed, first_text = run(server, args.requests, args.tokens)
+        print(f"{label:>8}: {args.requests} requests in {elapsed:6.2f} s   "
+              f"median time to first text {statistics.median(first_text) * 1000:8.1f} ms   "
+              f"{len(server.connections)} connections")
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
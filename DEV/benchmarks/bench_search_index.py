@@ -0,0 +1,107 @@
+#bench_search_index.py
+# File search over a synthetic corpus: the trigram search index vs. fuzzy-matching every line of every file.
+#   python -m DEV.benchmarks.bench_search_index [--size-mb 1024] [--queries 10] [--brute-sample 200]
+# The full scan is timed on a sample of files and extrapolated, on a 1 GB corpus it runs for hours.
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+from NITTY_GRITTY.search_index import SearchIndex, extract_terms, match_lines, read_text
+
+FILE_SIZE = 64 * 1024
+
+
+def make_vocabulary(rng, size=60000):
+    return [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 12))) for _ in range(size)]
+
+
+def build_corpus(root, size_mb, vocabulary, seed=11):
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    i = 0
+    while written < target:
+        # Zipf-ish word choice so some trigrams are everywhere and most are rare, like real text
+        lines = []
+        size = 0
+        while size < FILE_SIZE:
+            line = ' '.join(vocabulary[min(int(rng.paretovariate(0.6)) - 1, len(vocabulary) - 1)]
+                            for _ in range(rng.randint(5, 15)))
+            lines.append(line)
+            size += len(line) + 1
+        subdir = os.path.join(root, f"d{i % 256}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"file_{i}.txt"), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        written += size
+        i += 1
+    return i
+
+
+def search_files(query, paths):
+    hits = 0
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            hits += len(match_lines(query, f.read()))
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--queries', type=int, default=10)
+    parser.add_argument('--brute-sample', type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(3)
+    vocabulary = make_vocabulary(rng)
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"Building {args.size_mb} MB corpus in {root} ...")
+        count = build_corpus(root, args.size_mb, vocabulary)
+        rel_paths = [os.path.relpath(os.path.join(d, n), root) for d, _, names in os.walk(root) for n in names]
+        print(f"{count} files")
+
+        index = SearchIndex(root)
+        start = time.perf_counter()
+        with index.transaction():
+            for rel_path in rel_paths:
+                index.update(rel_path, extract_terms(read_text(os.path.join(root, rel_path)), rel_path))
+            index.mark_complete()
+        elapsed = time.perf_counter() - start
+        db_size = os.path.getsize(index.db_file) / 1e6
+        print(f"index build: {elapsed:7.2f} s  {args.size_mb / elapsed:6.1f} MB/s  db {db_size:.1f} MB")
+
+        # Rare words with a typo swapped in, the kind of query the fuzzy search exists for
+        queries = []
+        for word in rng.sample(vocabulary[1000:], args.queries):
+            pos = rng.randrange(len(word))
+            queries.append(word[:pos] + rng.choice(string.ascii_lowercase) + word[pos + 1:])
+
+        sample = [os.path.join(root, p) for p in rng.sample(rel_paths, min(args.brute_sample, len(rel_paths)))]
+        start = time.perf_counter()
+        for query in queries:
+            search_files(query, sample)
+        brute = (time.perf_counter() - start) / len(queries) * len(rel_paths) / len(sample)
+        print(f"full scan:   {brute:9.2f} s/query (extrapolated from {len(sample)} files)")
+
+        narrow_total = score_total = 0.0
+        candidates = 0
+        for query in queries:
+            start = time.perf_counter()
+            paths = index.candidates(query)
+            narrow_total += time.perf_counter() - start
+            candidates += len(paths)
+            start = time.perf_counter()
+            search_files(query, [os.path.join(root, p) for p in paths])
+            score_total += time.perf_counter() - start
+        print(f"indexed:     {(narrow_total + score_total) / len(queries):9.2f} s/query "
+              f"(candidates {narrow_total / len(queries) * 1000:.1f} ms, "
+              f"{candidates / len(queries):.0f} files scored)")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#bench_tokenizer_startup.py
+# Startup cost of getting a usable tokenizer: the old eager AutoTokenizer.from_pretrained in
+# ContextManager.__init__ (run twice, init_managers ran twice) vs. the background TokenizerRegistry.
+# Every measurement runs in a fresh interpreter so import and cache effects are the same as at app start.
+#   python -m DEV.benchmarks.bench_tokenizer_startup [--model arcee-ai/Llama-3.1-SuperNova-Lite] [--runs 5]
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from NITTY_GRITTY.tokenizer_registry import DEFAULT_TOKENIZER_MODEL
+
+LEGACY = """
+import json, sys, time
+start = time.perf_counter()
+from transformers import AutoTokenizer
+for _ in range(2):
+    tokenizer = AutoTokenizer.from_pretrained(sys.argv[1])
+tokenizer.encode("def main(): pass", add_special_tokens=False)
+print(json.dumps({'blocking': time.perf_counter() - start}))
+"""
+
+REGISTRY = """
+import json, sys, time
+start = time.perf_counter()
+from NITTY_GRITTY.tokenizer_registry import get_tokenizer_registry
+registry = get_tokenizer_registry()
+for _ in range(2):
+    registry.request(sys.argv[1])
+registry.get(sys.argv[1]).encode("def main(): pass")
+blocking = time.perf_counter() - start
+registry.wait(sys.argv[1])
+print(json.dumps({'blocking': blocking, 'ready': time.perf_counter() - start,
+                  'loaded': registry.is_loaded(sys.argv[1])}))
+"""
+
+
+def measure(script, model, runs):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', script, model], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+            return None
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=DEFAULT_TOKENIZER_MODEL)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    legacy = measure(LEGACY, args.model, args.runs)
+    if legacy:
+        print(f"  legacy: {statistics.median(s['blocking'] for s in legacy) * 1000:8.1f} ms blocking startup")
+    registry = measure(REGISTRY, args.model, args.runs)
+    if registry:
+        print(f"registry: {statistics.median(s['blocking'] for s in registry) * 1000:8.1f} ms blocking startup, "
+              f"model tokenizer ready after {statistics.median(s['ready'] for s in registry) * 1000:.1f} ms "
+              f"in the background ({'loaded' if registry[-1]['loaded'] else 'not loadable, tiktoken fallback'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#stub_model_server.py
+# Local stand-in for the OpenAI and Anthropic streaming endpoints, for exercising NITTY_GRITTY.remote_client
+# (and the remote chat) without keys or network. Answers /v1/chat/completions and /v1/messages with
+# server-sent events shaped like the real APIs, a token at a time. It can be told to fail the first
+# requests with a status code, to check retries and backoff.
+#   python -m DEV.stub_model_server [--port 8765] [--tokens 64] [--token-delay 0.01] [--fail-first 0 --fail-status 429]
+# then point the app at it with OPENAI_BASE_URL / ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubModelServer:
+    def __init__(self, port=0, tokens=64, token_delay=0.01, first_token_delay=0.0, fail_first=0, fail_status=429):
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = set()  # client ports seen, to tell pooled connections from fresh ones
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="stub-model-server")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, so a pooled client really reuses connections
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub.lock:
+                    stub.requests += 1
+                    number = stub.requests
+                    stub.connections.add(self.client_address[1])
+                if number <= stub.fail_first:
+                    payload = json.dumps({'error': {'message': 'stub failure', 'type': 'overloaded_error'}}).encode()
+                    self.send_response(stub.fail_status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.send_header('Retry-After', '0')
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                if self.path == '/v1/chat/completions':
+                    events = self.openai_events(body)
+                elif self.path == '/v1/messages':
+                    events = self.anthropic_events(body)
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                time.sleep(stub.first_token_delay)
+                try:
+                    for event, data, is_token in events:
+                        message = (f"event: {event}\n" if event else "") + f"data: {data}\n\n"
+                        self.write_chunk(message.encode())
+                        if is_token and stub.token_delay:
+                            time.sleep(stub.token_delay)
+                    self.write_chunk(b'')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client cancelled
+
+            def write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def openai_events(self, body):
+                for i in range(stub.tokens):
+                    chunk = {'choices': [{'index': 0, 'delta': {'content': f"tok{i} "}}], 'model': body.get('model')}
+                    yield None, json.dumps(chunk), True
+                yield None, '[DONE]', False
+
+            def anthropic_events(self, body):
+                yield 'message_start', json.dumps({'type': 'message_start', 'message': {'model': body.get('model')}}), False
+                yield 'content_block_start', json.dumps({'type': 'content_block_start', 'index': 0}), False
+                for i in range(stub.tokens):
+                    delta = {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': f"tok{i} "}}
+                    yield 'content_block_delta', json.dumps(delta), True
+                yield 'content_block_stop', json.dumps({'type': 'content_block_stop', 'index': 0}), False
+                yield 'message_stop', json.dumps({'type': 'message_stop'}), False
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tokens', type=int, default=64)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--first-token-delay', type=float, default=0.0)
+    parser.add_argument('--fail-first', type=int, default=0)
+    parser.add_argument('--fail-status', type=int, default=429)
+    args = parser.parse_args()
+    server = StubModelServer(args.port, args.tokens, args.token_delay, args.first_token_delay,
+                             args.fail_first, args.fail_status)
+    print(f"Stub model server on {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 # utils.py
 import re
-import difflib
+
+from NITTY_GRITTY import diff_engine
 
 def extract_code_blocks(text, key_symbols=None):
     blocks = {}
@@ -68,4 +69,4 @@ def apply_diff_to_content(content, diff_blocks):
     return '\n'.join(lines)
 
 def compute_diff(original_text, new_text):
-    return list(difflib.ndiff(original_text.splitlines(True), new_text.splitlines(True)))
\ No newline at end of file
+    return diff_engine.ndiff(original_text.splitlines(True), new_text.splitlines(True), intraline=True)
\ No newline at end of file
@@ -38,6 +38,11 @@ from PyQt6.QtGui import QTextCursor
 from PyQt6.QtWidgets import QPlainTextEdit
 
 from DEV.utils import extract_code_blocks, extract_diff_blocks, apply_diff_to_content
+from NITTY_GRITTY.message_parser import StreamingMessageParser
+from GUX.chat_transcript import ChatDisplay
+
+PARTIAL_RENDER_INTERVAL_MS = 33  # streamed text is painted at most ~30 times a second
+LOCAL_MODELS_SEARCHING = "Searching for models..."
 
 from GUX.diff_merger import DiffMergerWidget, DiffMergerDialog
 ##maybe implement profiler to track time and memory usage and optimize
@@ -152,57 +157,11 @@ class ContextReferenceWidget(QWidget):
         self.references.remove(reference)
         self.scroll_layout.removeWidget(reference)
         reference.deleteLater()
-    def get_context_text(self):
-        return "\n".join([f"{reference.label.text()}: {reference.context}" for reference in self.references])
-class CodeBlockHighlighter(QSyntaxHighlighter):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.code_block_format = QTextCharFormat()
-        self.code_block_format.setBackground(QColor(240, 240, 240))
-
-    def highlightBlock(self, text):
-        code_block_regex = re.compile(r'```[\s\S]*?```')
-        for match in code_block_regex.finditer(text):
-            start, end = match.span()
-            self.setFormat(start, end - start, self.code_block_format)
-
-class MessageWidget(QFrame):
-    def __init__(self, message, is_user=False, parent=None):
-        super().__init__(parent)
-        self.setFrameStyle(QFrame.Shape.StyledPanel | QFrame.Shadow.Raised)
-        layout = QVBoxLayout(self)
-        
-        prefix = "You: " if is_user else "AI: "
-        content = QPlainTextEdit(f"{prefix}{message}")
-        content.setReadOnly(True)
-        content.setFrameStyle(QFrame.Shape.NoFrame)
-        content.setStyleSheet("background-color: transparent;")
-        
-        if not is_user:
-            highlighter = CodeBlockHighlighter(content.document())
-        
-        layout.addWidget(content)
-
-class ChatDisplay(QScrollArea):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.widget = QWidget()
-        self.layout = QVBoxLayout(self.widget)
-        self.setWidget(self.widget)
-        self.setWidgetResizable(True)
-
-    def add_message(self, message, is_user=False):
-        message_widget = MessageWidget(message, is_user)
-        self.layout.addWidget(message_widget)
-        self.scroll_to_bottom()
-
-    def add_widget(self, widget):
-        self.layout.addWidget(widget)
-        self.scroll_to_bottom()
-
-    def scroll_to_bottom(self):
-        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+    def get_context_entries(self):
+        return [f"{reference.label.text()}: {reference.context}" for reference in self.references]
 
+    def get_context_text(self):
+        return "\n".join(self.get_context_entries())
 class AIChatWidget(QWidget):
     file_clicked = pyqtSignal(str)
     merge_requested = pyqtSignal(str, str)
@@ -239,6 +198,8 @@ class AIChatWidget(QWidget):
             
             logging.info("Connecting signals")
             self.connect_signals()
+            # After connect_signals: the worker starts reporting right away
+            self.populate_local_model_dropdown()
             
             logging.info("AIChatWidget initialized successfully")
         except Exception as e:
@@ -253,6 +214,12 @@ class AIChatWidget(QWidget):
         self.instructions = self.set_default_instructions()
         self.model_path = None
         self.partial_response_buffer = ""
+        # Streamed partials wait here until the next render tick; the parsers split code blocks as they arrive
+        self.pending_partials = {'local': [], 'remote': []}
+        self.stream_parsers = {}
+        self.partial_render_timer = QTimer(self)
+        self.partial_render_timer.setInterval(PARTIAL_RENDER_INTERVAL_MS)
+        self.partial_render_timer.timeout.connect(self.flush_partial_responses)
         self.cursor_manager = CursorManager(self)
 
     def set_default_instructions(self):
@@ -315,7 +282,6 @@ class AIChatWidget(QWidget):
         self.local_model_dropdown = QComboBox()
         self.load_local_button = QPushButton("Load Local Model")
         
-        self.populate_local_model_dropdown()
         model_layout.addWidget(QLabel("Local Model:"))
         model_layout.addWidget(self.local_model_dropdown)
         model_layout.addWidget(self.load_local_button)
@@ -373,27 +339,50 @@ class AIChatWidget(QWidget):
         # Set default instructions
         self.set_instructions(self.set_default_instructions())
 
-    def populate_local_model_dropdown(self):
-        repo_id = "Joseph717171/Llama-3.1-SuperNova-Lite-8.0B-OQ8_0.EF32.IQ4_K-Q8_0-GGUF"
-        api_url = f"https://huggingface.co/api/models/{repo_id}"
-        
-        try:
-            response = requests.get(api_url)
-            response.raise_for_status()
-            repo_data = response.json()
-            
-            model_files = [file for file in repo_data.get('siblings', []) if file['rfilename'].endswith('.gguf')]
-            
-            for file in model_files:
-                self.local_model_dropdown.addItem(file['rfilename'])
-            
-            if self.local_model_dropdown.count() == 0:
-                self.local_model_dropdown.addItem("No models found")
-                self.load_local_button.setEnabled(False)
-        except Exception as e:
-            logging.error(f"Error populating local model dropdown: {str(e)}")
-            self.local_model_dropdown.addItem("Error loading models")
-            self.load_local_button.setEnabled(False)
+    def populate_local_model_dropdown(self, force_refresh=False):
+        # Filled in the background as each source reports: models on disk, the cached repo listing, the
+        # fresh one. Nothing gets selected (and loaded) just because it showed up
+        self.local_model_dropdown.blockSignals(True)
+        self.local_model_dropdown.clear()
+        self.local_model_dropdown.addItem(LOCAL_MODELS_SEARCHING)
+        self.local_model_dropdown.blockSignals(False)
+        self.load_local_button.setEnabled(False)
+        self.local_models_error = None
+        self.model_manager.discover_local_models(force_refresh=force_refresh)
+
+    def add_local_models(self, models):
+        dropdown = self.local_model_dropdown
+        dropdown.blockSignals(True)
+        placeholder = dropdown.findText(LOCAL_MODELS_SEARCHING)
+        if placeholder >= 0:
+            dropdown.removeItem(placeholder)
+        for model in models:
+            index = dropdown.findText(model['name'])
+            if index < 0:
+                dropdown.addItem(model['name'])
+                index = dropdown.count() - 1
+            if model.get('path'):
+                # Already downloaded: loads from disk
+                dropdown.setItemData(index, model['path'], Qt.ItemDataRole.ToolTipRole)
+            elif dropdown.itemData(index, Qt.ItemDataRole.ToolTipRole) is None:
+                size = f" ({humanize.naturalsize(model['size'])})" if model.get('size') else ""
+                dropdown.setItemData(index, f"Downloads from Hugging Face{size}", Qt.ItemDataRole.ToolTipRole)
+        dropdown.blockSignals(False)
+        self.load_local_button.setEnabled(dropdown.count() > 0)
+
+    def on_local_models_error(self, error):
+        logging.error(f"Error populating local model dropdown: {error}")
+        self.local_models_error = error
+
+    def on_local_models_discovered(self):
+        dropdown = self.local_model_dropdown
+        if dropdown.findText(LOCAL_MODELS_SEARCHING) < 0 and dropdown.count() > 0:
+            return
+        dropdown.blockSignals(True)
+        dropdown.clear()
+        dropdown.addItem("Error loading models" if self.local_models_error else "No models found")
+        dropdown.blockSignals(False)
+        self.load_local_button.setEnabled(False)
 
     def create_chat_area(self, title):
         widget = QWidget()
@@ -414,14 +403,15 @@ class AIChatWidget(QWidget):
         
         return widget
 
-    def display_message(self, message, is_user=False, chat_type='local'):
+    def display_message(self, message, is_user=False, chat_type='local', parts=None):
         chat_display = getattr(self, f"{chat_type}_chat_display")
         
         if is_user:
             chat_display.add_message(message, is_user=True)
         else:
-            # Process the AI message to extract code blocks
-            parts = self.process_message(message)
+            # Process the AI message to extract code blocks, unless they were parsed while streaming
+            if parts is None:
+                parts = self.process_message(message)
             for part in parts:
                 if part[0] == 'text':
                     chat_display.add_message(part[1], is_user=False)
@@ -433,17 +423,38 @@ class AIChatWidget(QWidget):
         partial_buffer.clear()
 
     def on_partial_response(self, partial_response, chat_type):
-        partial_buffer = getattr(self, f"{chat_type}_partial_buffer")
-        partial_buffer.appendPlainText(partial_response)
-        partial_buffer.moveCursor(QTextCursor.MoveOperation.End)
-        partial_buffer.ensureCursorVisible()
+        # Only buffer here; painting every chunk would relayout the view once per token
+        self.pending_partials[chat_type].append(partial_response)
+        self.stream_parsers.setdefault(chat_type, StreamingMessageParser()).feed(partial_response)
+        if not self.partial_render_timer.isActive():
+            self.partial_render_timer.start()
+
+    def flush_partial_responses(self):
+        for chat_type, pending in self.pending_partials.items():
+            if not pending:
+                continue
+            partial_buffer = getattr(self, f"{chat_type}_partial_buffer")
+            scroll_bar = partial_buffer.verticalScrollBar()
+            follow = scroll_bar.value() == scroll_bar.maximum()
+            cursor = QTextCursor(partial_buffer.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(''.join(pending))
+            pending.clear()
+            # Keep following the stream unless the user scrolled up to read
+            if follow:
+                scroll_bar.setValue(scroll_bar.maximum())
+        self.partial_render_timer.stop()
 
     def on_generation_error(self, error):
         QMessageBox.critical(self, "Generation Error", f"An error occurred during generation: {error}")
         self.hide_loading_spinner()
         
     def on_generation_finished(self, response, chat_type):
-        self.display_message(response, is_user=False, chat_type=chat_type)
+        self.pending_partials[chat_type].clear()
+        parser = self.stream_parsers.pop(chat_type, None)
+        # The streamed parts are only reusable if the stream delivered the whole response
+        parts = parser.finish() if parser is not None and parser.text == response else None
+        self.display_message(response, is_user=False, chat_type=chat_type, parts=parts)
         
         chat_display = getattr(self, f"{chat_type}_chat_display")
         self.extract_code_suggestions(response, chat_display)
@@ -512,21 +523,22 @@ class AIChatWidget(QWidget):
             messages = self.remote_messages
         
         self.display_message(user_message, is_user=True, chat_type=chat_type)
-        context = ""
-        if len(messages) == 0 or messages[0]["role"] != "system":
-            instructions = self.set_default_instructions()
-            context = instructions
-        # Ensure the context is included
-        context += self.context_reference_widget.get_context_text()
-        logging.warning(f"Context: {context}")
-        messages.insert(0, {"role": "system", "content": context})
-    
+        self.update_context_messages(messages, chat_type)
         messages.append({"role": "user", "content": user_message})
         
         self.model_manager.generate(messages, chat_type, model_name)
         
         self.add_message_to_references(user_message)
            
+    def update_context_messages(self, messages, chat_type):
+        # Exactly one system message and it comes first: chat templates like Llama-3's and Mistral's reject or
+        # garble a system turn anywhere else. Context is appended at its end, so a turn that adds none leaves
+        # the prompt the local model already evaluated untouched; added context re-evaluates the turns after it.
+        entries = self.context_reference_widget.get_context_entries()
+        system = {"role": "system", "content": self.set_default_instructions() + "\n".join(entries)}
+        messages[:] = [system] + [m for m in messages if m["role"] != "system"]
+        logging.debug(f"Context: {len(entries)} references, {len(messages)} messages")
+
     def show_loading_spinner(self):
         movie = QMovie("resources/loading.gif")
         self.loading_spinner.setMovie(movie)
@@ -673,6 +685,9 @@ class AIChatWidget(QWidget):
         self.model_manager.generation_finished.connect(self.on_generation_finished)
         self.model_manager.generation_error.connect(self.on_generation_error)
         self.model_manager.partial_response.connect(self.on_partial_response)
+        self.model_manager.local_models_found.connect(self.add_local_models)
+        self.model_manager.local_models_error.connect(self.on_local_models_error)
+        self.model_manager.local_models_discovered.connect(self.on_local_models_discovered)
         self.local_model_dropdown.currentTextChanged.connect(self.on_local_model_changed)
         self.remote_model_dropdown.currentTextChanged.connect(self.on_remote_model_changed)
         self.add_context_button.clicked.connect(self.add_references)
@@ -833,11 +848,8 @@ class AIChatWidget(QWidget):
 
     def remove_reference(self, reference):
         self.chat_reference_widget.remove_reference(reference)
-        # Also remove from context_manager
-        for i, (desc, _) in enumerate(self.context_manager.contexts):
-            if desc == reference.label.text():
-                del self.context_manager.contexts[i]
-                break
+        # Also remove from context_manager, through it so its token total stays right
+        self.context_manager.remove_context_by_description(reference.label.text())
     def set_current_file(self, file_path, content):
         self.current_file_path = file_path
         self.current_file_content = content
@@ -956,20 +968,28 @@ class AIChatWidget(QWidget):
         return language, file_path, code_content
 
     def add_code_block_widget(self, language, file_path, code_content, chat_display):
-        code_widget = QWidget()
-        layout = QVBoxLayout(code_widget)
-
+        file_name = None
         # Try to find the file path in the chat references if not provided
         if not file_path:
             file_name = f"new_file.{language}"  # Default file name based on language
             file_path = self.chat_reference_widget.get_file_path(file_name)
 
+        # The transcript builds the widget only while the block is on screen, so everything it shows
+        # (including a file path the user specifies later) lives in block rather than in the widget
+        block = {'language': language, 'file_path': file_path, 'file_name': file_name, 'code': code_content}
+        chat_display.add_widget_factory(lambda: self.create_code_block_widget(block))
+
+    def create_code_block_widget(self, block):
+        language, file_path, code_content = block['language'], block['file_path'], block['code']
+        code_widget = QWidget()
+        layout = QVBoxLayout(code_widget)
+
         # Add file path label
         if file_path:
             rel_path = self.project_manager.get_relative_path_in_project(file_path)
             file_label = QLabel(f"File: {rel_path} (Full path: {file_path})")
         else:
-            file_label = QLabel(f"File: {file_name} (Not specified)")
+            file_label = QLabel(f"File: {block['file_name']} (Not specified)")
         layout.addWidget(file_label)
 
         # Add language label
@@ -989,17 +1009,15 @@ class AIChatWidget(QWidget):
         button_layout.addWidget(copy_button)
 
         apply_button = QPushButton("Apply Changes")
-        apply_button.clicked.connect(lambda: self.apply_code_changes(file_path, code_edit.toPlainText()))
+        apply_button.clicked.connect(lambda: self.apply_code_changes(block['file_path'], code_edit.toPlainText()))
         button_layout.addWidget(apply_button)
 
         specify_file_button = QPushButton("Specify File")
-        specify_file_button.clicked.connect(lambda: self.specify_file_path(code_widget, file_label))
+        specify_file_button.clicked.connect(lambda: self.specify_file_path(block, file_label))
         button_layout.addWidget(specify_file_button)
 
         layout.addLayout(button_layout)
-
-        # Add the code widget to the chat display
-        chat_display.add_widget(code_widget)
+        return code_widget
 
     
     def on_model_type_changed(self, model_type):
@@ -1035,18 +1053,14 @@ class AIChatWidget(QWidget):
             self.input_field.setFixedHeight(200)
         else:
             self.input_field.setFixedHeight(int(doc_height))
-    def specify_file_path(self, code_widget, file_label):
-        initial_path = file_label.text().split("Full path: ")[-1].strip(")")
+    def specify_file_path(self, block, file_label):
+        initial_path = block['file_path'] or block['file_name'] or ""
         file_path, _ = QFileDialog.getSaveFileName(self, "Specify File Path", initial_path, "All Files (*)")
         if file_path:
             rel_path = self.project_manager.get_relative_path_in_project(file_path)
             file_label.setText(f"File: {rel_path} (Full path: {file_path})")
-            # Update the apply_button to use the new file_path
-            for child in code_widget.children():
-                if isinstance(child, QPushButton) and child.text() == "Apply Changes":
-                    child.clicked.disconnect()
-                    child.clicked.connect(lambda: self.apply_code_changes(file_path, code_widget.findChild(QTextEdit).toPlainText()))
-                    break
+            # The apply button reads the path from block, and so does the widget if it is rebuilt
+            block['file_path'] = file_path
         logging.debug(f"User specified file path: {file_path}")
 class CursorManager:
     def __init__(self, chat_widget):
@@ -0,0 +1,262 @@
+#chat_transcript.py
+# Model/view chat transcript. Messages live in a list model and are painted by a delegate from cached
+# QTextDocument layouts, so only the rows on screen cost anything to draw; a long session no longer holds a
+# QPlainTextEdit (and highlighter) per message. Rows that need real widgets (code blocks with buttons) are
+# built from a factory when they scroll into view and dropped again when they leave it.
+import re
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QPoint, QRect, QSize, Qt, QTimer
+from PyQt6.QtGui import QColor, QKeySequence, QSyntaxHighlighter, QTextCharFormat, QTextDocument
+from PyQt6.QtWidgets import QAbstractItemView, QApplication, QListView, QMenu, QStyledItemDelegate
+
+MESSAGE_MARGIN = 6
+MAX_CACHED_LAYOUTS = 200  # documents kept for painting; a few screens worth of messages
+WIDGET_ROW_ESTIMATE = 240  # height assumed for widget rows until one has been built
+WIDGET_PRELOAD_ROWS = 2  # rows above/below the viewport whose widgets are kept alive
+
+
+class CodeBlockHighlighter(QSyntaxHighlighter):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.code_block_format = QTextCharFormat()
+        self.code_block_format.setBackground(QColor(240, 240, 240))
+
+    def highlightBlock(self, text):
+        code_block_regex = re.compile(r'```[\s\S]*?```')
+        for match in code_block_regex.finditer(text):
+            start, end = match.span()
+            self.setFormat(start, end - start, self.code_block_format)
+
+
+class ChatItem:
+    __slots__ = ('text', 'is_user', 'factory', 'keep_alive', 'height', 'height_width')
+
+    def __init__(self, text='', is_user=False, factory=None, keep_alive=False):
+        self.text = text
+        self.is_user = is_user
+        self.factory = factory  # callable returning the row's widget, None for plain messages
+        self.keep_alive = keep_alive  # widget is never dropped when it scrolls out of view
+        self.height = None  # last measured height, valid for height_width
+        self.height_width = None
+
+
+class ChatMessageModel(QAbstractListModel):
+    ItemRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.text
+        if role == self.ItemRole:
+            return item
+        return None
+
+    def append(self, item):
+        row = len(self.items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.append(item)
+        self.endInsertRows()
+        return self.index(row)
+
+    def clear(self):
+        self.beginResetModel()
+        self.items = []
+        self.endResetModel()
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.documents = OrderedDict()  # (id(item), text width) -> QTextDocument, least recently used first
+        # Unbuilt widget rows take the last measured widget's height; code blocks all look alike, so building
+        # one as it scrolls into view rarely changes its height and forces a relayout of every row
+        self.widget_height = WIDGET_ROW_ESTIMATE
+
+    def document(self, item, width):
+        key = (id(item), width)
+        document = self.documents.get(key)
+        if document is not None:
+            self.documents.move_to_end(key)
+            return document
+        document = QTextDocument()
+        document.setDocumentMargin(0)
+        document.setPlainText(f"{'You' if item.is_user else 'AI'}: {item.text}")
+        if not item.is_user:
+            # Parented to the document so it lives exactly as long as the cached layout
+            CodeBlockHighlighter(document)
+        document.setTextWidth(width)
+        self.documents[key] = document
+        while len(self.documents) > MAX_CACHED_LAYOUTS:
+            self.documents.popitem(last=False)
+        return document
+
+    def forget(self):
+        self.documents.clear()
+
+    def text_width(self, option):
+        return max(1, option.rect.width() - 2 * MESSAGE_MARGIN)
+
+    def sizeHint(self, option, index):
+        # The view asks for every row's size on each relayout, so this stays cheap: straight to the item,
+        # and only new rows or a new width pay for a text layout
+        item = index.model().items[index.row()]
+        row_width = option.rect.width()
+        if item.factory is not None:
+            return QSize(row_width, item.height or self.widget_height)
+        width = max(1, row_width - 2 * MESSAGE_MARGIN)
+        if item.height_width != width:
+            item.height = int(self.document(item, width).size().height()) + 2 * MESSAGE_MARGIN
+            item.height_width = width
+        return QSize(row_width, item.height)
+
+    def paint(self, painter, option, index):
+        item = index.data(ChatMessageModel.ItemRole)
+        if item.factory is not None:
+            return  # the row's widget draws itself
+        palette = option.palette
+        frame = option.rect.adjusted(1, 2, -1, -2)
+        painter.save()
+        painter.setPen(palette.mid().color())
+        painter.setBrush(palette.alternateBase() if item.is_user else palette.base())
+        painter.drawRoundedRect(frame, 4, 4)
+        painter.translate(option.rect.left() + MESSAGE_MARGIN, option.rect.top() + MESSAGE_MARGIN)
+        document = self.document(item, self.text_width(option))
+        document.drawContents(painter, QRect(QPoint(0, 0), option.rect.size()).toRectF())
+        painter.restore()
+
+
+class ChatDisplay(QListView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # row -> widget shown for a factory row. These are plain viewport children placed over their rows,
+        # not index widgets: the view relayouts every row synchronously on each insert once it has any
+        self.live_widgets = {}
+        self.scroll_pending = False
+        # Scrolling and widgets are synced once per event loop pass, however many scroll/resize/insert
+        # events came in; scrolling straight after each insert would also relayout every row every time
+        self.widget_sync_timer = QTimer(self)
+        self.widget_sync_timer.setSingleShot(True)
+        self.widget_sync_timer.setInterval(0)
+        self.widget_sync_timer.timeout.connect(self.sync_widgets)
+
+        self.message_model = ChatMessageModel(self)
+        self.delegate = ChatMessageDelegate(self)
+        self.setModel(self.message_model)
+        self.setItemDelegate(self.delegate)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_context_menu)
+
+    def add_message(self, message, is_user=False):
+        self.message_model.append(ChatItem(message, is_user))
+        self.scroll_to_bottom()
+
+    def add_widget(self, widget):
+        # A prebuilt widget cannot be rebuilt later, so it stays alive; prefer add_widget_factory
+        self.add_widget_factory(lambda: widget, keep_alive=True)
+
+    def add_widget_factory(self, factory, keep_alive=False):
+        self.message_model.append(ChatItem(factory=factory, keep_alive=keep_alive))
+        self.scroll_to_bottom()
+
+    def show_widget(self, row):
+        item = self.message_model.items[row]
+        widget = self.live_widgets.get(row)
+        if widget is None:
+            widget = item.factory()
+            widget.setParent(self.viewport())
+            self.live_widgets[row] = widget
+        widget.setGeometry(self.visualRect(self.message_model.index(row)))
+        widget.show()
+        height = widget.sizeHint().height()
+        previous = item.height or self.delegate.widget_height
+        item.height = self.delegate.widget_height = height
+        if height == previous:
+            return False
+        self.delegate.sizeHintChanged.emit(self.message_model.index(row))
+        return True
+
+    def hide_widget(self, row):
+        widget = self.live_widgets[row]
+        if self.message_model.items[row].keep_alive:
+            widget.hide()
+            return
+        del self.live_widgets[row]
+        widget.deleteLater()
+
+    def schedule_widget_sync(self, *args):
+        self.widget_sync_timer.start()
+
+    def sync_widgets(self):
+        rows = len(self.message_model.items)
+        if not rows:
+            return
+        if self.scroll_pending:
+            self.scroll_pending = False
+            self.scrollToBottom()
+        first = self.indexAt(QPoint(0, 0)).row()
+        last = self.indexAt(QPoint(0, self.viewport().height() - 1)).row()
+        first = 0 if first < 0 else max(0, first - WIDGET_PRELOAD_ROWS)
+        last = rows - 1 if last < 0 else min(rows - 1, last + WIDGET_PRELOAD_ROWS)
+        for row in [row for row in self.live_widgets if not first <= row <= last]:
+            self.hide_widget(row)
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() == scroll_bar.maximum()
+        resized = False
+        for row in range(first, last + 1):
+            if self.message_model.items[row].factory is not None:
+                resized = self.show_widget(row) or resized
+        # A widget built for the first time replaces the estimated row height; stay pinned to the bottom
+        if resized and at_bottom:
+            self.scroll_to_bottom()
+
+    def updateGeometries(self):
+        # Runs after every relayout; rows may have moved under the widgets
+        super().updateGeometries()
+        self.schedule_widget_sync()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.sync_widgets()
+
+    def clear(self):
+        for widget in self.live_widgets.values():
+            widget.deleteLater()
+        self.live_widgets.clear()
+        self.delegate.forget()
+        self.message_model.clear()
+
+    def copy_message(self, index):
+        if index.isValid() and index.data(ChatMessageModel.ItemRole).factory is None:
+            QApplication.clipboard().setText(index.data())
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Copy):
+            self.copy_message(self.currentIndex())
+            return
+        super().keyPressEvent(event)
+
+    def show_context_menu(self, position):
+        index = self.indexAt(position)
+        if not index.isValid():
+            return
+        menu = QMenu(self)
+        menu.addAction("Copy Message", lambda: self.copy_message(index))
+        menu.exec(self.viewport().mapToGlobal(position))
+
+    def scroll_to_bottom(self):
+        self.scroll_pending = True
+        self.schedule_widget_sync()
@@ -8,6 +8,11 @@ import os
 import sys
 import logging
 import time
+
+COMPARISON_DEBOUNCE_MS = 250  # typing pauses this long before the comparison reruns
+OUTLINE_DEBOUNCE_MS = 400
+CLEAN = sys.maxsize  # no edits since the last comparison
+
 class PythonHighlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -223,12 +228,34 @@ class CompEditor(QWidget):
         self.text_edit.blockCountChanged.connect(self.update_line_number_area_width)
         self.text_edit.updateRequest.connect(self.update_line_number_area)
         self.text_edit.cursorPositionChanged.connect(self.highlight_current_line)
-        self.text_edit.textChanged.connect(self.update_file_outline)
+        self.text_edit.document().contentsChange.connect(self.on_contents_change)
         
         self.update_line_number_area_width(0)
 
         self.other_file_lines = []
+        self.other_revision = 0
         self.comparison_results = []
+        self.current_line_selections = []
+        self.comparison_selections = []
+        # The comparison with other_file_lines is rerun when the text changes, not when the cursor moves,
+        # and only for the lines edited since the last one. compared_lines and matching_blocks are what
+        # it last produced; clean_prefix/clean_suffix count the lines untouched since at either end
+        self.compared_lines = None
+        self.compared_key = None
+        self.matching_blocks = []
+        self.clean_prefix = CLEAN
+        self.clean_suffix = CLEAN
+        self.seen_revision = self.text_edit.document().revision()
+        self.comparison_job = None
+        self.comparison_timer = QTimer(self)
+        self.comparison_timer.setSingleShot(True)
+        self.comparison_timer.setInterval(COMPARISON_DEBOUNCE_MS)
+        self.comparison_timer.timeout.connect(self.start_comparison)
+        self.outline_timer = QTimer(self)
+        self.outline_timer.setSingleShot(True)
+        self.outline_timer.setInterval(OUTLINE_DEBOUNCE_MS)
+        self.outline_timer.timeout.connect(self.update_file_outline)
+        self.text_edit.textChanged.connect(self.outline_timer.start)
 
         self.ui_update_timer = QTimer()
         self.ui_update_timer.setSingleShot(True)
@@ -249,39 +276,110 @@ class CompEditor(QWidget):
         self.file_outline_widget.populate_file_outline(text)
 
     def highlight_current_line(self):
-        self.start_comparison()
-        extra_selections = []
+        self.current_line_selections = []
         if not self.text_edit.isReadOnly():
             selection = QTextEdit.ExtraSelection()
             selection.format.setBackground(self.current_line_color)
             selection.format.setProperty(QTextFormat.Property.FullWidthSelection, True)
             selection.cursor = self.text_edit.textCursor()
             selection.cursor.clearSelection()
-            extra_selections.append(selection)
-        self.text_edit.setExtraSelections(extra_selections)
+            self.current_line_selections.append(selection)
+        self.apply_extra_selections()
+
+    def apply_extra_selections(self):
+        self.text_edit.setExtraSelections(self.comparison_selections + self.current_line_selections)
+
+    def set_other_file_lines(self, lines):
+        """Compare this editor's text against lines (a list or a text) from now on."""
+        self.other_file_lines = lines.split('\n') if isinstance(lines, str) else list(lines)
+        self.other_revision += 1
+        self.compared_lines = None
+        self.comparison_timer.start()
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        document = self.text_edit.document()
+        if document.revision() == self.seen_revision and chars_removed == chars_added:
+            return  # only formats changed
+        self.seen_revision = document.revision()
+        last = document.characterCount() - 1
+        start_line = document.findBlock(min(position, last)).blockNumber()
+        end_line = document.findBlock(min(position + chars_added, last)).blockNumber()
+        self.clean_prefix = min(self.clean_prefix, start_line)
+        self.clean_suffix = min(self.clean_suffix, document.blockCount() - 1 - end_line)
+        if self.other_file_lines:
+            self.comparison_timer.start()
+
+    def comparison_key(self):
+        return self.text_edit.document().revision(), self.other_revision
 
     def start_comparison(self):
-        # Create the worker
-        worker = LineComparisonWorker(self.text_edit.toPlainText(), self.other_file_lines)
+        if not self.other_file_lines:
+            self.compared_lines = None
+            self.comparison_results = []
+            self.update_highlights()
+            return
+        key = self.comparison_key()
+        if key == self.compared_key:
+            return
+        lines = self.text_edit.toPlainText().split('\n')
+        other = self.other_file_lines
+        before, after = [], []
+        if self.compared_lines is not None:
+            # Keep the matches outside the edited lines and only rediff between the nearest kept ones
+            old_lines = self.compared_lines
+            prefix = min(self.clean_prefix, len(old_lines), len(lines))
+            suffix = min(self.clean_suffix, len(old_lines) - prefix, len(lines) - prefix)
+            old_end = len(old_lines) - suffix
+            shift = len(lines) - len(old_lines)
+            for i, j, n in self.matching_blocks[:-1]:
+                if i < prefix:
+                    before.append((i, j, min(n, prefix - i)))
+                if i + n > old_end:
+                    start = max(i, old_end)
+                    after.append((start + shift, j + start - i, i + n - start))
+        a_lo, b_lo = (before[-1][0] + before[-1][2], before[-1][1] + before[-1][2]) if before else (0, 0)
+        a_hi, b_hi = (after[0][0], after[0][1]) if after else (len(lines), len(other))
+        self.comparison_job = {'key': key, 'lines': lines, 'before': before, 'after': after,
+                               'a_lo': a_lo, 'b_lo': b_lo}
+        worker = LineComparisonWorker(lines[a_lo:a_hi], other[b_lo:b_hi], key)
         worker.signals.result.connect(self.on_comparison_finished)
-        
-        # Submit the worker to the thread pool
-        QThreadPool.globalInstance().start(worker)  
+        QThreadPool.globalInstance().start(worker)
 
     def on_comparison_finished(self, result):
-        self.comparison_results = result
+        key, blocks = result
+        job = self.comparison_job
+        if job is None or key != job['key'] or key != self.comparison_key():
+            return  # the text changed meanwhile, a newer comparison is on its way
+        a_lo, b_lo = job['a_lo'], job['b_lo']
+        lines = job['lines']
+        window = [(i + a_lo, j + b_lo, n) for i, j, n in blocks[:-1]]
+        self.matching_blocks = job['before'] + window + job['after'] + [(len(lines), len(self.other_file_lines), 0)]
+        self.compared_lines = lines
+        self.compared_key = key
+        self.clean_prefix = self.clean_suffix = CLEAN
+        self.comparison_job = None
+        self.comparison_results = self.line_statuses(lines, self.other_file_lines, self.matching_blocks)
         self.update_highlights()
-        self.update_line_indicators(result)
+
+    def line_statuses(self, lines, other, blocks):
+        # (line number, status) for every line of this text without an equal counterpart in other
+        statuses = []
+        i = j = 0
+        for block_i, block_j, n in blocks:
+            for offset in range(block_i - i):
+                line = i + offset
+                if j + offset < block_j:
+                    same = lines[line].strip() == other[j + offset].strip()
+                    statuses.append((line, "indentation" if same else "different"))
+                else:
+                    statuses.append((line, "no_match"))
+            i, j = block_i + n, block_j + n
+        return statuses
 
     def update_highlights(self):
-        cursor = QTextCursor(self.text_edit.document())
-        extra_selections = self.text_edit.extraSelections()
+        selections = []
+        document = self.text_edit.document()
         for i, status in self.comparison_results:
-            cursor = QTextCursor(self.text_edit.document().findBlockByNumber(i))
-            selection = QTextEdit.ExtraSelection()
-            selection.cursor = cursor
-            selection.cursor.select(QTextCursor.SelectionType.BlockUnderCursor)
-
             if status == "indentation":
                 color = QColor(173, 216, 230)  # Light blue
             elif status == "different":
@@ -292,11 +390,13 @@ class CompEditor(QWidget):
                 continue  # Skip identical lines
 
             selection = QTextEdit.ExtraSelection()
-            selection.cursor = cursor
+            selection.cursor = QTextCursor(document.findBlockByNumber(i))
             selection.format.setBackground(color)
-            extra_selections.append(selection)
+            selection.format.setProperty(QTextFormat.Property.FullWidthSelection, True)
+            selections.append(selection)
 
-        self.text_edit.setExtraSelections(extra_selections)
+        self.comparison_selections = selections
+        self.apply_extra_selections()
 
     def update_line_indicators(self, diff_data):
         self.text_edit.setExtraSelections([])
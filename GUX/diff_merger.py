@@ -10,6 +10,9 @@ from GUX.code_editor import CompEditor
 from AuraText.auratext.Core.CodeEditor import CodeEditor
 import logging
 import os
+from NITTY_GRITTY import diff_engine, merge_engine
+from NITTY_GRITTY import conflict_resolution_history
+from NITTY_GRITTY.code_segmenter import CodeSegmenter, merge_block_order
 class DiffHighlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -49,8 +52,8 @@ class InlineDiffWidget(QWidget):
         self.show_diff()
 
     def show_diff(self):
-        diff = difflib.ndiff(self.original_text.splitlines(True), 
-                             self.suggested_text.splitlines(True))
+        diff = diff_engine.ndiff(self.original_text.splitlines(True),
+                                 self.suggested_text.splitlines(True))
         
         html = []
         for line in diff:
@@ -70,6 +73,9 @@ class InlineDiffWidget(QWidget):
         pass
 class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
     key_symbols = ['def', 'class', 'import']
+    BLOCK_DIFF_CACHE_SIZE = 4096
+    RESOLUTION_SIDES = {'left': 'ours', 'right': 'theirs'}  # X is the file as it was, Y the suggestion
+    MERGE_LABELS = ('editor', 'merge result')
 
     def __init__(self, mm, original_text="", suggested_text="", file_path=None):
         super().__init__()  # No parent widget for a dialog
@@ -79,6 +85,13 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
         self.suggested_text = suggested_text
         self.isFullScreen = False  # Start as a normal window
         self.diff_data = {}
+        self.all_keys = []
+        self.key_index = {}  # block id -> position in all_keys
+        self.segmenter = CodeSegmenter(self.key_symbols)
+        self.block_diff_cache = {}  # (original hash, new hash) -> diff, kept across show_diff calls
+        self.merge_result = None
+        self.marked_merge = None  # (MergeResult, marked-up lines) while its conflicts wait in the result box
+        self.resolution_history = self.open_resolution_history()
         self.current_diff_index = -1
         self.current_line_index = 0
         self.diff_layout = QVBoxLayout()
@@ -210,13 +223,13 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
             self.update_position_indicators()
 
     def scroll_to_diff_index(self, index):
-        key = list(self.diff_data.keys())[index]
+        key = self.all_keys[index]
         self.scroll_to_diff_key(key)
         self.current_line_index = 0  # Reset the line index when scrolling to a new diff
         self.update_position_indicators()
 
     def scroll_to_diff_key(self, key):
-        self.current_diff_index = list(self.diff_data.keys()).index(key)
+        self.current_diff_index = self.key_index[key]
         diff_data = self.diff_data[key]
         
         # Use get() method with default value of 0
@@ -274,8 +287,13 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
         self.original_blocks = self.extract_code_blocks(self.x_box.text_edit.toPlainText())
         self.new_blocks = self.extract_code_blocks(self.y_box.text_edit.toPlainText())
 
+        # Blocks are matched by id; ones only on one side still get compared, placed after their predecessor
         use_original_order = self.use_original_order_checkbox.isChecked()
-        self.all_keys = list(self.original_blocks.keys()) if use_original_order else list(self.new_blocks.keys())
+        if use_original_order:
+            self.all_keys = merge_block_order(self.original_blocks, self.new_blocks)
+        else:
+            self.all_keys = merge_block_order(self.new_blocks, self.original_blocks)
+        self.key_index = {key: i for i, key in enumerate(self.all_keys)}
 
         for key in self.all_keys:
             self.compare_code_blocks(key, self.original_blocks.get(key, {}), self.new_blocks.get(key, {}))
@@ -284,13 +302,14 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
         
         # Add all non-conflicting blocks at the start until the first conflict
         self.add_non_conflicting_blocks_until_conflict()
+        self.suggest_side_for_next_conflict()
         
         # Ensure the diff view is updated
         self.diff_scroll_area.widget().update()
 
     def add_non_conflicting_blocks_until_conflict(self):
         for i, key in enumerate(self.all_keys):
-            if key in self.diff_data and self.is_conflict(self.diff_data[key]['diff']):
+            if key in self.diff_data and self.diff_data[key]['conflict']:
                 self.current_diff_index = i
                 break
             self.add_block(key)
@@ -312,33 +331,9 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
         return container
 
     def extract_code_blocks(self, text):
-        blocks = {}
-        lines = text.split('\n')
-        current_block = []
-        current_key = 'global'
-        start_line = 0
-
-        for i, line in enumerate(lines):
-            if line.strip().startswith(tuple(self.key_symbols)):
-                if current_block:
-                    blocks[current_key] = {
-                        'content': '\n'.join(current_block),
-                        'start_line': start_line,
-                        'end_line': i - 1
-                    }
-                current_key = line.strip()
-                current_block = [line]
-                start_line = i
-            else:
-                current_block.append(line)
-
-        if current_block:
-            blocks[current_key] = {
-                'content': '\n'.join(current_block),
-                'start_line': start_line,
-                'end_line': len(lines) - 1
-            }
-        return blocks
+        # Python (or no file) is cut along its syntax tree, anything else at key_symbols header lines
+        language = 'python' if not self.file_path or self.file_path.endswith('.py') else None
+        return self.segmenter.segment(text, language)
 
     def on_add_and_next_clicked(self, side):
         if self.current_diff_index >= len(self.all_keys):
@@ -348,8 +343,9 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
         while self.current_diff_index < len(self.all_keys):
             current_key = self.all_keys[self.current_diff_index]
             
-            if current_key in self.diff_data and self.is_conflict(self.diff_data[current_key]['diff']):
+            if current_key in self.diff_data and self.diff_data[current_key]['conflict']:
                 self.add_selected_side(self.diff_data[current_key]['diff'], side)
+                self.record_resolution(current_key, side)
                 self.current_diff_index += 1
                 break
             else:
@@ -362,11 +358,57 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
             self.add_remaining_blocks(side)
         else:
             self.status_bar.showMessage(f"Next conflict: {self.all_keys[self.current_diff_index]}")
+            self.suggest_side_for_next_conflict()
 
         # Ensure the result box scrolls to show the latest added content
         self.result_box.text_edit.moveCursor(QTextCursor.MoveOperation.End)
         self.result_box.text_edit.ensureCursorVisible()
 
+    def open_resolution_history(self):
+        # The core's shared history; a merger without one opens its own and closes it in done()
+        get_history = getattr(self.mm, 'get_conflict_resolution_history', None)
+        self.owns_resolution_history = get_history is None
+        if not self.owns_resolution_history:
+            return get_history()
+        settings_manager = getattr(self.mm, 'settings_manager', None)
+        return conflict_resolution_history.open_history(
+            settings_manager.get_value('app_data_dir') if settings_manager else None)
+
+    def done(self, result):
+        if self.owns_resolution_history and self.resolution_history is not None:
+            self.resolution_history.close()
+            self.resolution_history = None
+        super().done(result)
+
+    def block_conflict(self, key):
+        diff_data = self.diff_data[key]
+        return {'ours': diff_data['original'].get('content', '').split('\n'),
+                'theirs': diff_data['new'].get('content', '').split('\n')}
+
+    def record_resolution(self, key, side):
+        if self.resolution_history is not None:
+            self.resolution_history.record_resolution(self.block_conflict(key), self.RESOLUTION_SIDES[side])
+
+    def suggest_side_for_next_conflict(self):
+        # Make the button for the side similar past conflicts were resolved with the default (Enter)
+        self.add_and_next_x.setDefault(False)
+        self.add_and_next_y.setDefault(False)
+        if self.resolution_history is None:
+            return None
+        key = next((key for key in self.all_keys[self.current_diff_index:]
+                    if key in self.diff_data and self.diff_data[key]['conflict']), None)
+        if key is None:
+            return None
+        suggested = self.resolution_history.suggest_side(self.block_conflict(key))
+        if suggested is None:
+            return None
+        button = self.add_and_next_x if suggested == 'ours' else self.add_and_next_y
+        button.setDefault(True)
+        button.setFocus()
+        self.status_bar.showMessage(f"Next conflict: {key} (similar conflicts were resolved with "
+                                    f"{'X' if suggested == 'ours' else 'Y'})")
+        return suggested
+
     def add_selected_side(self, diff, side):
         lines_to_add = []
         for line in diff:
@@ -379,7 +421,7 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
     def add_remaining_blocks(self, side):
         for i in range(self.current_diff_index, len(self.all_keys)):
             key = self.all_keys[i]
-            if key in self.diff_data and self.is_conflict(self.diff_data[key]['diff']):
+            if key in self.diff_data and self.diff_data[key]['conflict']:
                 self.add_selected_side(self.diff_data[key]['diff'], side)
             else:
                 self.add_block(key)
@@ -404,16 +446,27 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
         return any(line.startswith('- ') or line.startswith('+ ') for line in diff)
 
     def compare_code_blocks(self, key, original_block, new_block):
-        original_lines = original_block.get('content', '').split('\n')
-        new_lines = new_block.get('content', '').split('\n')
-
-        diff = list(difflib.ndiff(original_lines, new_lines))
-        is_conflict = any(line.startswith('- ') or line.startswith('+ ') for line in diff)
+        cache_key = (original_block.get('hash'), new_block.get('hash'))
+        cached = self.block_diff_cache.get(cache_key)
+        if cached is None:
+            original_lines = original_block.get('content', '').split('\n')
+            if original_block and cache_key[0] == cache_key[1]:
+                # Unchanged block, nothing to diff
+                diff = ['  ' + line for line in original_lines]
+            else:
+                new_lines = new_block.get('content', '').split('\n')
+                diff = diff_engine.ndiff(original_lines, new_lines)
+            cached = (diff, self.is_conflict(diff))
+            if len(self.block_diff_cache) >= self.BLOCK_DIFF_CACHE_SIZE:
+                self.block_diff_cache.clear()
+            self.block_diff_cache[cache_key] = cached
+        diff, is_conflict = cached
 
         self.diff_data[key] = {
             'original': original_block,
             'new': new_block,
-            'diff': diff
+            'diff': diff,
+            'conflict': is_conflict
         }
 
         if is_conflict:
@@ -464,8 +517,60 @@ class DiffMergerWidget(QDialog):  # Change QWidget to QDialog
        def report_test_results(self):
         # Generate a report of the test results after merging
         pass
+    def current_editor_text(self):
+        editor_manager = self.mm.editor_manager
+        if self.file_path:
+            return editor_manager.get_file_content(self.file_path)
+        if editor_manager.current_editor:
+            return editor_manager.current_editor.toPlainText()
+        return None
+
+    def record_merge_resolutions(self, resolved_text):
+        # Conflicts apply_changes marked up and the user resolved by hand are learned like Add and Next
+        # choices. Each marked block is found in the resolved text through the lines around it; a block whose
+        # neighbours were edited too can't be told apart from those edits and is left out
+        merge_result, marked = self.marked_merge
+        self.marked_merge = None
+        if self.resolution_history is None:
+            return
+        marked = [line.rstrip('\r\n') for line in marked]
+        resolved = resolved_text.split('\n')
+        markers = ('<' * merge_engine.MARKER_SIZE + ' ', '>' * merge_engine.MARKER_SIZE + ' ')
+        if any(line.startswith(markers) for line in resolved):
+            return
+        image = {}  # marked line -> resolved line, for the lines left as they were
+        for tag, i1, i2, j1, j2 in diff_engine.opcodes(marked, resolved):
+            if tag == 'equal':
+                image.update(zip(range(i1, i2), range(j1, j2)))
+        for conflict, (start, end) in zip(merge_result.conflicts, merge_result.conflict_ranges(self.MERGE_LABELS)):
+            if (start > 0 and start - 1 not in image) or (end < len(marked) and end not in image):
+                continue
+            region = resolved[image[start - 1] + 1 if start > 0 else 0:image[end] if end < len(marked) else len(resolved)]
+            sides = {side: [line.rstrip('\r\n') for line in conflict.lines(side)] for side in merge_engine.SIDES}
+            side = next((side for side, lines in sides.items() if lines == region), None)
+            self.resolution_history.record_resolution(conflict, side or [line + '\n' for line in region])
+
     def apply_changes(self):
         merged_content = self.result_box.text_edit.toPlainText()
+        if self.marked_merge is not None:
+            self.record_merge_resolutions(merged_content)
+        # The result was made against original_text; if the editor changed since, merge rather than overwrite
+        current_content = self.current_editor_text()
+        if current_content is not None and current_content != self.original_text:
+            self.merge_result = merge_engine.merge3(self.original_text, current_content, merged_content)
+            if not self.merge_result.clean:
+                self.original_text = current_content  # applying again now only brings in the result box edits
+                marked = self.merge_result.lines(labels=self.MERGE_LABELS)
+                self.marked_merge = (self.merge_result, marked)
+                self.result_box.text_edit.setPlainText(''.join(marked))
+                self.result_box.text_edit.moveCursor(QTextCursor.MoveOperation.Start)
+                self.result_box.text_edit.find('<' * merge_engine.MARKER_SIZE)
+                self.status_bar.showMessage(
+                    f"{len(self.merge_result.conflicts)} conflict(s) with edits made in the editor meanwhile, "
+                    f"resolve them and apply again")
+                return
+            merged_content = self.merge_result.text()
+            logging.info(f"Merged with editor changes, {self.merge_result.auto_merged} hunk(s) merged automatically")
         if self.file_path:
             self.mm.editor_manager.update_editor_content(self.file_path, merged_content)
         else:
@@ -13,45 +13,56 @@ from PyQt6.QtWidgets import QMessageBox
 import os
 import re
 import logging
-from fuzzywuzzy import fuzz
-import asyncio
+import bisect
+import threading
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QListWidgetItem
+from NITTY_GRITTY.file_search import FileSearchEngine, MAX_RESULTS
+
+SEARCH_AS_YOU_TYPE_MS = 300
 
 class AsyncSearchWorker(QThread):
-    result_found = pyqtSignal(str, int, str)
-    search_completed = pyqtSignal()
+    results_found = pyqtSignal(int, list)  # search id, batch of (score, file_path, line, text)
+    search_completed = pyqtSignal(int)
 
-    def __init__(self, vault_path, query, file_types):
-        super().__init__()
+    def __init__(self, search_id, vault_path, query, file_types, engine, search_index=None, parent=None):
+        super().__init__(parent)
+        self.search_id = search_id
         self.vault_path = vault_path
         self.query = query
         self.file_types = file_types
+        self.engine = engine
+        self.search_index = search_index
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def wants_file(self, file_name):
+        return self.file_types == "All" or file_name.endswith(tuple(self.file_types))
+
+    def candidate_files(self):
+        # The search index narrows the query to the files that share most of its trigrams, ranked;
+        # without a usable index (short query, index not built yet) every file has to be read
+        candidates = self.search_index.candidates(self.query) if self.search_index else None
+        if candidates is not None:
+            logging.debug(f"Search index narrowed '{self.query}' to {len(candidates)} files")
+            return [os.path.join(self.vault_path, rel_path) for rel_path in candidates if self.wants_file(rel_path)]
+        files = []
+        for root, _, names in os.walk(self.vault_path):
+            files.extend(os.path.join(root, name) for name in names if self.wants_file(name))
+        return files
 
-    async def search_file(self, file_path):
+    def run(self):
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                filename_score = fuzz.partial_ratio(self.query, os.path.basename(file_path))
-                if filename_score > 70:
-                    self.result_found.emit(file_path, 0, "[Filename Match]")
-                
-                for i, line in enumerate(content.splitlines(), 1):
-                    if fuzz.partial_ratio(self.query, line) > 70:
-                        self.result_found.emit(file_path, i, line.strip())
+            for batch in self.engine.search(self.query, self.candidate_files(), self.cancelled):
+                if self.cancelled.is_set():
+                    return
+                self.results_found.emit(self.search_id, batch)
         except Exception as e:
-            logging.error(f"Error searching file {file_path}: {e}")
-
-    async def search_files(self):
-        tasks = []
-        for root, _, files in os.walk(self.vault_path):
-            for file in files:
-                if self.file_types == "All" or file.endswith(tuple(self.file_types)):
-                    file_path = os.path.join(root, file)
-                    tasks.append(self.search_file(file_path))
-        await asyncio.gather(*tasks)
-
-    def run(self):
-        asyncio.run(self.search_files())
-        self.search_completed.emit()
+            logging.error(f"Error searching for '{self.query}': {e}")
+        if not self.cancelled.is_set():
+            self.search_completed.emit(self.search_id)
 
 class FileSearchWidget(QDialog):
     file_selected = pyqtSignal(str, int)
@@ -59,6 +70,14 @@ class FileSearchWidget(QDialog):
     def __init__(self, vault_manager=None, parent=None):
         super().__init__(parent)
         self.vault_manager = vault_manager
+        # The core's engine when there is one; a standalone widget owns its engine and shuts it down in done()
+        cccore = getattr(vault_manager, 'cccore', None)
+        self.search_engine = getattr(cccore, 'file_search_engine', None)
+        self.owns_search_engine = self.search_engine is None
+        if self.owns_search_engine:
+            self.search_engine = FileSearchEngine()
+        self.search_worker = None
+        self.search_id = 0
         self.setWindowTitle("File Search")
         self.setModal(True)
         self.setup_ui()
@@ -91,6 +110,13 @@ class FileSearchWidget(QDialog):
         self.results_label = QLabel("Results: 0")
         layout.addWidget(self.results_label)
 
+        # Typing restarts the timer, the search runs once the query settles and replaces the running one
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_AS_YOU_TYPE_MS)
+        self.search_timer.timeout.connect(self.search_as_you_type)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
         self.search_button.clicked.connect(self.perform_search)
         self.search_input.returnPressed.connect(self.perform_search)
         self.results_list.itemClicked.connect(self.show_preview)
@@ -98,11 +124,24 @@ class FileSearchWidget(QDialog):
 
         self.resize(800, 600)
 
+    def search_as_you_type(self):
+        # One or two characters would mean a full scan of the vault on every keystroke, wait for Enter
+        if len(self.search_input.text()) >= 3:
+            self.perform_search()
+
+    def cancel_search(self):
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.search_worker = None
+
     def perform_search(self):
+        self.search_timer.stop()
         query = self.search_input.text().lower()
+        self.cancel_search()
         if not query:
             return
 
+        self.search_id += 1
         self.results_list.clear()
         self.preview_text.clear()
 
@@ -123,9 +162,13 @@ class FileSearchWidget(QDialog):
             return
 
         file_types = self.get_selected_file_types()
-        self.search_worker = AsyncSearchWorker(vault_path, query, file_types)
-        self.search_worker.result_found.connect(self.add_search_result)
+        vault = self.vault_manager.get_current_vault()
+        search_index = vault.open_search_index() if vault else None
+        self.search_worker = AsyncSearchWorker(self.search_id, vault_path, query, file_types,
+                                               self.search_engine, search_index, parent=self)
+        self.search_worker.results_found.connect(self.add_search_results)
         self.search_worker.search_completed.connect(self.search_completed)
+        self.search_worker.finished.connect(self.search_worker.deleteLater)
         self.search_worker.start()
 
     def get_selected_file_types(self):
@@ -139,17 +182,40 @@ class FileSearchWidget(QDialog):
         elif selected == "C++ (.cpp, .h)":
             return [".cpp", ".h"]
 
-    @pyqtSlot(str, int, str)
-    def add_search_result(self, file_path, line_number, content):
-        relative_path = os.path.relpath(file_path, self.vault_manager.get_current_vault_path())
-        item_text = f"{relative_path} (Line {line_number}): {content}"
-        self.results_list.addItem(item_text)
+    @pyqtSlot(int, list)
+    def add_search_results(self, search_id, batch):
+        # Batches of a replaced search can still be queued, and the list stays sorted best first
+        if search_id != self.search_id:
+            return
+        vault_path = self.vault_manager.get_current_vault_path()
+        scores = [-self.results_list.item(row).data(Qt.ItemDataRole.UserRole)
+                  for row in range(self.results_list.count())]
+        for score, file_path, line_number, content in batch:
+            row = bisect.bisect_right(scores, -score)
+            if row >= MAX_RESULTS:
+                continue
+            relative_path = os.path.relpath(file_path, vault_path)
+            item = QListWidgetItem(f"{relative_path} (Line {line_number}): {content}")
+            item.setData(Qt.ItemDataRole.UserRole, score)
+            self.results_list.insertItem(row, item)
+            scores.insert(row, -score)
+        while self.results_list.count() > MAX_RESULTS:
+            self.results_list.takeItem(self.results_list.count() - 1)
         self.results_label.setText(f"Results: {self.results_list.count()}")
 
-    @pyqtSlot()
-    def search_completed(self):
+    @pyqtSlot(int)
+    def search_completed(self, search_id):
+        if search_id != self.search_id:
+            return
         self.results_label.setText(f"Results: {self.results_list.count()} (Search completed)")
 
+    def done(self, result):
+        self.search_timer.stop()
+        self.cancel_search()
+        if self.owns_search_engine:
+            self.search_engine.shutdown()
+        super().done(result)
+
     def show_preview(self, item):
         text = item.text()
         file_path = text.split(' (Line')[0]
@@ -145,6 +145,7 @@ class VaultGraphView(QMainWindow):
             self.graph_widget.addItem(text)
 
     def refresh_graph(self):
+        self.vault.indexer.reset()
         self.vault.update_index()
         self.build_graph()
 
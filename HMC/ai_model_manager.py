@@ -1,17 +1,16 @@
 import os
 import subprocess
 import logging
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
+from PyQt6.QtCore import QObject, pyqtSignal, QThread, QThreadPool
 from transformers import pipeline
 import time
+import threading
 import psutil
 import hashlib
 import requests
 from PyQt6.QtCore import QTimer
 from PyQt6.QtCore import QProcess
 from llama_cpp import Llama
-import anthropic
-import openai  # Add this import
 
 from PyQt6.QtCore import QSettings
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -21,6 +20,11 @@ from heapq import nlargest
 from collections import Counter
 import re
 from collections import deque
+from NITTY_GRITTY.memory_index import MemoryIndex
+from NITTY_GRITTY.remote_client import get_remote_client, provider_for_model
+from NITTY_GRITTY.local_session import LocalInferenceSession
+from NITTY_GRITTY.ThreadTrackers import SafeQRunnable
+from NITTY_GRITTY.model_catalog import DEFAULT_REPO_ID, ModelCatalogCache, ModelCatalogWorker
 # Define threshold
 
 threshold = 0.5
@@ -30,6 +34,7 @@ class AIMemoryManager:
         self.code_memory = []
         self.project_memory = deque(maxlen=max_memories)
         self.vectorizer = TfidfVectorizer(stop_words='english')
+        self.memory_index = MemoryIndex()
 
     def add_memory(self, description, content, memory_type='code'):
         if memory_type == 'code':
@@ -38,8 +43,10 @@ class AIMemoryManager:
                 description = f"File: {os.path.abspath(file_path)}"
             if self.should_remember_code(content):
                 self.code_memory.append((description, content))
+                self.memory_index.add(content)
         elif memory_type == 'project':
             self.project_memory.append((description, content))
+            self.memory_index.add(content)
 
     def should_remember_code(self, content):
         relevant_keywords = ['def ', 'class ', 'import ', 'from ', 'if __name__']
@@ -47,6 +54,7 @@ class AIMemoryManager:
 
     def add_project_info(self, info_type, content):
         self.project_memory.append((info_type, content))
+        self.memory_index.add(content)
 
     def get_memory(self, description, memory_type='code'):
         memory = self.code_memory if memory_type == 'code' else self.project_memory
@@ -56,10 +64,9 @@ class AIMemoryManager:
         return None
 
     def get_relevant_memories(self, query, top_n=3):
+        # One BM25 pass over all memories instead of scoring (and refitting TF-IDF for) each one
         all_memories = self.code_memory + list(self.project_memory)
-        scored_memories = [(desc, content, self.relevance_score(query, content)) 
-                           for desc, content in all_memories]
-        sorted_memories = sorted(scored_memories, key=lambda x: x[2], reverse=True)
+        sorted_memories = [(*all_memories[i], score) for i, score in self.memory_index.top_k(query, all_memories, top_n)]
         logging.debug(f"Sorted memories (top {top_n}): {sorted_memories[:top_n]}")
         return [(f"File: {os.path.abspath(desc.split('File: ', 1)[1])}", content, score) if desc.startswith("File:") else (desc, content, score) for desc, content, score in sorted_memories[:top_n]]
         #wow
@@ -99,53 +106,205 @@ class AIMemoryManager:
 
 class ModelLoadWorker(QThread):
     progress = pyqtSignal(int, int)  # bytes_downloaded, total_bytes
-    finished = pyqtSignal(Llama)
+    finished = pyqtSignal(object)  # LocalInferenceSession
     error = pyqtSignal(str)
     
-    def __init__(self, repo_id, filename):
+    def __init__(self, repo_id, filename, model_path=None, session_path=None, prompt_cache_bytes=0,
+                 session_pool=None):
         super().__init__()
         self.repo_id = repo_id
         self.filename = filename
+        self.model_path = model_path  # a GGUF already on disk, loaded as is
+        self.session_path = session_path  # saved evaluated context to restore, if there is one
+        self.prompt_cache_bytes = prompt_cache_bytes
+        self.session_pool = session_pool  # where sessions are saved; a save of this model must land first
 
     def run(self):
         try:
             def progress_callback(bytes_downloaded, total_bytes):
                 self.progress.emit(bytes_downloaded, total_bytes)
 
-            model = Llama.from_pretrained(
-                repo_id=self.repo_id,
-                filename=self.filename,
-                n_ctx=6000,
-                progress_callback=progress_callback
-            )
-            self.finished.emit(model)
+            if self.model_path:
+                model = Llama(model_path=self.model_path, n_ctx=6000)
+            else:
+                model = Llama.from_pretrained(
+                    repo_id=self.repo_id,
+                    filename=self.filename,
+                    n_ctx=6000,
+                    progress_callback=progress_callback
+                )
+            session = LocalInferenceSession(model, self.filename.replace('.gguf', ''),
+                                            prompt_cache_bytes=self.prompt_cache_bytes)
+            if self.session_path:
+                if self.session_pool is not None:
+                    self.session_pool.waitForDone()
+                session.restore(self.session_path)
+            self.finished.emit(session)
         except Exception as e:
             self.error.emit(str(e))
 
+STREAM_EMIT_INTERVAL_MS = 50  # coalesce streamed tokens into one partial_response at most this often...
+STREAM_EMIT_TOKENS = 16  # ...or once this many tokens are waiting
+REMOTE_MAX_TOKENS = 1000
+LOCAL_MAX_TOKENS = 1000
+
+
+class StreamCoalescer:
+    # Collects streamed text, hands it on in batches and keeps the TTFT / tokens per second numbers
+    def __init__(self, emit_partial, emit_metrics, emit_interval_ms=STREAM_EMIT_INTERVAL_MS,
+                 emit_tokens=STREAM_EMIT_TOKENS):
+        self.emit_partial = emit_partial
+        self.emit_metrics = emit_metrics
+        self.emit_interval = emit_interval_ms / 1000
+        self.emit_tokens = emit_tokens
+        self.start = time.perf_counter()
+        self.first_token_time = None
+        self.last_emit = self.start
+        self.tokens = 0
+        self.parts = []
+        self.pending = []
+
+    def metrics(self, now, cancelled=False):
+        decode_time = now - self.first_token_time if self.first_token_time is not None else 0
+        return {
+            'ttft': self.first_token_time - self.start if self.first_token_time is not None else None,
+            'tokens': self.tokens,
+            'tokens_per_second': self.tokens / decode_time if decode_time > 0 else 0.0,
+            'elapsed': now - self.start,
+            'cancelled': cancelled,
+        }
+
+    def add(self, text):
+        now = time.perf_counter()
+        self.tokens += 1
+        self.parts.append(text)
+        self.pending.append(text)
+        # The first token goes out on its own so the reply starts showing right away
+        if (self.first_token_time is None or len(self.pending) >= self.emit_tokens
+                or now - self.last_emit >= self.emit_interval):
+            if self.first_token_time is None:
+                self.first_token_time = now
+            self.emit_partial(''.join(self.pending))
+            self.emit_metrics(self.metrics(now))
+            self.pending = []
+            self.last_emit = now
+
+    def finish(self, label, cancelled=False, timings=None):
+        if self.pending:
+            self.emit_partial(''.join(self.pending))
+            self.pending = []
+        final_metrics = self.metrics(time.perf_counter(), cancelled)
+        if timings:
+            final_metrics.update(timings)
+        self.emit_metrics(final_metrics)
+        logging.info(f"{label} generation {'cancelled' if cancelled else 'finished'}: "
+                     f"{self.tokens} tokens, TTFT {final_metrics['ttft'] or 0:.2f} s, "
+                     f"{final_metrics['tokens_per_second']:.1f} tok/s"
+                     + (f", prompt {final_metrics['reused_tokens']}/{final_metrics['prompt_tokens']} tokens reused, "
+                        f"{final_metrics['evaluated_tokens']} evaluated in {final_metrics['prompt_eval_time']:.2f} s"
+                        if timings else ""))
+        return ''.join(self.parts)
+
+
 class GenerateWorker(QThread):
     finished = pyqtSignal(str, str)  # response, chat_type
     error = pyqtSignal(str, str)  # error message, chat_type
-    partial_response = pyqtSignal(str, str)  # partial response, chat_type
+    partial_response = pyqtSignal(str, str)  # newly generated text since the last one, chat_type
+    # ttft, tokens, tokens_per_second, elapsed, cancelled, plus the session's prompt/generation timings
+    # on the final one; chat_type
+    metrics = pyqtSignal(dict, str)
 
-    def __init__(self, model, messages, max_tokens, chat_type):
+    def __init__(self, session, messages, max_tokens, chat_type,
+                 emit_interval_ms=STREAM_EMIT_INTERVAL_MS, emit_tokens=STREAM_EMIT_TOKENS):
         super().__init__()
-        self.model = model
+        self.session = session
         self.messages = messages
         self.max_tokens = max_tokens
         self.chat_type = chat_type
+        self.emit_interval_ms = emit_interval_ms
+        self.emit_tokens = emit_tokens
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
 
     def run(self):
+        coalescer = StreamCoalescer(lambda text: self.partial_response.emit(text, self.chat_type),
+                                    lambda metrics: self.metrics.emit(metrics, self.chat_type),
+                                    self.emit_interval_ms, self.emit_tokens)
         try:
-            response = self.model.create_chat_completion(
-                messages=self.messages,
-                max_tokens=self.max_tokens
-            )
-            for partial in response['choices'][0]['message']['content']:
-                self.partial_response.emit(partial, self.chat_type)
-            self.finished.emit(response['choices'][0]['message']['content'], self.chat_type)
+            stream = self.session.stream_chat(self.messages, self.max_tokens)
+            try:
+                for chunk in stream:
+                    if self.cancelled.is_set():
+                        break
+                    text = chunk['choices'][0]['delta'].get('content')
+                    if text:
+                        coalescer.add(text)
+            finally:
+                # Closing the generator is what stops llama.cpp from decoding the rest after a cancel
+                stream.close()
+            response = coalescer.finish("Local", self.cancelled.is_set(), self.session.last_timings)
+            self.finished.emit(response, self.chat_type)
         except Exception as e:
             self.error.emit(str(e), self.chat_type)
 
+
+class RemoteGenerateWorker(QObject):
+    # Same signals as GenerateWorker, but no thread of its own: the request runs on the remote client's
+    # asyncio loop and the signals are emitted from there (queued over to the GUI thread)
+    finished = pyqtSignal(str, str)  # response, chat_type
+    error = pyqtSignal(str, str)  # error message, chat_type
+    partial_response = pyqtSignal(str, str)  # newly generated text since the last one, chat_type
+    metrics = pyqtSignal(dict, str)  # ttft, tokens, tokens_per_second, elapsed, cancelled; chat_type
+
+    def __init__(self, client, provider, model, messages, max_tokens, chat_type, api_key=None, base_url=None):
+        super().__init__()
+        self.client = client
+        self.provider = provider
+        self.model = model
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.chat_type = chat_type
+        self.api_key = api_key
+        self.base_url = base_url
+        self.future = None
+        self.lock = threading.Lock()
+        self.done = False
+        self.coalescer = StreamCoalescer(lambda text: self.partial_response.emit(text, self.chat_type),
+                                         lambda metrics: self.metrics.emit(metrics, self.chat_type))
+
+    def start(self):
+        self.future = self.client.submit(self.provider, self.model, self.messages, self.max_tokens,
+                                         self.api_key, self.on_delta, self.base_url)
+        self.future.add_done_callback(self.on_done)
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def cancel(self):
+        if self.future is not None:
+            self.client.cancel(self.future)
+
+    def on_delta(self, text):
+        with self.lock:
+            # A chunk can still land between cancel() and the request task actually stopping
+            if not self.done:
+                self.coalescer.add(text)
+
+    def on_done(self, future):
+        with self.lock:
+            self.done = True
+            if future.cancelled():
+                self.finished.emit(self.coalescer.finish(self.provider, cancelled=True), self.chat_type)
+                return
+            error = future.exception()
+            if error is None:
+                self.finished.emit(self.coalescer.finish(self.provider), self.chat_type)
+        if error is not None:
+            logging.error(f"Remote generation with {self.model} failed: {error}")
+            self.error.emit(str(error), self.chat_type)
+
 class ModelManager(QObject):
     model_loading = pyqtSignal()
     model_loaded = pyqtSignal(str)
@@ -154,65 +313,150 @@ class ModelManager(QObject):
     generation_finished = pyqtSignal(str, str)  # response, chat_type
     generation_error = pyqtSignal(str, str)  # error message, chat_type
     partial_response = pyqtSignal(str, str)  # partial response, chat_type
+    generation_metrics = pyqtSignal(dict, str)  # streaming metrics, chat_type
+    local_models_found = pyqtSignal(list)  # a batch of [{'name', 'source', ...}] from ModelCatalogWorker
+    local_models_error = pyqtSignal(str)
+    local_models_discovered = pyqtSignal()  # every source has reported
     memory_manager = AIMemoryManager()
 
     def __init__(self, settings):
         super().__init__()
         self.settings = settings
         self.local_model = None
-        self.openai_client = None
-        self.anthropic_client = None
+        self.local_session = None  # the resident model and its evaluated context
+        self.pending_local_generation = None  # (messages, chat_type) waiting for the model to load
+        self.remote_client = get_remote_client()
+        self.remote_workers = set()  # requests in flight, several can run at once
         self.current_local_model_name = None
         self.current_remote_model_name = None
         self.generate_worker = None
         self.load_worker = None
+        self.catalog_worker = None
+        # Sessions are pickled here, one at a time, instead of on the GUI thread
+        self.session_pool = QThreadPool()
+        self.session_pool.setMaxThreadCount(1)
+        self.local_model_files = {}  # file name -> path of GGUFs found on disk
         self.static_model_name = "Llama-3.1-SuperNova-Lite-8.0B-OQ8_0.EF32.IQ4_K-Q8_0-GGUF"  # Add this line
 
     def load_model(self, model_type, filename, repo_id=None):
-        self.model_loading.emit()
         if model_type == 'local':
             if repo_id is None:
-                repo_id = "Joseph717171/Llama-3.1-SuperNova-Lite-8.0B-OQ8_0.EF32.IQ4_K-Q8_0-GGUF"
-            
-            self.load_worker = ModelLoadWorker(repo_id, filename)
+                repo_id = DEFAULT_REPO_ID
+            # The model stays resident: asking for the one already loaded (or loading) costs nothing
+            if self.local_session is not None and self.local_session.name == filename.replace('.gguf', ''):
+                self.model_loaded.emit(f"Local: {self.current_local_model_name}")
+                return
+            if (self.load_worker is not None and self.load_worker.isRunning()
+                    and self.load_worker.filename == filename):
+                return
+            self.model_loading.emit()
+            self.load_worker = ModelLoadWorker(
+                repo_id, filename, self.local_model_files.get(filename),
+                session_path=self.local_session_path(filename.replace('.gguf', '')),
+                prompt_cache_bytes=int(self.get_setting('local_prompt_cache_mb', 0) or 0) * 2 ** 20,
+                session_pool=self.session_pool)
             self.load_worker.progress.connect(self.model_download_progress)
             self.load_worker.finished.connect(self.on_local_model_loaded)
             self.load_worker.error.connect(self.on_local_model_load_error)  # Change this line
             self.load_worker.start()
         elif model_type == 'remote':
+            self.model_loading.emit()
             self.current_remote_model_name = filename
             self.model_loaded.emit(f"Remote: {self.current_remote_model_name}")
 
     def generate(self, messages, chat_type, model_name):
         if chat_type == 'local':
-            if self.local_model is None:
+            if self.local_session is None:
+                # Runs from on_local_model_loaded; a newer request replaces an older one still waiting
+                self.pending_local_generation = (messages, chat_type)
                 self.load_model('local', model_name)
-           
-            self.generate_worker = GenerateWorker(self.local_model, messages, 1000, chat_type)
-            self.generate_worker.finished.connect(self.generation_finished)
-            self.generate_worker.error.connect(self.generation_error)
-            self.generate_worker.partial_response.connect(self.partial_response)
-            self.generate_worker.start()
-        
-            
+                return
+            self.start_local_generation(messages, chat_type)
         elif chat_type == 'remote':
             if not self.current_remote_model_name:
                 raise ValueError("Remote model is not configured. Please set up the remote model first.")
             
-            if self.current_remote_model_name in ['gpt-3.5-turbo', 'gpt-4']:
-                response = openai.ChatCompletion.create(
-                    model=self.current_remote_model_name,
-                    messages=messages
-                )
-                self.generation_finished.emit(response.choices[0].message.content, 'remote')
-            elif self.current_remote_model_name in ['Claude-3-5-Sonnet-20240620']:
-                client = anthropic.Client(api_key=self.settings['anthropic_api_key'])
-                response = client.completion(
-                    model=self.current_remote_model_name,
-                    prompt="\n\n".join([f"{m['role']}: {m['content']}" for m in messages]),
-                    max_tokens_to_sample=1000,
-                )
-                self.generation_finished.emit(response.completion, 'remote')
+            provider = provider_for_model(self.current_remote_model_name)
+            worker = RemoteGenerateWorker(self.remote_client, provider, self.current_remote_model_name, messages,
+                                          REMOTE_MAX_TOKENS, chat_type,
+                                          api_key=self.get_setting(f"{provider}_api_key"),
+                                          base_url=self.get_setting(f"{provider}_base_url"))
+            worker.finished.connect(self.generation_finished)
+            worker.error.connect(self.generation_error)
+            worker.partial_response.connect(self.partial_response)
+            worker.metrics.connect(self.generation_metrics)
+            worker.finished.connect(lambda *_: self.remote_workers.discard(worker))
+            worker.error.connect(lambda *_: self.remote_workers.discard(worker))
+            self.remote_workers.add(worker)
+            worker.start()
+
+    def discover_local_models(self, repo_id=None, force_refresh=False):
+        """List the local models in the background; results arrive through local_models_found."""
+        if self.catalog_worker is not None and self.catalog_worker.isRunning():
+            return
+        app_data_dir = self.get_setting('app_data_dir') or os.path.join(os.path.expanduser("~"), ".computinator_code")
+        cache = ModelCatalogCache(os.path.join(app_data_dir, "model_catalog.json"))
+        self.catalog_worker = ModelCatalogWorker(cache, repo_id or DEFAULT_REPO_ID, force_refresh=force_refresh)
+        self.catalog_worker.models_found.connect(self.on_local_models_found)
+        self.catalog_worker.catalog_error.connect(self.local_models_error)
+        self.catalog_worker.finished.connect(self.local_models_discovered)
+        self.catalog_worker.start()
+
+    def on_local_models_found(self, models):
+        for model in models:
+            if model.get('path'):
+                self.local_model_files[model['name']] = model['path']
+        self.local_models_found.emit(models)
+
+    def start_local_generation(self, messages, chat_type):
+        self.generate_worker = GenerateWorker(self.local_session, messages, LOCAL_MAX_TOKENS, chat_type)
+        self.generate_worker.finished.connect(self.generation_finished)
+        self.generate_worker.error.connect(self.generation_error)
+        self.generate_worker.partial_response.connect(self.partial_response)
+        self.generate_worker.metrics.connect(self.generation_metrics)
+        self.generate_worker.start()
+
+    def get_setting(self, key, default=None):
+        # The SettingsManager in the app, but a QSettings or a plain dict get passed in as well
+        if hasattr(self.settings, 'get_value'):
+            return self.settings.get_value(key, default)
+        if hasattr(self.settings, 'value'):
+            return self.settings.value(key, default)
+        return self.settings.get(key, default) if self.settings else default
+
+    def local_session_path(self, model_name):
+        app_data_dir = self.get_setting('app_data_dir') or os.path.join(os.path.expanduser("~"), ".computinator_code")
+        return os.path.join(app_data_dir, "llama_sessions", f"{model_name}.session")
+
+    def save_local_session(self):
+        """Queue a write of the local model's evaluated context to disk, so the next start doesn't re-evaluate it.
+        The save waits on the session lock for a cancelled generation to wind down."""
+        if self.local_session is None:
+            return False
+        if self.generate_worker is not None and self.generate_worker.isRunning():
+            self.generate_worker.cancel()
+        session = self.local_session
+        self.session_pool.start(SafeQRunnable(self.write_local_session, session,
+                                              self.local_session_path(session.name)))
+        return True
+
+    def write_local_session(self, session, path):
+        try:
+            session.save(path)
+        except Exception as e:
+            logging.error(f"Failed to save local session for {session.name}: {e}")
+
+    def cleanup(self):
+        self.save_local_session()
+        self.cancel_generation()
+        # The app is quitting, the save has to reach the disk before the process goes
+        self.session_pool.waitForDone()
+
+    def cancel_generation(self):
+        if self.generate_worker is not None and self.generate_worker.isRunning():
+            self.generate_worker.cancel()
+        for worker in list(self.remote_workers):
+            worker.cancel()
 
     def on_generation_finished(self, response, chat_type):
         self.generation_finished.emit(response, chat_type)
@@ -253,10 +497,17 @@ class ModelManager(QObject):
         else:
             raise ValueError(f"Unknown model: {model_name}")
 
-    def on_local_model_loaded(self, model):
-        self.local_model = model
-        self.current_local_model_name = self.load_worker.filename.replace('.gguf', '')
+    def on_local_model_loaded(self, session):
+        # Switching models: keep what the old one evaluated for when it comes back
+        self.save_local_session()
+        self.local_model = session.model
+        self.current_local_model_name = session.name
+        self.local_session = session
         self.model_loaded.emit(f"Local: {self.current_local_model_name}")
+        if self.pending_local_generation is not None:
+            messages, chat_type = self.pending_local_generation
+            self.pending_local_generation = None
+            self.start_local_generation(messages, chat_type)
 
     def on_model_error(self, error):
         self.model_error.emit(str(error))
@@ -38,6 +38,8 @@ import time
 import logging
 from PyQt6.QtCore import QTimer, pyqtSignal, QObject
 from .macro_manager import MacroManager
+from NITTY_GRITTY.file_search import FileSearchEngine
+from NITTY_GRITTY import conflict_resolution_history
 
 class CCCore(QObject):  # referred to as mm in other files (auratext)
     lsp_manager_initialized = pyqtSignal()
@@ -61,6 +63,9 @@ class CCCore(QObject):  # referred to as mm in other files (auratext)
         self.macro_manager = MacroManager(self)
         self.env_manager = EnvironmentManager(self.settings_manager.get_value("environments_path", "./environments"))
         self.vault_manager = VaultManager(self.settings_manager, cccore=self)
+        # One search engine (and process pool) shared by every FileSearchWidget, shut down in cleanup
+        self.file_search_engine = FileSearchEngine()
+        self.conflict_resolution_history = None  # shared by every diff merger, opened on first use
         self.ai_memory_manager = AIMemoryManager()
         # Add debug logging
         logging.debug(f"Initializing CCCore. Default vault path: {self.settings_manager.get_value('app_data_dir')}")
@@ -100,6 +105,10 @@ class CCCore(QObject):  # referred to as mm in other files (auratext)
         self.late_init()
         
     def init_managers(self):
+        # main.py calls this again after construction; building every manager twice only cost startup time
+        if getattr(self, 'managers_initialized', False):
+            return
+        self.managers_initialized = True
         self.db_manager = DatabaseManager('local')
         from HMC.ai_model_manager import ModelManager
         self.model_manager = ModelManager(self.settings_manager)
@@ -297,7 +306,7 @@ class CCCore(QObject):  # referred to as mm in other files (auratext)
         logging.info("Starting CCCore cleanup")
         managers_to_cleanup = [
             'thread_controller', 'process_manager', 'lsp_manager',
-            'file_manager', 'download_manager', 'build_manager'
+            'file_manager', 'download_manager', 'build_manager', 'model_manager'
         ]
         for manager_name in managers_to_cleanup:
             if hasattr(self, manager_name):
@@ -305,7 +314,16 @@ class CCCore(QObject):  # referred to as mm in other files (auratext)
                 if hasattr(manager, 'cleanup'):
                     logging.info(f"Cleaning up {manager_name}")
                     manager.cleanup()
+        self.file_search_engine.shutdown()
+        if self.conflict_resolution_history is not None:
+            self.conflict_resolution_history.close()
+            self.conflict_resolution_history = None
         logging.info("CCCore cleanup complete")
+    def get_conflict_resolution_history(self):
+        if self.conflict_resolution_history is None:
+            self.conflict_resolution_history = conflict_resolution_history.open_history(
+                self.settings_manager.get_value('app_data_dir'))
+        return self.conflict_resolution_history
     def get_project_manager(self):
         return self.project_manager
     def get_vault_manager(self):
@@ -3,47 +3,89 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import os
-from transformers import AutoTokenizer, BasicTokenizer
+import hashlib
 import logging
 import re
+from collections import deque
+from pathlib import Path
+from PyQt6.QtCore import QThreadPool
+from NITTY_GRITTY.tokenizer_registry import get_tokenizer_registry, DEFAULT_TOKENIZER_MODEL
+from NITTY_GRITTY.ThreadTrackers import SafeQRunnable
+
+CHUNK_CANDIDATES = 40  # chunks fetched per search before fitting them into the token budget
+TOKEN_COUNT_SLACK = 512  # counts kept beyond the live contexts' (chunks, messages) before the cache is trimmed
+
+class ContextEntry(tuple):
+    # Still unpacks as (description, content) everywhere, but remembers its token count
+    def __new__(cls, description, content, tokens):
+        entry = super().__new__(cls, (description, content))
+        entry.tokens = tokens
+        return entry
+
 
 class ContextManager:
-    def __init__(self, cccore, max_tokens=4000, max_file_size=1024*1024, model_name="arcee-ai/Llama-3.1-SuperNova-Lite"):
+    def __init__(self, cccore, max_tokens=4000, max_file_size=1024*1024, model_name=DEFAULT_TOKENIZER_MODEL):
         self.cccore = cccore
         self.max_tokens = max_tokens
         self.max_file_size = max_file_size
-        self.tokenizer = self.load_tokenizer(model_name)
+        self.tokenizer_registry = get_tokenizer_registry()
+        self.model_name = None
+        self.load_tokenizer(model_name)
         self.memory_manager = cccore.model_manager.memory_manager #this is after the model manager is initialized
-        self.contexts = []  # Keep this for backward compatibility
+        self.contexts = deque()  # Keep this for backward compatibility
+        # Token counts by content hash, valid for counted_with; total_tokens is the sum over self.contexts
+        self.token_counts = {}
+        self.counted_with = None
+        self.total_tokens = 0
+        # Chunk index writes wait on the vault indexer's transaction, so they run here, one at a time and in order
+        self.chunk_pool = QThreadPool()
+        self.chunk_pool.setMaxThreadCount(1)
+        self.outside_chunks = {}  # chunk key -> chunk index, for attached files outside the vault
+        self.purged_chunk_indexes = set()
 
     def load_tokenizer(self, model_name):
-        try:
-            return AutoTokenizer.from_pretrained(model_name)
-        except Exception as e:
-            logging.warning(f"Failed to load AutoTokenizer: {e}")
-            return tiktoken.get_encoding("cl100k_base")  # Fallback to tiktoken
+        # Returns immediately; the registry loads the model's tokenizer in the background and
+        # tiktoken counts tokens until it's ready
+        self.model_name = model_name
+        self.tokenizer_registry.request(model_name)
+        return self.tokenizer
+
+    @property
+    def tokenizer(self):
+        return self.tokenizer_registry.get(self.model_name)
 
     def add_context(self, content, description, file_path=None, memory_type='code'):
         if file_path:
             full_description = f"File: {os.path.abspath(file_path)}"
             full_content = f"{full_description}\n\n{content}"
+            # The whole file goes into the chunk index, whatever the truncation below cuts off
+            chunk_index = self.get_chunk_index()
+            if chunk_index is not None:
+                key = self.chunk_key(file_path)
+                if os.path.isabs(key):
+                    self.outside_chunks[key] = chunk_index
+                self.run_chunk_job(chunk_index.update_text, key, content)
         else:
             full_description = description
             full_content = content
         
-        tokens = self.tokenize(full_content)
-        if len(tokens) > self.max_tokens:
-            full_content = self.detokenize(tokens[:self.max_tokens])
+        token_count = self.count_tokens(full_content)
+        if token_count > self.max_tokens:
+            full_content = self.detokenize(self.tokenize(full_content)[:self.max_tokens])
+            token_count = self.count_tokens(full_content)
         
         self.memory_manager.add_memory(full_description, full_content, memory_type)
-        self.contexts.append((full_description, full_content))
+        self.contexts.append(ContextEntry(full_description, full_content, token_count))
+        self.total_tokens += token_count
         self.prune_contexts()
+        self.drop_detached_chunks()
         logging.warning(f"Added context: {full_description}")
         logging.warning(f"Contexts: {full_content}")
 
     def prune_contexts(self):
-        while self.get_total_tokens() > self.max_tokens:
-            self.contexts.pop(0)
+        # Every entry knows its count, dropping the oldest is a popleft and a subtraction
+        while self.get_total_tokens() > self.max_tokens and self.contexts:
+            self.total_tokens -= self.contexts.popleft().tokens
             # Also remove from memory_manager
             if self.contexts:
                 self.memory_manager.code_memory.pop(0)
@@ -52,17 +94,44 @@ class ContextManager:
         return "\n\n".join([f"{desc}:\n{content}" for desc, content in self.contexts])
 
     def tokenize(self, text):
-        if isinstance(self.tokenizer, tiktoken.Encoding):
-            return self.tokenizer.encode(text)
-        return self.tokenizer.encode(text, add_special_tokens=False)
+        tokenizer = self.tokenizer
+        if isinstance(tokenizer, tiktoken.Encoding):
+            return tokenizer.encode(text)
+        return tokenizer.encode(text, add_special_tokens=False)
 
     def detokenize(self, tokens):
-        if isinstance(self.tokenizer, tiktoken.Encoding):
-            return self.tokenizer.decode(tokens)
         return self.tokenizer.decode(tokens)
 
+    @staticmethod
+    def _count_key(text):
+        return hashlib.blake2b(text.encode('utf-8', errors='replace'), digest_size=16).digest()
+
+    def count_tokens(self, text):
+        self._sync_token_counts()
+        key = self._count_key(text)
+        count = self.token_counts.get(key)
+        if count is None:
+            count = self.token_counts[key] = len(self.tokenize(text))
+        return count
+
+    def _sync_token_counts(self):
+        # Counts made with the tiktoken fallback are stale once the model's own tokenizer has loaded
+        tokenizer = self.tokenizer
+        if tokenizer is self.counted_with:
+            if len(self.token_counts) > len(self.contexts) + TOKEN_COUNT_SLACK:
+                # Only the contexts still attached are worth remembering, removed ones would pile up
+                live = {self._count_key(content) for _, content in self.contexts}
+                self.token_counts = {key: count for key, count in self.token_counts.items() if key in live}
+            return
+        self.counted_with = tokenizer
+        self.token_counts.clear()
+        self.contexts = deque(ContextEntry(desc, content, self.count_tokens(content))
+                              for desc, content in self.contexts)
+        self.total_tokens = sum(entry.tokens for entry in self.contexts)
+
     def get_total_tokens(self):
-        return sum(len(self.tokenize(content)) for _, content in self.contexts)
+        self._sync_token_counts()
+        return self.total_tokens
 
     def is_file_too_large(self, file_path):
         return os.path.getsize(file_path) > self.max_file_size
@@ -119,6 +188,99 @@ class ContextManager:
         logging.debug(f"Top contexts: {top_contexts}")
         return top_contexts
 
+    def get_chunk_index(self):
+        vault_manager = getattr(self.cccore, 'vault_manager', None)
+        vault = vault_manager.get_current_vault() if vault_manager else None
+        if vault is None:
+            return None
+        chunk_index = vault.open_chunk_index()
+        if not chunk_index.available:
+            return None
+        if id(chunk_index) not in self.purged_chunk_indexes:
+            # Outside files attached in an earlier session that ended without removing them
+            self.purged_chunk_indexes.add(id(chunk_index))
+            self.run_chunk_job(self.purge_outside_chunks, chunk_index, set(self.outside_chunks))
+        return chunk_index
+
+    def run_chunk_job(self, target, *args):
+        self.chunk_pool.start(SafeQRunnable(target, *args))
+
+    def purge_outside_chunks(self, chunk_index, keep):
+        for path in chunk_index.outside_paths():
+            if path not in keep:
+                chunk_index.remove(path)
+
+    def drop_detached_chunks(self):
+        # Chunks of an outside file only live as long as some context still attaches it
+        attached = {self.chunk_key(desc.split("File: ", 1)[1]) for desc, _ in self.contexts if desc.startswith("File:")}
+        for key in [key for key in self.outside_chunks if key not in attached]:
+            self.run_chunk_job(self.outside_chunks.pop(key).remove, key)
+
+    def chunk_key(self, file_path):
+        # Vault files are keyed by their vault-relative path like the vault index, anything else absolute
+        file_path = Path(os.path.abspath(file_path))
+        vault = self.cccore.vault_manager.get_current_vault()
+        try:
+            return str(file_path.relative_to(vault.path))
+        except (AttributeError, ValueError):
+            return str(file_path)
+
+    def get_relevant_chunks(self, query, budget):
+        """Best chunks for query that fit in budget tokens, or None without a chunk index.
+
+        Chunks of the files attached as context come first, then the rest of
+        the vault; chunks that don't fit are skipped for smaller ones further down.
+        """
+        chunk_index = self.get_chunk_index()
+        if chunk_index is None:
+            return None
+        attached = [self.chunk_key(desc.split("File: ", 1)[1]) for desc, _ in self.contexts if desc.startswith("File:")]
+        candidates = chunk_index.search(query, CHUNK_CANDIDATES, paths=attached) + chunk_index.search(query, CHUNK_CANDIDATES)
+        selected = []
+        seen = set()
+        used = 0
+        for chunk in candidates:
+            key = (chunk.path, chunk.start_line)
+            if key in seen:
+                continue
+            seen.add(key)
+            tokens = self.count_tokens(chunk.text)
+            if used + tokens <= budget:
+                selected.append(chunk)
+                used += tokens
+        return selected
+
+    def select_file_chunks(self, message, contexts, chunk_index, budget):
+        """(contexts, chunks) for the message: a whole file is replaced by the chunks of it (and of the vault)
+        that match the message, but only when some were picked. A file with no chunks in the index yet
+        (its chunk job waits behind a reindex) or none that matched goes in whole, cut to the budget left."""
+        files = {context[0]: self.chunk_key(context[0].split("File: ", 1)[1])
+                 for context in contexts if context[0].startswith("File:")}
+        unindexed = {desc for desc, key in files.items() if chunk_index.content_hash(key) is None}
+        reserved = sum(self.count_tokens(context[1]) for context in contexts if context[0] in unindexed)
+        chunks = self.get_relevant_chunks(message, max(0, budget - reserved)) or []
+        chunked = {chunk.path for chunk in chunks}
+        remaining = budget - sum(self.count_tokens(chunk.text) for chunk in chunks)
+        fitted = {}
+        # Files the index knows nothing about first, they had their share reserved
+        for desc in sorted(files, key=lambda desc: desc not in unindexed):
+            if files[desc] in chunked:
+                continue
+            content = self.fit_tokens(next(context[1] for context in contexts if context[0] == desc), remaining)
+            if content:
+                fitted[desc] = content
+                remaining -= self.count_tokens(content)
+        kept = [context if context[0] not in files else (context[0], fitted[context[0]])
+                for context in contexts if context[0] not in files or context[0] in fitted]
+        return kept, chunks
+
+    def fit_tokens(self, text, budget):
+        if budget <= 0:
+            return ""
+        if self.count_tokens(text) <= budget:
+            return text
+        return self.detokenize(self.tokenize(text)[:budget])
+
     def preprocess_message(self, message):
         code_blocks = self.extract_code_blocks(message)
         processed_blocks = self.process_code_blocks(code_blocks)
@@ -130,8 +292,17 @@ class ContextManager:
             message = message.replace(original_block, processed_block)
 
         relevant_contexts = self.get_most_relevant_context(message)
+        chunk_budget = self.max_tokens - sum(self.count_tokens(context[1]) for context in relevant_contexts
+                                             if not context[0].startswith("File:"))
+        chunks = None
+        chunk_index = self.get_chunk_index()
+        if chunk_index is not None:
+            relevant_contexts, chunks = self.select_file_chunks(message, relevant_contexts, chunk_index, chunk_budget)
         logging.warning(f"Relevant contexts: {relevant_contexts}")
         processed_contexts = self.process_contexts(relevant_contexts)
+        for chunk in chunks or []:
+            title = f", {chunk.title}" if chunk.title else ""
+            processed_contexts.append((f"File: {chunk.path} (lines {chunk.start_line}-{chunk.end_line}{title})", chunk.text))
         
         context_info = ""
         for context in processed_contexts:
@@ -207,19 +378,24 @@ class ContextManager:
                 return content
         return None
     def remove_context_by_description(self, description):
-        self.contexts = [context for context in self.contexts if context[0] != description]
+        self.contexts = deque(context for context in self.contexts if context[0] != description)
+        self.total_tokens = sum(entry.tokens for entry in self.contexts)
         # Also remove from memory_manager
         self.memory_manager.code_memory = [mem for mem in self.memory_manager.code_memory if mem[0] != description]
+        self.drop_detached_chunks()
 
     def clear_contexts(self):
-        self.contexts = []
+        self.contexts = deque()
+        self.total_tokens = 0
         self.memory_manager.clear_memory('code')
+        self.drop_detached_chunks()
 
     def get_context_sizes(self):
-        return [len(self.tokenize(content)) for _, content in self.contexts]
+        return self.get_context_sizes_in_tokens()
 
     def get_context_sizes_in_tokens(self):
-        return [len(self.tokenize(content)) for _, content in self.contexts]
+        self._sync_token_counts()
+        return [entry.tokens for entry in self.contexts]
 
     def add_project_info(self, info_type, content):
         self.memory_manager.add_project_info(info_type, content)
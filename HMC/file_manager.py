@@ -84,7 +84,7 @@ class FileManager:
         except Exception as e:
             logging.error(f"Error saving file: {e}")
             QMessageBox.critical(self.cccore.current_window, "Error", f"Could not save file: {e}")
-        self.cccore.vault_manager.update_knowledge_graph()
+        self.cccore.vault_manager.update_file(editor.file_path)
 
     def save_file_as(self, editor=None):
         if editor is None:
@@ -6,12 +6,16 @@ from DEV.workspace import Workspace
 import tempfile
 import logging
 from PyQt6.QtCore import QObject, pyqtSignal
-from NITTY_GRITTY.knowledge_graph import KnowledgeGraph
+from NITTY_GRITTY.knowledge_graph import KnowledgeGraph, SNAPSHOT_NAME
+from NITTY_GRITTY.document_scanner import scan_document
+from NITTY_GRITTY.vault_index_store import open_index_store, DEFAULT_INDEX_BACKEND, INDEX_STORE_FILES
+from NITTY_GRITTY.vault_indexer import ParallelIndexer, build_file_info, get_file_type
+from NITTY_GRITTY.search_index import SearchIndex, SEARCH_INDEX_FILES
+from NITTY_GRITTY.chunk_index import ChunkIndex, CHUNK_INDEX_FILES
 from .project_manager import Project
-import re
+from .vault_watcher import VaultWatcher
 import asyncio
 from PyQt6.QtCore import QTimer
-from datetime import datetime
 #WORKSPACES IS UI RELATED, probably, filesets open?
 ##Vaults can be considered as top-level containers.
 # Projects can exist within vaults.
@@ -24,6 +28,12 @@ from datetime import datetime
 # Class Structure:
 # Modify the VaultManager to handle both vaults and projects.
 # Create a Project class to represent individual projects.
+
+# Never indexed: the vault's own bookkeeping files and VCS/cache directories
+VAULT_METADATA_FILES = ({'.vault_config.json', SNAPSHOT_NAME, SNAPSHOT_NAME + '.tmp'}
+                        | INDEX_STORE_FILES | SEARCH_INDEX_FILES | CHUNK_INDEX_FILES)
+IGNORED_DIRS = {'.git', '__pycache__'}
+
 class Vault:
     def __init__(self, vault_name, path, cccore):
         self.name = vault_name
@@ -33,8 +43,16 @@ class Vault:
         self.workspaces = {}
         self.config_file = self.path / '.vault_config.json'
         self.index_file = self.path / '.vault_index.json'
+        self.graph_snapshot_file = self.path / SNAPSHOT_NAME
         logging.info(f"Initializing Vault: {vault_name} at {path}")
+        self.index_backend = DEFAULT_INDEX_BACKEND
+        self.index_store = None
         self.index = None
+        self.search_index = None
+        self.chunk_index = None
+        self.last_index_delta = None
+        self.graph_built = False
+        self.indexer = ParallelIndexer()
         self.knowledge_graph = KnowledgeGraph()
         self.load_config()
         # Remove self.load_index() from here
@@ -76,13 +94,15 @@ class Vault:
             with open(self.config_file, 'r') as f:
                 config = json.load(f)
                 self.projects = config.get('projects', {})
+                self.index_backend = config.get('index_backend', DEFAULT_INDEX_BACKEND)
         else:
             self.save_config()
 
     def save_config(self):
         config = {
             'name': self.name,
-            'projects': self.projects
+            'projects': self.projects,
+            'index_backend': self.index_backend
         }
         with open(self.config_file, 'w') as f:
             json.dump(config, f, indent=4)
@@ -104,72 +124,175 @@ class Vault:
     def get_workspace_names(self):
         return list(self.workspaces.keys())
 
+    def open_index(self):
+        # vault.index['files'] stays the public shape; it is backed by the configured index store
+        if self.index_store is None:
+            self.index_store = open_index_store(self.path, self.index_backend)
+            self.index = {'files': self.index_store}
+        return self.index_store
+
+    def open_search_index(self):
+        if self.search_index is None:
+            self.search_index = SearchIndex(self.path)
+        return self.search_index
+
+    def open_chunk_index(self):
+        if self.chunk_index is None:
+            self.chunk_index = ChunkIndex(self.path)
+        return self.chunk_index
+
     def load_index(self):
-        if self.index_file.exists():
-            with open(self.index_file, 'r') as f:
-                self.index = json.load(f)
-        else:
-            self.index = {'files': {}}
+        if len(self.open_index()) == 0:
             self.update_index()
 
-    def update_index(self):
+    def update_index(self, paths=None, progress=None):
+        """Incrementally refresh the index and return the delta.
+
+        Only files whose (mtime_ns, size, inode) fingerprint changed are
+        re-parsed, sharded across the indexer's process pool for big batches.
+        Pass ``paths`` to restat just those files instead of rewalking the
+        whole vault. ``progress(done, total)`` reports parsed file counts.
+        """
         logging.info(f"Updating index for vault: {self.name}")
-        self.index = {'files': {}}
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                file_path = Path(root) / file
+        files = self.open_index()
+        derived_indexes = [self.open_search_index(), self.open_chunk_index()]
+        search_index, chunk_index = derived_indexes
+        delta = {'added': [], 'modified': [], 'removed': []}
+        changed = []
+        # A vault indexed before a derived index existed has to be re-read once to fill it
+        rebuild_search = paths is None and any(index.available and not index.is_complete()
+                                               for index in derived_indexes)
+
+        if paths is None:
+            seen = set()
+            for file_path, stat in self.walk_files():
                 rel_path = str(file_path.relative_to(self.path))
-                file_info = self.get_file_info(file_path)
-                self.index['files'][rel_path] = file_info
-        self.save_index()
-        logging.info(f"Index updated for vault: {self.name}")
-
-    def get_file_info(self, file_path):
-        stat = file_path.stat()
-        file_type = self.get_file_type(file_path)
-        return {
-            'path': str(file_path.relative_to(self.path)),
-            'name': file_path.name,
-            'type': file_type,
-            'size': stat.st_size,
-            'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-            'tags': self.extract_tags(file_path) if file_type == 'document' else [],
-            'links': self.extract_links(file_path) if file_type == 'document' else [],
-        }
+                seen.add(rel_path)
+                self._check_index_entry(rel_path, stat, changed, delta, force=rebuild_search)
+            delta['removed'] = [rel_path for rel_path in files if rel_path not in seen]
+        else:
+            for path in paths:
+                file_path = Path(path)
+                if not file_path.is_absolute():
+                    file_path = self.path / file_path
+                try:
+                    rel_path = str(file_path.relative_to(self.path))
+                except ValueError:
+                    continue
+                if file_path.is_dir() and not self.is_ignored(file_path):
+                    # A directory event (watcher, git checkout): diff its subtree against the index
+                    seen = set()
+                    for sub_path, stat in self.walk_files(file_path):
+                        sub_rel_path = str(sub_path.relative_to(self.path))
+                        seen.add(sub_rel_path)
+                        self._check_index_entry(sub_rel_path, stat, changed, delta)
+                    delta['removed'].extend(p for p in files.paths_under(rel_path) if p not in seen)
+                    continue
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    stat = None
+                if stat is None or not file_path.is_file() or self.is_ignored(file_path):
+                    if rel_path in files:
+                        delta['removed'].append(rel_path)
+                    elif stat is None:
+                        # Deleted or moved-away directory
+                        delta['removed'].extend(files.paths_under(rel_path))
+                    continue
+                self._check_index_entry(rel_path, stat, changed, delta)
+            delta['removed'] = list(dict.fromkeys(delta['removed']))
+            changed = list(dict.fromkeys(changed))
+
+        indexed = set()
+        with files.transaction(), search_index.transaction(), chunk_index.transaction():
+            for results in self.indexer.index_files(self.path, changed, progress):
+                for rel_path, file_info, text_index in results:
+                    files[rel_path] = file_info
+                    self._update_derived_indexes(rel_path, text_index)
+                    indexed.add(rel_path)
+            # Files that vanished mid-pass or were skipped by a cancel are picked up next time by fingerprint
+            delta['added'] = [p for p in delta['added'] if p in indexed]
+            delta['modified'] = [p for p in delta['modified'] if p in indexed]
+            if self.indexer.is_cancelled():
+                delta['removed'] = []
+            for rel_path in delta['removed']:
+                del files[rel_path]
+                search_index.remove(rel_path)
+                chunk_index.remove(rel_path)
+            if rebuild_search and not self.indexer.is_cancelled():
+                for index in derived_indexes:
+                    index.mark_complete()
+
+        self.last_index_delta = delta
+        if any(delta.values()):
+            self.save_index()
+        logging.info(f"Index updated for vault: {self.name} "
+                     f"(+{len(delta['added'])} ~{len(delta['modified'])} -{len(delta['removed'])})")
+        return delta
+
+    def _update_derived_indexes(self, rel_path, text_index):
+        text_index = text_index or {}
+        self.search_index.update(rel_path, text_index.get('terms'))
+        if 'chunks' in text_index:
+            self.chunk_index.update(rel_path, text_index['content_hash'], text_index['chunks'])
+        else:
+            self.chunk_index.remove(rel_path)
+
+    def _check_index_entry(self, rel_path, stat, changed, delta, force=False):
+        fingerprint = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        known = rel_path in self.index_store
+        if known and self.index_store.fingerprint(rel_path) == fingerprint:
+            if force:
+                # Re-read but not reported, nothing about the file itself changed
+                changed.append(rel_path)
+            return
+        changed.append(rel_path)
+        delta['modified' if known else 'added'].append(rel_path)
+
+    def walk_files(self, root=None):
+        # os.scandir hands back cached DirEntry stats and lets us prune ignored dirs early
+        stack = [Path(root) if root else self.path]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = list(os.scandir(current))
+            except OSError as e:
+                logging.warning(f"Cannot scan {current}: {e}")
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRS:
+                            stack.append(Path(entry.path))
+                    elif entry.is_file() and entry.name not in VAULT_METADATA_FILES:
+                        yield Path(entry.path), entry.stat()
+                except OSError as e:
+                    logging.warning(f"Cannot stat {entry.path}: {e}")
+
+    def is_ignored(self, file_path):
+        file_path = Path(file_path)
+        if file_path.name in VAULT_METADATA_FILES:
+            return True
+        try:
+            parts = file_path.relative_to(self.path).parts
+        except ValueError:
+            return True
+        return any(part in IGNORED_DIRS for part in parts)
+
+    def build_file_info(self, file_path, stat=None, scan=None):
+        return build_file_info(self.path, file_path, stat, scan)
 
     def get_file_type(self, file_path):
-        extension = file_path.suffix.lower()
-        if extension in ['.md', '.txt']:
-            return 'document'
-        elif extension in ['.png', '.jpg', '.jpeg', '.gif']:
-            return 'image'
-        elif extension in ['.py', '.js', '.html', '.css']:
-            return 'code'
-        else:
-            return 'other'
+        return get_file_type(file_path)
 
     def extract_tags(self, file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return list(set(re.findall(r'#(\w+)', content)))
-        except Exception as e:
-            logging.error(f"Error extracting tags from {file_path}: {str(e)}")
-            return []
+        return scan_document(file_path).unique_tags()
 
     def extract_links(self, file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return list(set(re.findall(r'\[\[(.*?)\]\]', content)))
-        except Exception as e:
-            logging.error(f"Error extracting links from {file_path}: {str(e)}")
-            return []
+        return scan_document(file_path).unique_links()
 
     def save_index(self):
-        with open(self.index_file, 'w') as f:
-            json.dump(self.index, f, indent=4)
+        self.open_index().save()
 
     def update_index_nix(self):
         script_path = Path(__file__).parent.parent / 'NITTY_GRITTY' / 'index.nix'
@@ -183,63 +306,114 @@ class Vault:
         result = subprocess.run(cmd, capture_output=True, text=True)
         
         if result.returncode == 0:
-            self.index = json.loads(result.stdout)
-            
+            self.open_index().replace_all(json.loads(result.stdout).get('files', {}))
+            self.save_index()
+
         else:
             raise RuntimeError(f"Error updating index: {result.stderr}")
 
     def update_index_python(self):
-        self.index = {'files': {}}
+        index_store = self.open_index()
         self.knowledge_graph.clear()
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(('.md', '.txt', '.png', '.jpg', '.jpeg', '.gif')):
-                    file_path = Path(root) / file
-                    rel_path = str(file_path.relative_to(self.path))
-                    file_info = self.get_file_info(file_path)
-                    self.index['files'][rel_path] = file_info
-                    if file_info['type'] == 'document':
-                        self.process_file_content(file_path, rel_path)
+        with index_store.transaction():
+            index_store.clear()
+            for root, _, files in os.walk(self.path):
+                for file in files:
+                    if file.endswith(('.md', '.txt', '.png', '.jpg', '.jpeg', '.gif')):
+                        file_path = Path(root) / file
+                        rel_path = str(file_path.relative_to(self.path))
+                        scan = scan_document(file_path) if self.get_file_type(file_path) == 'document' else None
+                        file_info = self.build_file_info(file_path, scan=scan)
+                        index_store[rel_path] = file_info
+                        if scan is not None:
+                            self.process_file_content(file_path, rel_path, scan)
+        self.save_index()
 
-    def update_knowledge_graph(self):
+    def update_knowledge_graph(self, delta=None):
+        if delta is not None and self.graph_built:
+            self.patch_knowledge_graph(delta)
+            return
         logging.info(f"Updating knowledge graph for vault: {self.name}")
         if self.index is None:
             self.load_index()
-        if self.index is None:
-            logging.error(f"Failed to load index for vault: {self.name}")
-            return
 
         self.knowledge_graph.clear()
-        for rel_path, file_info in self.index['files'].items():
+        for rel_path, file_info in self.index_store.items():
             if file_info['type'] == 'document':
-                file_path = self.path / rel_path
-                self.process_file_content(file_path, rel_path)
+                self.add_file_info_to_graph(rel_path, file_info)
+        self.knowledge_graph.compact()
+        self.graph_built = True
         logging.info(f"Knowledge graph updated for vault: {self.name}")
 
-    def process_file_content(self, file_path, rel_path):
+    def load_knowledge_graph(self):
+        # Warm start: reuse the last snapshot if it was built from exactly the index we have on disk
+        if self.graph_built:
+            return True
+        if not self.graph_snapshot_file.exists():
+            return False
+        signature = self.open_index().fingerprint_digest()
+        if not self.knowledge_graph.load_snapshot(self.graph_snapshot_file, signature):
+            logging.info(f"Knowledge graph snapshot for vault {self.name} is stale, rebuilding")
+            return False
+        self.graph_built = True
+        logging.info(f"Loaded knowledge graph snapshot for vault: {self.name}")
+        return True
+
+    def save_knowledge_graph(self):
+        if not self.graph_built or self.index_store is None:
+            return
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Extract links
-            links = re.findall(r'\[\[(.*?)\]\]', content)
-            for link in links:
-                self.knowledge_graph.add_link(rel_path, link)
-
-            # Extract tags
-            tags = re.findall(r'#(\w+)', content)
-            for tag in tags:
-                self.knowledge_graph.add_tag(rel_path, tag)
-
-            # Extract references (assuming references are in the format @reference)
-            references = re.findall(r'@(\w+)', content)
-            for ref in references:
-                self.knowledge_graph.add_reference(rel_path, ref)
-        except Exception as e:
-            logging.error(f"Error processing file {file_path}: {str(e)}")
+            self.knowledge_graph.save_snapshot(self.graph_snapshot_file, self.index_store.fingerprint_digest())
+            self.knowledge_graph.mark_clean()
+        except OSError as e:
+            logging.error(f"Error saving knowledge graph snapshot for vault {self.name}: {str(e)}")
+
+    def patch_knowledge_graph(self, delta):
+        # O(edges of the changed files): retract removed files, swap in fresh edges for the rest
+        if not any(delta.values()):
+            logging.info(f"Knowledge graph for vault {self.name} is up to date")
+            return
+        for rel_path in delta['removed']:
+            self.knowledge_graph.remove_file(rel_path)
+        for rel_path in delta['added'] + delta['modified']:
+            file_info = self.index_store.get(rel_path)
+            if file_info is None or file_info['type'] != 'document':
+                self.knowledge_graph.remove_file(rel_path)
+            elif 'references' in file_info:
+                self.knowledge_graph.replace_file_edges(rel_path, file_info['links'], file_info['tags'],
+                                                        file_info['references'])
+            else:
+                scan = scan_document(self.path / rel_path)
+                self.knowledge_graph.replace_file_edges(rel_path, scan.unique_links(), scan.unique_tags(),
+                                                        scan.unique_references())
+        self.knowledge_graph.maybe_compact()
+        logging.info(f"Knowledge graph patched for vault: {self.name} ({sum(map(len, delta.values()))} files)")
+
+    def add_file_info_to_graph(self, rel_path, file_info):
+        # Index entries already carry the parsed tokens, only entries from older indexes need a rescan
+        if 'references' not in file_info:
+            self.process_file_content(self.path / rel_path, rel_path)
+            return
+        for link in file_info['links']:
+            self.knowledge_graph.add_link(rel_path, link)
+        for tag in file_info['tags']:
+            self.knowledge_graph.add_tag(rel_path, tag)
+        for ref in file_info['references']:
+            self.knowledge_graph.add_reference(rel_path, ref)
+
+    def process_file_content(self, file_path, rel_path, scan=None):
+        if scan is None:
+            scan = scan_document(file_path)
+        for link in scan.unique_links():
+            self.knowledge_graph.add_link(rel_path, link)
+        for tag in scan.unique_tags():
+            self.knowledge_graph.add_tag(rel_path, tag)
+        # References are in the format @reference
+        for ref in scan.unique_references():
+            self.knowledge_graph.add_reference(rel_path, ref)
 
     def get_file_info(self, rel_path):
-        return self.index['files'].get(rel_path)
+        return self.open_index().get(rel_path)
 
     def add_project(self, project_name, project_path, language=None, version=None):
         project_path = Path(project_path)
@@ -269,19 +443,21 @@ class Vault:
 
    
     def get_backlinks(self, file_path):
-        return self.knowledge_graph.get_backlinks(file_path)
+        if self.graph_built:
+            return self.knowledge_graph.get_backlinks(file_path)
+        # Graph not built yet (e.g. right after startup), answer straight from the index
+        return set(self.open_index().backlinks(file_path))
 
     def contains_file(self, file_path):
-        if self.index is None:
-            self.load_index()
         rel_path = str(Path(file_path).relative_to(self.path))
-        return rel_path in self.index['files']
+        return rel_path in self.open_index()
 
 class VaultManager(QObject):
     vault_changed = pyqtSignal(str)
     project_added = pyqtSignal(str, str) #vault_name, project_name
     indexing_started = pyqtSignal()
     indexing_finished = pyqtSignal()
+    indexing_progress = pyqtSignal(str, int, int) #vault_name, files_done, files_total
     vault_added = pyqtSignal(str)
     vault_removed = pyqtSignal(str)
     project_removed = pyqtSignal(str, str)
@@ -291,6 +467,8 @@ class VaultManager(QObject):
         self.settings_manager = settings_manager
         self.cccore = cccore
         self.indexing_queue = asyncio.Queue()
+        self.indexing_vault = None
+        self.watchers = {}
         self.project_manager = cccore.get_project_manager()
         self.app_config_dir = Path.home() / ".computinator_code"
         self.app_config_dir.mkdir(exist_ok=True)
@@ -395,6 +573,7 @@ class VaultManager(QObject):
         if isinstance(vault_name, Vault):
             vault_name = vault_name.name
         if vault_name in self.vaults:
+            self.cancel_indexing(except_vault=self.vaults[vault_name])
             self.current_vault = self.vaults[vault_name]
             logging.info(f"Successfully set current vault to: {vault_name}")
             self.vault_changed.emit(vault_name)
@@ -466,8 +645,28 @@ class VaultManager(QObject):
             logging.info(f"Created vault directory: {vault.path}")
         vault.load_config()
         vault.load_index()
+        self.start_watching(vault)
         logging.info(f"Successfully initialized vault: {vault.name} at {vault.path}")
 
+    def start_watching(self, vault):
+        if str(self.settings_manager.get_value('watch_vaults', True)).lower() == 'false':
+            return
+        if vault.name in self.watchers:
+            return
+        watcher = VaultWatcher(vault, parent=self)
+        watcher.paths_changed.connect(self.queue_vault_update)
+        try:
+            watcher.start()
+        except Exception as e:
+            logging.error(f"Failed to watch vault {vault.name}: {str(e)}")
+            return
+        self.watchers[vault.name] = watcher
+
+    def stop_watching(self, vault_name):
+        watcher = self.watchers.pop(vault_name, None)
+        if watcher:
+            watcher.stop()
+
     def save_vaults_config(self):
         logging.info("Saving vaults configuration...")
         config = {
@@ -479,13 +678,13 @@ class VaultManager(QObject):
         logging.info("Vaults configuration saved successfully")
         if self.current_vault and self.current_vault.knowledge_graph.is_dirty:
             self.save_knowledge_graph()
-            self.current_vault.knowledge_graph.mark_clean()
 
     def remove_vault_directory(self, name):
         if name not in self.vaults:
             logging.warning(f"Vault '{name}' does not exist.")
             return False
         
+        self.stop_watching(name)
         del self.vaults[name]
         if self.current_vault and self.current_vault.name == name:
             self.current_vault = None
@@ -497,6 +696,8 @@ class VaultManager(QObject):
         if old_name in self.vaults and new_name not in self.vaults:
             vault = self.vaults.pop(old_name)
             vault.name = new_name
+            if old_name in self.watchers:
+                self.watchers[new_name] = self.watchers.pop(old_name)
             self.vaults[new_name] = vault
             if self.current_vault and self.current_vault.name == old_name:
                 self.current_vault = vault
@@ -517,6 +718,7 @@ class VaultManager(QObject):
 
     def switch_vault(self, name):
         if name in self.vaults:
+            self.cancel_indexing(except_vault=self.vaults[name])
             self.current_vault = self.vaults[name]
             self.initialize_vault(self.current_vault)
             self.save_vaults_config()
@@ -698,18 +900,30 @@ class VaultManager(QObject):
         if self.current_vault:
             self.current_vault.save_config()
 
-    def update_knowledge_graph(self):
+    def save_knowledge_graph(self, vault=None):
+        vault = vault or self.current_vault
+        if vault:
+            vault.save_knowledge_graph()
+
+    def update_knowledge_graph(self, paths=None):
         if self.current_vault:
-            self.queue_vault_update(self.current_vault)
+            self.queue_vault_update(self.current_vault, paths)
+
+    def update_file(self, file_path):
+        vault = self.get_vault_for_file(file_path)
+        if vault:
+            self.queue_vault_update(vault, [file_path])
 
     def get_vault_knowledge_graph(self):
         if self.current_vault:
             return self.current_vault.knowledge_graph
         return {}
 
-    def queue_vault_update(self, vault):
+    def queue_vault_update(self, vault, paths=None):
+        # paths=None means a full (but still incremental) rescan of the vault
         if vault:
-            asyncio.run_coroutine_threadsafe(self.indexing_queue.put(vault), asyncio.get_event_loop())
+            vault.indexer.reset()
+            asyncio.run_coroutine_threadsafe(self.indexing_queue.put((vault, paths)), asyncio.get_event_loop())
         else:
             logging.warning("Attempted to queue update for None vault")
 
@@ -722,20 +936,36 @@ class VaultManager(QObject):
     async def _process_queue(self):
         self.indexing_started.emit()
         try:
-            vault = await self.indexing_queue.get()
-            await self.update_vault_async(vault)
+            vault, paths = await self.indexing_queue.get()
+            await self.update_vault_async(vault, paths)
         except Exception as e:
             logging.error(f"Error processing indexing queue: {str(e)}")
         finally:
             self.indexing_queue.task_done()
             self.indexing_finished.emit()
 
-    async def update_vault_async(self, vault):
+    async def update_vault_async(self, vault, paths=None):
+        vault.indexer.workers = int(self.settings_manager.get_value('indexing_workers', vault.indexer.workers))
+        progress = lambda done, total: self.indexing_progress.emit(vault.name, done, total)
+        self.indexing_vault = vault
         try:
-            await asyncio.to_thread(vault.update_index)
-            await asyncio.to_thread(vault.update_knowledge_graph)
+            await asyncio.to_thread(vault.load_knowledge_graph)
+            delta = await asyncio.to_thread(vault.update_index, paths, progress)
+            # A cancelled pass still patches an existing graph so it never lags the index it is saved against
+            if vault.graph_built or not vault.indexer.is_cancelled():
+                await asyncio.to_thread(vault.update_knowledge_graph, delta)
+                if vault.knowledge_graph.is_dirty:
+                    await asyncio.to_thread(vault.save_knowledge_graph)
         except Exception as e:
             logging.error(f"Error updating vault {vault.name}: {str(e)}")
+        finally:
+            self.indexing_vault = None
+
+    def cancel_indexing(self, except_vault=None):
+        vault = self.indexing_vault
+        if vault is not None and vault is not except_vault:
+            logging.info(f"Cancelling indexing of vault: {vault.name}")
+            vault.indexer.cancel()
 
     def get_backlinks(self, file_path):
         if self.current_vault:
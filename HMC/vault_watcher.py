@@ -0,0 +1,184 @@
+#vault_watcher.py
+# Watches a vault directory and feeds the touched paths into the incremental indexer.
+# Uses watchdog (inotify/FSEvents/ReadDirectoryChangesW) when installed, QFileSystemWatcher otherwise.
+# Events are coalesced: a burst (git checkout, sync tool) becomes one update once it has been quiet
+# for DEBOUNCE_MS, or at the latest MAX_DELAY_MS after the first event of the burst.
+import logging
+import os
+import time
+from pathlib import Path
+from PyQt6.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+DEBOUNCE_MS = 750
+MAX_DELAY_MS = 5000
+
+
+class _WatchdogHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        # Called on the observer thread, the signal hops over to the Qt thread
+        if event.event_type in ('opened', 'closed_no_write'):
+            return
+        self.watcher.path_touched.emit(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.watcher.path_touched.emit(dest_path)
+
+
+class VaultWatcher(QObject):
+    path_touched = pyqtSignal(str)
+    paths_changed = pyqtSignal(object, list)  # vault, touched paths
+
+    def __init__(self, vault, debounce_ms=DEBOUNCE_MS, max_delay_ms=MAX_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.vault = vault
+        self.debounce_ms = debounce_ms
+        self.max_delay_ms = max_delay_ms
+        self.pending = set()
+        self.first_event_time = None
+        self.observer = None
+        self.qt_watcher = None
+        self.listings = {}  # QFileSystemWatcher fallback: directory -> what _listing last saw in it
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush)
+        self.path_touched.connect(self.on_path_touched)
+
+    def start(self):
+        if self.observer or self.qt_watcher:
+            return
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(_WatchdogHandler(self), str(self.vault.path), recursive=True)
+            self.observer.daemon = True
+            self.observer.start()
+            logging.info(f"Watching vault {self.vault.name} with watchdog")
+        else:
+            self.qt_watcher = QFileSystemWatcher(self)
+            self.qt_watcher.directoryChanged.connect(self.on_directory_changed)
+            self.qt_watcher.fileChanged.connect(self.on_file_changed)
+            self._watch_tree(self.vault.path)
+            logging.info(f"Watching vault {self.vault.name} with QFileSystemWatcher")
+
+    def stop(self):
+        self.flush_timer.stop()
+        self.pending.clear()
+        if self.observer:
+            self.observer.stop()
+            self.observer.join(timeout=2)
+            self.observer = None
+        if self.qt_watcher:
+            self.qt_watcher.deleteLater()
+            self.qt_watcher = None
+        self.listings.clear()
+
+    def _listing(self, directory):
+        # name -> (is_dir, inode, mtime_ns, size) of the entries worth indexing. The vault's own files
+        # (index, snapshot, their .tmp and SQLite -wal/-shm) are left out, so writing them changes nothing
+        listing = {}
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return listing
+        for entry in entries:
+            if self.vault.is_ignored(entry.path):
+                continue
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            # A directory's own mtime moves with its contents, which its own event reports
+            listing[entry.name] = (True, stat.st_ino, 0, 0) if is_dir else (False, stat.st_ino, stat.st_mtime_ns,
+                                                                           stat.st_size)
+        return listing
+
+    def _watch_tree(self, root):
+        # QFileSystemWatcher is not recursive, every directory has to be registered. Files too: an edit in
+        # place leaves the directory listing alone and only shows up as fileChanged
+        paths = []
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not self.vault.is_ignored(Path(dirpath) / d)]
+            listing = self.listings[dirpath] = self._listing(dirpath)
+            paths.append(dirpath)
+            paths.extend(os.path.join(dirpath, name) for name, (is_dir, *_) in listing.items() if not is_dir)
+        watched = set(self.qt_watcher.directories()) | set(self.qt_watcher.files())
+        new_paths = [p for p in paths if p not in watched]
+        if new_paths:
+            self.qt_watcher.addPaths(new_paths)
+
+    def on_directory_changed(self, directory):
+        # Only the directory is reported: compare it against its last listing and pass on what differs
+        if not os.path.isdir(directory):
+            for path in [d for d in self.listings if d == directory or d.startswith(directory + os.sep)]:
+                del self.listings[path]
+            self.path_touched.emit(directory)
+            return
+        old = self.listings.get(directory)
+        if old is None:
+            self._watch_tree(directory)
+            self.path_touched.emit(directory)
+            return
+        new = self.listings[directory] = self._listing(directory)
+        watched_files = set(self.qt_watcher.files())
+        for name in old.keys() | new.keys():
+            if old.get(name) == new.get(name):
+                continue
+            path = os.path.join(directory, name)
+            if name not in new:
+                for sub_path in [d for d in self.listings if d == path or d.startswith(path + os.sep)]:
+                    del self.listings[sub_path]
+            elif new[name][0]:
+                self._watch_tree(path)
+            else:
+                self._rewatch_file(path, watched_files)
+            self.path_touched.emit(path)
+
+    def _rewatch_file(self, path, watched_files):
+        # Created, or replaced by an atomic save: a watch Qt may still list is on the old file
+        if path in watched_files:
+            self.qt_watcher.removePath(path)
+        self.qt_watcher.addPath(path)
+
+    def on_file_changed(self, path):
+        # Keep the directory listing current, so the next directory event doesn't report this edit again
+        listing = self.listings.get(os.path.dirname(path))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is not None:
+            self._rewatch_file(path, set(self.qt_watcher.files()))
+            if listing is not None:
+                listing[os.path.basename(path)] = (False, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.path_touched.emit(path)
+
+    def on_path_touched(self, path):
+        if self.vault.is_ignored(path):
+            return
+        self.pending.add(path)
+        now = time.monotonic()
+        if self.first_event_time is None:
+            self.first_event_time = now
+        waited_ms = (now - self.first_event_time) * 1000
+        self.flush_timer.start(int(max(0, min(self.debounce_ms, self.max_delay_ms - waited_ms))))
+
+    def flush(self):
+        self.first_event_time = None
+        if not self.pending:
+            return
+        paths = sorted(self.pending)
+        self.pending.clear()
+        logging.debug(f"Vault {self.vault.name}: {len(paths)} paths changed on disk")
+        self.paths_changed.emit(self.vault, paths)
@@ -0,0 +1,228 @@
+#chunk_index.py
+# Retrieval chunks for AI chat context. Files are cut along their own structure - top-level functions,
+# classes and methods for Python (via ast), heading sections for Markdown, fixed line windows otherwise -
+# and kept per vault in .vault_chunks.db with an FTS5 table, so a message pulls in the few chunks that
+# match it instead of whole (truncated) files. A file is only re-chunked when its content hash changes.
+import ast
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from NITTY_GRITTY.vault_database import VaultDatabase
+
+CHUNK_INDEX_NAME = '.vault_chunks.db'
+CHUNK_INDEX_FILES = {
+    CHUNK_INDEX_NAME, CHUNK_INDEX_NAME + '-wal', CHUNK_INDEX_NAME + '-shm', CHUNK_INDEX_NAME + '-journal',
+}
+MAX_CHUNK_LINES = 80
+MAX_QUERY_TERMS = 64
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+QUERY_WORD_PATTERN = re.compile(r'\w{2,}')
+
+
+class Chunk:
+    __slots__ = ('path', 'start_line', 'end_line', 'title', 'text', 'score')
+
+    def __init__(self, path, start_line, end_line, title, text, score=0.0):
+        self.path = path
+        self.start_line = start_line
+        self.end_line = end_line
+        self.title = title
+        self.text = text
+        self.score = score
+
+    def __repr__(self):
+        return f"Chunk({self.path}:{self.start_line}-{self.end_line} {self.title!r})"
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8', errors='replace')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _windows(lines, start, end, title):
+    # (start_line, end_line, title, text) pieces of at most MAX_CHUNK_LINES, 1-based inclusive lines
+    pieces = []
+    for first in range(start, end + 1, MAX_CHUNK_LINES):
+        last = min(end, first + MAX_CHUNK_LINES - 1)
+        text = '\n'.join(lines[first - 1:last])
+        if text.strip():
+            pieces.append((first, last, title, text))
+    return pieces
+
+
+def chunk_lines(text, title=''):
+    lines = text.splitlines()
+    return _windows(lines, 1, len(lines), title)
+
+
+def chunk_python(text):
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return chunk_lines(text)
+    lines = text.splitlines()
+    chunks = []
+    pending = None  # first line of module-level code not yet emitted
+
+    def node_start(node):
+        return min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+
+    def flush(until):
+        if pending is not None and pending <= until:
+            chunks.extend(_windows(lines, pending, until, 'module'))
+
+    for node in tree.body:
+        start, end = node_start(node), node.end_lineno
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            flush(start - 1)
+            pending = None
+            chunks.extend(_windows(lines, start, end, f"def {node.name}"))
+        elif isinstance(node, ast.ClassDef):
+            flush(start - 1)
+            pending = None
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            if end - start < MAX_CHUNK_LINES or not methods:
+                chunks.extend(_windows(lines, start, end, f"class {node.name}"))
+                continue
+            # Big class: header (docstring, class attributes) plus one chunk per method
+            header_end = node_start(methods[0]) - 1
+            chunks.extend(_windows(lines, start, header_end, f"class {node.name}"))
+            for i, method in enumerate(methods):
+                method_start = node_start(method)
+                method_end = node_start(methods[i + 1]) - 1 if i + 1 < len(methods) else end
+                chunks.extend(_windows(lines, method_start, method_end, f"def {node.name}.{method.name}"))
+        elif pending is None:
+            pending = start
+    flush(len(lines))
+    return chunks
+
+
+def chunk_markdown(text):
+    lines = text.splitlines()
+    chunks = []
+    headings = []  # (level, title) of the enclosing sections
+    section_start = 1
+    in_fence = False
+
+    def section_title():
+        return ' > '.join(title for _, title in headings)
+
+    for number, line in enumerate(lines, 1):
+        if line.lstrip().startswith(('```', '~~~')):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else HEADING_PATTERN.match(line)
+        if match is None:
+            continue
+        chunks.extend(_windows(lines, section_start, number - 1, section_title()))
+        level = len(match.group(1))
+        while headings and headings[-1][0] >= level:
+            headings.pop()
+        headings.append((level, match.group(2)))
+        section_start = number
+    chunks.extend(_windows(lines, section_start, len(lines), section_title()))
+    return chunks
+
+
+def chunk_text(file_path, text):
+    extension = Path(file_path).suffix.lower()
+    if extension == '.py':
+        return chunk_python(text)
+    if extension in ('.md', '.markdown'):
+        return chunk_markdown(text)
+    return chunk_lines(text)
+
+
+def match_expression(query):
+    words = list(dict.fromkeys(word.lower() for word in QUERY_WORD_PATTERN.findall(query)))[:MAX_QUERY_TERMS]
+    return ' OR '.join(f'"{word}"' for word in words)
+
+
+class ChunkIndex(VaultDatabase):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chunk_files (
+            path TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            start_line INTEGER,
+            end_line INTEGER,
+            title TEXT,
+            text TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS chunks_path ON chunks(path);
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunk_terms USING fts5(
+            title, text, content='chunks', content_rowid='id'
+        );
+        CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+            INSERT INTO chunk_terms (rowid, title, text) VALUES (new.id, new.title, new.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+            INSERT INTO chunk_terms (chunk_terms, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+        END;
+    """
+
+    def __init__(self, vault_path):
+        super().__init__(vault_path, CHUNK_INDEX_NAME)
+
+    def content_hash(self, path):
+        if not self.available:
+            return None
+        row = self._reader().execute("SELECT content_hash FROM chunk_files WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def update(self, path, file_hash, chunks):
+        """Replace the chunks of path unless file_hash says they are current. Returns True if replaced."""
+        if not self.available or self.content_hash(path) == file_hash:
+            return False
+        with self.transaction():
+            self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self.conn.executemany(
+                "INSERT INTO chunks (path, start_line, end_line, title, text) VALUES (?, ?, ?, ?, ?)",
+                [(path, start, end, title, text) for start, end, title, text in chunks])
+            self.conn.execute("INSERT OR REPLACE INTO chunk_files (path, content_hash) VALUES (?, ?)",
+                              (path, file_hash))
+        return True
+
+    def update_text(self, path, text):
+        return self.update(path, content_hash(text), chunk_text(path, text))
+
+    def remove(self, path):
+        if not self.available:
+            return
+        with self.transaction():
+            self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM chunk_files WHERE path = ?", (path,))
+
+    def outside_paths(self):
+        # Files attached as chat context from outside the vault are stored under their absolute path
+        if not self.available:
+            return []
+        return [path for (path,) in self._reader().execute("SELECT path FROM chunk_files") if os.path.isabs(path)]
+
+    def search(self, query, limit=20, paths=None):
+        """Best matching chunks for query (bm25, title hits weighted up), optionally only from paths."""
+        match = match_expression(query)
+        if not self.available or not match:
+            return []
+        sql = ("SELECT chunks.path, chunks.start_line, chunks.end_line, chunks.title, chunks.text, "
+               "bm25(chunk_terms, 2.0, 1.0) FROM chunk_terms JOIN chunks ON chunks.id = chunk_terms.rowid "
+               "WHERE chunk_terms MATCH ?")
+        params = [match]
+        if paths is not None:
+            paths = list(paths)
+            if not paths:
+                return []
+            sql += f" AND chunks.path IN ({','.join('?' * len(paths))})"
+            params.extend(paths)
+        sql += " ORDER BY bm25(chunk_terms, 2.0, 1.0) LIMIT ?"
+        params.append(limit)
+        # bm25() is lower-is-better, flip it so higher scores mean more relevant like everywhere else
+        return [Chunk(path, start, end, title, text, -rank)
+                for path, start, end, title, text, rank in self._reader().execute(sql, params)]
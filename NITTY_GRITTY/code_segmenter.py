@@ -0,0 +1,149 @@
+#code_segmenter.py
+# Cuts source text into the blocks the diff merger compares side by side. Python is cut along its syntax
+# tree: the module preamble, each group of imports, each top-level function and class, and each method
+# (nested classes included) as a block of its own, with decorators and the comment lines right above.
+# Anything that doesn't parse, or isn't Python, is cut at header lines (def/class/import...) instead.
+# Blocks are contiguous and cover the whole text, so joining their contents gives the text back. Their ids
+# are qualified names ('def Foo.bar'), numbered when a name repeats, so the same block gets the same id
+# on both sides and across edits; each carries a content hash so unchanged blocks can skip diffing.
+import ast
+from collections import OrderedDict
+
+from NITTY_GRITTY.chunk_index import content_hash
+
+DEFAULT_KEY_SYMBOLS = ('def', 'class', 'import')
+IMPORT_SYMBOLS = ('import ', 'from ')
+SEGMENT_CACHE_SIZE = 16
+
+
+def _node_start(node):
+    return min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+
+
+def _python_starts(tree):
+    # (0-based first line, id, kind) of every block start, in order
+    starts = []
+
+    def visit(body, prefix):
+        previous_import = False
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                starts.append((_node_start(node) - 1, f"def {prefix}{node.name}", 'def'))
+            elif isinstance(node, ast.ClassDef):
+                starts.append((_node_start(node) - 1, f"class {prefix}{node.name}", 'class'))
+                visit(node.body, f"{prefix}{node.name}.")
+            elif isinstance(node, (ast.Import, ast.ImportFrom)) and not prefix:
+                if not previous_import:
+                    starts.append((node.lineno - 1, 'imports', 'imports'))
+            previous_import = isinstance(node, (ast.Import, ast.ImportFrom))
+
+    visit(tree.body, '')
+    return starts
+
+
+def _header_starts(lines, key_symbols):
+    starts = []
+    previous_import = False
+    for number, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped.startswith(tuple(key_symbols)):
+            if stripped:
+                previous_import = False
+            continue
+        is_import = stripped.startswith(IMPORT_SYMBOLS)
+        if is_import and previous_import:
+            continue
+        starts.append((number, 'imports' if is_import else stripped.rstrip(':{ '), 'header'))
+        previous_import = is_import
+    return starts
+
+
+def _attach_comments(lines, starts):
+    # Comment lines directly above a block (no blank line between) belong to it
+    adjusted = []
+    floor = 0
+    for line, block_id, kind in starts:
+        while line > floor and lines[line - 1].lstrip().startswith('#'):
+            line -= 1
+        adjusted.append((line, block_id, kind))
+        floor = line + 1
+    return adjusted
+
+
+def segment_code(text, language='python', key_symbols=DEFAULT_KEY_SYMBOLS):
+    """Blocks of text as an OrderedDict id -> {'id', 'kind', 'content', 'start_line', 'end_line' (0-based,
+    inclusive), 'start', 'end' (character offsets), 'hash'}."""
+    lines = text.split('\n')
+    starts = None
+    if language == 'python':
+        try:
+            starts = _attach_comments(lines, _python_starts(ast.parse(text)))
+        except (SyntaxError, ValueError):
+            pass
+    if starts is None:
+        starts = _header_starts(lines, key_symbols)
+    if not starts or starts[0][0] > 0:
+        starts.insert(0, (0, 'module', 'module'))
+
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+
+    blocks = OrderedDict()
+    seen = {}
+    for index, (first, block_id, kind) in enumerate(starts):
+        last = (starts[index + 1][0] if index + 1 < len(starts) else len(lines)) - 1
+        if last < first:
+            continue  # two starts on one line
+        seen[block_id] = seen.get(block_id, 0) + 1
+        if seen[block_id] > 1:
+            block_id = f"{block_id} ({seen[block_id]})"
+        content = '\n'.join(lines[first:last + 1])
+        blocks[block_id] = {
+            'id': block_id,
+            'kind': kind,
+            'content': content,
+            'start_line': first,
+            'end_line': last,
+            'start': offsets[first],
+            'end': offsets[last + 1] - 1,
+            'hash': content_hash(content),
+        }
+    return blocks
+
+
+def merge_block_order(primary, secondary):
+    """Ids of both sides in primary's order, with ids only in secondary placed after their predecessor there."""
+    extra_after = {}
+    previous = None
+    primary_ids = set(primary)
+    for block_id in secondary:
+        if block_id in primary_ids:
+            previous = block_id
+        else:
+            extra_after.setdefault(previous, []).append(block_id)
+    order = list(extra_after.get(None, []))
+    for block_id in primary:
+        order.append(block_id)
+        order.extend(extra_after.get(block_id, []))
+    return order
+
+
+class CodeSegmenter:
+    # segment_code with a small cache, so a side whose text didn't change isn't parsed again
+    def __init__(self, key_symbols=DEFAULT_KEY_SYMBOLS, cache_size=SEGMENT_CACHE_SIZE):
+        self.key_symbols = tuple(key_symbols)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def segment(self, text, language='python'):
+        key = (content_hash(text), language)
+        blocks = self.cache.get(key)
+        if blocks is None:
+            blocks = segment_code(text, language, self.key_symbols)
+            self.cache[key] = blocks
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return blocks
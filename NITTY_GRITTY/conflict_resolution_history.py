@@ -1,19 +1,201 @@
-class ConflictResolutionHistory:
-    
-    #so this should be considered carefully as to what "is" a resolution
-    #it could be as simple as a boolean of whether the merge conflict was resolved or not
-    #or it could be a more complex description of the resolution
-    #or it could be a merge suggestion
-    #or it could be a AI generated merge suggestion
-    #or it could be a human generated merge suggestion
-    #or it could be a combination of these things
-    #or it could be a resolution that is part of a larger pattern
-    #or it could be a resolution that is part of a smaller pattern
-    #maybe to skip steps, and suggest later iteration
-       def record_resolution(self, conflict, resolution):
-           # Record how a specific conflict was resolved
-           pass
-
-       def get_similar_past_resolutions(self, conflict):
-           # Retrieve similar past resolutions to guide current merge
-           pass
\ No newline at end of file
+#conflict_resolution_history.py
+# How merge conflicts were resolved before, so the merger can suggest a side for one that looks familiar.
+# A conflict is reduced to the lines that differ between its two sides (ours-only and theirs-only, as the
+# diff between them sees it), tokenized with whitespace dropped and numbers/strings collapsed. Its
+# fingerprint is a MinHash signature over 3-token shingles of those lines. Signatures are stored in SQLite
+# with LSH band keys (BANDS bands of ROWS values), so a lookup fetches only the few past conflicts sharing a
+# band with it, however many are stored; the CANDIDATE_LIMIT sharing the most bands are ranked by estimated
+# Jaccard similarity. Only the changed lines and hand-written resolutions are kept, compressed.
+# A resolution is the side that was kept ('ours', 'theirs', 'base', 'both') or the lines written by hand.
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from NITTY_GRITTY import diff_engine
+from NITTY_GRITTY.vault_database import VaultDatabase
+
+HISTORY_DB_NAME = 'conflict_resolutions.db'
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # 16 bands of 4: a pair at 0.5 similarity shares a band 64% of the time, at 0.7 99%
+SHINGLE_SIZE = 3
+MIN_SIMILARITY = 0.5
+CANDIDATE_LIMIT = 64
+MAX_ENTRIES = 50000
+PRUNE_EVERY = 1000
+
+TOKEN_PATTERN = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|\d[\w.]*|\w+|[^\w\s]')
+
+_rng = random.Random(0x5EED)  # fixed, signatures must stay comparable across sessions
+PERM_A = np.array([_rng.getrandbits(64) | 1 for _ in range(NUM_PERM)], dtype=np.uint64)[:, None]
+PERM_B = np.array([_rng.getrandbits(64) for _ in range(NUM_PERM)], dtype=np.uint64)[:, None]
+
+
+def _token(token):
+    if token[0] in '"\'':
+        return '""'
+    if token[0].isdigit():
+        return '0'
+    return token
+
+
+def conflict_sides(conflict):
+    # (ours, theirs) lines of a MergeConflict or of a dict with 'ours' / 'theirs'
+    if isinstance(conflict, dict):
+        return list(conflict.get('ours', [])), list(conflict.get('theirs', []))
+    return list(conflict.ours), list(conflict.theirs)
+
+
+def changed_lines(ours, theirs):
+    """The lines only in ours and only in theirs, stripped, with the lines both sides share dropped."""
+    ours = [line.strip() for line in ours]
+    theirs = [line.strip() for line in theirs]
+    ours_only, theirs_only = [], []
+    for tag, i1, i2, j1, j2 in diff_engine.opcodes(ours, theirs):
+        if tag != 'equal':
+            ours_only.extend(ours[i1:i2])
+            theirs_only.extend(theirs[j1:j2])
+    return ours_only, theirs_only
+
+
+def shingles(ours_only, theirs_only):
+    result = set()
+    for tag, lines in (('o', ours_only), ('t', theirs_only)):
+        tokens = [_token(token) for line in lines for token in TOKEN_PATTERN.findall(line)]
+        if len(tokens) < SHINGLE_SIZE:
+            result.add(f"{tag}\x1f" + '\x1f'.join(tokens))
+            continue
+        for i in range(len(tokens) - SHINGLE_SIZE + 1):
+            result.add(f"{tag}\x1f" + '\x1f'.join(tokens[i:i + SHINGLE_SIZE]))
+    return result
+
+
+def minhash(shingle_set):
+    # NUM_PERM multiply-shift hashes (wrapping uint64 arithmetic, top 32 bits) of each shingle's 64-bit
+    # digest, minimum per hash
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+                          for shingle in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    return ((PERM_A * hashes + PERM_B) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature):
+    # One signed 64-bit key per band, the band number included so equal rows in different bands don't collide
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(bytes([band]) + rows.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def similarity(signature, other):
+    return int(np.count_nonzero(signature == other)) / NUM_PERM
+
+
+def open_history(app_data_dir=None):
+    """The history in app_data_dir (~/.computinator_code by default), or None if it can't be opened."""
+    app_data_dir = app_data_dir or os.path.join(os.path.expanduser("~"), ".computinator_code")
+    try:
+        os.makedirs(app_data_dir, exist_ok=True)
+        return ConflictResolutionHistory(app_data_dir)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"Conflict resolution history unavailable: {e}")
+        return None
+
+
+class ConflictResolutionHistory(VaultDatabase):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS resolutions (
+            id INTEGER PRIMARY KEY,
+            fingerprint BLOB NOT NULL,
+            signature BLOB NOT NULL,
+            side TEXT,
+            hunk BLOB NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS resolutions_fingerprint ON resolutions (fingerprint);
+        CREATE TABLE IF NOT EXISTS resolution_bands (
+            band_key INTEGER NOT NULL,
+            resolution_id INTEGER NOT NULL,
+            PRIMARY KEY (band_key, resolution_id)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, data_dir, db_name=HISTORY_DB_NAME):
+        super().__init__(data_dir, db_name)
+
+    def fingerprint(self, conflict):
+        """(changed lines, exact fingerprint, MinHash signature) of a conflict."""
+        ours_only, theirs_only = changed_lines(*conflict_sides(conflict))
+        normalized = json.dumps([ours_only, theirs_only]).encode('utf-8')
+        exact = hashlib.blake2b(normalized, digest_size=16).digest()
+        return (ours_only, theirs_only), exact, minhash(shingles(ours_only, theirs_only))
+
+    def record_resolution(self, conflict, resolution):
+        """Record how a conflict was resolved: a side name, or the lines it was replaced with."""
+        if not self.available:
+            return None
+        (ours_only, theirs_only), exact, signature = self.fingerprint(conflict)
+        side = resolution if isinstance(resolution, str) else None
+        lines = None if side else list(resolution)
+        hunk = zlib.compress(json.dumps({'ours': ours_only, 'theirs': theirs_only, 'resolution': lines}).encode('utf-8'))
+        with self.transaction():
+            cursor = self.conn.execute(
+                "INSERT INTO resolutions (fingerprint, signature, side, hunk, created) VALUES (?, ?, ?, ?, ?)",
+                (exact, signature.tobytes(), side, hunk, time.time()))
+            resolution_id = cursor.lastrowid
+            self.conn.executemany("INSERT OR IGNORE INTO resolution_bands (band_key, resolution_id) VALUES (?, ?)",
+                                  [(key, resolution_id) for key in band_keys(signature)])
+        if resolution_id % PRUNE_EVERY == 0:
+            self.prune()
+        return resolution_id
+
+    def get_similar_past_resolutions(self, conflict, limit=5, min_similarity=MIN_SIMILARITY):
+        """Past resolutions of conflicts like this one, most similar (then most recent) first. Each is a dict
+        with id, similarity, side, and for hand-written resolutions the lines."""
+        if not self.available:
+            return []
+        _, exact, signature = self.fingerprint(conflict)
+        reader = self._reader()
+        keys = band_keys(signature)
+        candidates = []
+        for resolution_id, fingerprint, blob, side, hunk in reader.execute(
+                "SELECT id, fingerprint, signature, side, hunk FROM resolutions WHERE fingerprint = ? OR id IN ("
+                f"SELECT resolution_id FROM resolution_bands WHERE band_key IN ({','.join('?' * len(keys))}) "
+                "GROUP BY resolution_id ORDER BY COUNT(*) DESC, resolution_id DESC LIMIT ?)",
+                [exact] + keys + [CANDIDATE_LIMIT]):
+            score = 1.0 if fingerprint == exact else similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= min_similarity:
+                candidates.append((score, resolution_id, side, hunk))
+        candidates.sort(key=lambda candidate: (-candidate[0], -candidate[1]))
+        return [{'id': resolution_id, 'similarity': score, 'side': side,
+                 'resolution': json.loads(zlib.decompress(hunk))['resolution']}
+                for score, resolution_id, side, hunk in candidates[:limit]]
+
+    def suggest_side(self, conflict, sides=('ours', 'theirs')):
+        """The side similar past conflicts were mostly resolved with, weighted by similarity, or None."""
+        weights = defaultdict(float)
+        for past in self.get_similar_past_resolutions(conflict, limit=10):
+            weights[past['side']] += past['similarity']
+        candidates = {side: weight for side, weight in weights.items() if side in sides}
+        if not candidates:
+            return None
+        side = max(candidates, key=candidates.get)
+        return side if candidates[side] > sum(weights.values()) / 2 else None
+
+    def prune(self, max_entries=MAX_ENTRIES):
+        with self.transaction():
+            row = self.conn.execute("SELECT id FROM resolutions ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                    (max_entries,)).fetchone()
+            if row is not None:
+                self.conn.execute("DELETE FROM resolution_bands WHERE resolution_id <= ?", row)
+                self.conn.execute("DELETE FROM resolutions WHERE id <= ?", row)
@@ -0,0 +1,298 @@
+#diff_engine.py
+# Line diffs for the merge tools. difflib.ndiff compares every changed line against every other one to find
+# the intraline '?' hints, which is fine for a snippet and hopeless for a file with a few thousand changed
+# lines. Here lines are interned to integer ids first and matched by one of:
+#   myers      - minimal edit script, linear space (divide and conquer on the middle snake)
+#   patience   - anchors on lines unique to both sides, myers between them
+#   histogram  - git's variant of patience, anchors on the rarest common lines (the default; reads best on code)
+# ndiff() produces the '  ' / '- ' / '+ ' lines the widgets already consume. The '?' hints are opt-in and only
+# computed for the replaced hunks, by difflib on just those lines.
+import difflib
+from bisect import bisect_left
+
+ALGORITHMS = ('myers', 'patience', 'histogram')
+DEFAULT_ALGORITHM = 'histogram'
+HISTOGRAM_MAX_CHAIN = 64  # lines occurring more often than this can't anchor a histogram match
+INTRALINE_MAX_PAIRS = 10000  # bigger replaced hunks pair their lines in order instead of difflib's best-match search
+INTRALINE_CUTOFF = 0.75  # as difflib: lines less similar than this are shown as plain - / +
+
+
+def intern_lines(a, b):
+    """Map both line sequences to integer ids, equal lines getting equal ids."""
+    ids = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b]
+    return a_ids, b_ids
+
+
+def _trim(a, alo, ahi, b, blo, bhi, blocks):
+    # Common prefix and suffix of a region, which no algorithm needs to look at
+    start = alo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    if alo > start:
+        blocks.append((start, blo - (alo - start), alo - start))
+    end = ahi
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+    if ahi < end:
+        blocks.append((ahi, bhi, end - ahi))
+    return alo, ahi, blo, bhi
+
+
+def _middle_snake(a, alo, ahi, b, blo, bhi):
+    # The middle snake of an optimal path (Myers 1986, section 4b): searches forward from the start and
+    # backward from the end at once until the two meet. Returns (x, y, u, v), the snake running from
+    # (x, y) to (u, v) in region coordinates.
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    offset = n + m + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    for d in range((n + m + 1) // 2 + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1 and x + backward[offset + delta - k] >= n:
+                return start_x, start_y, x, y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return n - x, m - y, n - start_x, m - start_y
+    raise AssertionError("middle snake not found")
+
+
+def _myers(a, alo, ahi, b, blo, bhi, blocks):
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi, blocks)
+        if alo == ahi or blo == bhi:
+            continue
+        if set(a[alo:ahi]).isdisjoint(b[blo:bhi]):
+            continue  # a rewritten stretch: nothing to match, and the snake search would be quadratic in it
+        x, y, u, v = _middle_snake(a, alo, ahi, b, blo, bhi)
+        if u > x:
+            blocks.append((alo + x, blo + y, u - x))
+        stack.append((alo, alo + x, blo, blo + y))
+        stack.append((alo + u, ahi, blo + v, bhi))
+
+
+def _unique_anchors(a, alo, ahi, b, blo, bhi):
+    # Lines occurring exactly once on each side, as (a index, b index) in a order, reduced to the longest
+    # run that is increasing in b as well (patience sorting)
+    counts = {}
+    for i in range(alo, ahi):
+        entry = counts.get(a[i])
+        counts[a[i]] = [1, i, 0, 0] if entry is None else [entry[0] + 1, i, 0, 0]
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+    pairs = sorted((entry[1], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[2] == 1)
+    if not pairs:
+        return pairs
+    tails = []  # b index ending the best run of each length
+    tail_pair = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        length = bisect_left(tails, j)
+        if length == len(tails):
+            tails.append(j)
+            tail_pair.append(index)
+        else:
+            tails[length] = j
+            tail_pair[length] = index
+        previous[index] = tail_pair[length - 1] if length else None
+    anchors = []
+    index = tail_pair[-1]
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _patience(a, alo, ahi, b, blo, bhi, blocks):
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi, blocks)
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if not anchors:
+            _myers(a, alo, ahi, b, blo, bhi, blocks)
+            continue
+        for i, j in anchors:
+            blocks.append((i, j, 1))
+            stack.append((alo, i, blo, j))
+            alo, blo = i + 1, j + 1
+        stack.append((alo, ahi, blo, bhi))
+
+
+def _histogram_match(a, alo, ahi, b, blo, bhi):
+    # The common run whose rarest line is rarest in a (longest on a tie), as git's histogram diff picks it.
+    # Like git, lines more frequent than the best run found so far aren't tried as its start
+    occurrences = {}
+    get = occurrences.get
+    for i in range(alo, ahi):
+        positions = get(a[i])
+        if positions is None:
+            occurrences[a[i]] = [i]
+        else:
+            positions.append(i)
+    best = None  # (count, -length, i, j, length)
+    best_count = HISTOGRAM_MAX_CHAIN
+    j = blo
+    while j < bhi:
+        positions = get(b[j])
+        next_j = j + 1
+        if positions is None or len(positions) > best_count:
+            j = next_j
+            continue
+        for i in positions:
+            count = len(positions)
+            start_i, start_j = i, j
+            while start_i > alo and start_j > blo and a[start_i - 1] == b[start_j - 1]:
+                start_i -= 1
+                start_j -= 1
+                count = min(count, len(occurrences[a[start_i]]))
+            end_i, end_j = i + 1, j + 1
+            while end_i < ahi and end_j < bhi and a[end_i] == b[end_j]:
+                count = min(count, len(occurrences[a[end_i]]))
+                end_i += 1
+                end_j += 1
+            if end_j > next_j:
+                next_j = end_j
+            candidate = (count, start_i - end_i, start_i, start_j, end_i - start_i)
+            if best is None or candidate < best:
+                best = candidate
+                best_count = count
+        j = next_j
+    return best
+
+
+def _histogram(a, alo, ahi, b, blo, bhi, blocks):
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi, blocks)
+        if alo == ahi or blo == bhi:
+            continue
+        match = _histogram_match(a, alo, ahi, b, blo, bhi)
+        if match is None:
+            _myers(a, alo, ahi, b, blo, bhi, blocks)
+            continue
+        _, _, i, j, length = match
+        blocks.append((i, j, length))
+        stack.append((alo, i, blo, j))
+        stack.append((i + length, ahi, j + length, bhi))
+
+
+MATCHERS = {'myers': _myers, 'patience': _patience, 'histogram': _histogram}
+
+
+def matching_blocks(a, b, algorithm=DEFAULT_ALGORITHM):
+    """(i, j, n) triples with a[i:i+n] == b[j:j+n], ascending, like SequenceMatcher.get_matching_blocks()."""
+    if algorithm not in MATCHERS:
+        raise ValueError(f"Unknown diff algorithm: {algorithm}")
+    a_ids, b_ids = intern_lines(a, b)
+    blocks = []
+    MATCHERS[algorithm](a_ids, 0, len(a_ids), b_ids, 0, len(b_ids), blocks)
+    blocks.sort()
+    merged = []
+    for i, j, n in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + n)
+        else:
+            merged.append((i, j, n))
+    merged.append((len(a), len(b), 0))
+    return merged
+
+
+def opcodes(a, b, algorithm=DEFAULT_ALGORITHM):
+    """Same shape as SequenceMatcher.get_opcodes(): (tag, i1, i2, j1, j2) covering both sequences."""
+    codes = []
+    i = j = 0
+    for block_i, block_j, n in matching_blocks(a, b, algorithm):
+        if i < block_i and j < block_j:
+            codes.append(('replace', i, block_i, j, block_j))
+        elif i < block_i:
+            codes.append(('delete', i, block_i, j, block_j))
+        elif j < block_j:
+            codes.append(('insert', i, block_i, j, block_j))
+        if n:
+            codes.append(('equal', block_i, block_i + n, block_j, block_j + n))
+        i, j = block_i + n, block_j + n
+    return codes
+
+
+def _intraline(a, b):
+    # Lines of a big replaced hunk paired in order, with difflib's '?' markers for those similar enough
+    result = []
+    for a_line, b_line in zip(a, b):
+        matcher = difflib.SequenceMatcher(None, a_line, b_line)
+        if matcher.real_quick_ratio() < INTRALINE_CUTOFF or matcher.ratio() < INTRALINE_CUTOFF:
+            result.extend(('- ' + a_line, '+ ' + b_line))
+            continue
+        a_tags, b_tags = [], []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'replace':
+                a_tags.append('^' * (i2 - i1))
+                b_tags.append('^' * (j2 - j1))
+            elif tag == 'delete':
+                a_tags.append('-' * (i2 - i1))
+            elif tag == 'insert':
+                b_tags.append('+' * (j2 - j1))
+            else:
+                a_tags.append(' ' * (i2 - i1))
+                b_tags.append(' ' * (j2 - j1))
+        for prefix, line, tags in (('- ', a_line, ''.join(a_tags).rstrip()), ('+ ', b_line, ''.join(b_tags).rstrip())):
+            result.append(prefix + line)
+            if tags:
+                result.append(f"? {tags}\n")
+    result.extend('- ' + line for line in a[len(b):])
+    result.extend('+ ' + line for line in b[len(a):])
+    return result
+
+
+def ndiff(a, b, algorithm=DEFAULT_ALGORITHM, intraline=False):
+    """difflib.ndiff-style lines ('  ', '- ', '+ ' and, with intraline, '? ') for two lists of lines."""
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes(a, b, algorithm):
+        if tag == 'equal':
+            result.extend('  ' + line for line in a[i1:i2])
+        elif tag == 'replace' and intraline:
+            if (i2 - i1) * (j2 - j1) <= INTRALINE_MAX_PAIRS:
+                # The lines of a replaced hunk never match each other exactly, so this is only difflib's
+                # close-match pairing, over this hunk alone
+                result.extend(difflib.Differ().compare(a[i1:i2], b[j1:j2]))
+            else:
+                result.extend(_intraline(a[i1:i2], b[j1:j2]))
+        else:
+            result.extend('- ' + line for line in a[i1:i2])
+            result.extend('+ ' + line for line in b[j1:j2])
+    return result
@@ -0,0 +1,105 @@
+#document_scanner.py
+# One pass over a document for everything the vault cares about: #tags, [[links]] and @references.
+# The file is read once (memory-mapped when large) and a single alternation regex runs over the raw
+# bytes, so we never decode the whole file or walk it three times.
+import mmap
+import re
+import logging
+
+MMAP_THRESHOLD = 256 * 1024  # files at least this big are scanned through mmap instead of read()
+
+# UTF-8 continuation/lead bytes are all >= 0x80, so [\w\x80-\xff] keeps non-ASCII words intact. It also takes
+# in non-ASCII punctuation (“#tag”, #foo—bar), so matches with such bytes are decoded and cut down to their
+# leading \w+ run, which is what the str regexes used to match.
+_WORD = rb'[\w\x80-\xff]+'
+TOKEN_PATTERN = re.compile(rb'\[\[(.*?)\]\]|#(' + _WORD + rb')|@(' + _WORD + rb')')
+# Link text can itself carry tags/references ([[note#heading]]), the old separate regexes saw those too
+INNER_PATTERN = re.compile(rb'#(' + _WORD + rb')|@(' + _WORD + rb')')
+
+
+class DocumentScan:
+    """Tags, links and references of one document as (value, line) pairs, lines 1-based."""
+
+    __slots__ = ('tags', 'links', 'references', 'size')
+
+    def __init__(self):
+        self.tags = []
+        self.links = []
+        self.references = []
+        self.size = 0
+
+    @staticmethod
+    def _unique(pairs):
+        return list(dict.fromkeys(value for value, _ in pairs))
+
+    def unique_tags(self):
+        return self._unique(self.tags)
+
+    def unique_links(self):
+        return self._unique(self.links)
+
+    def unique_references(self):
+        return self._unique(self.references)
+
+
+def _decode(raw):
+    return raw.decode('utf-8', errors='replace')
+
+
+_STR_WORD = re.compile(r'\w+')
+
+
+def _word(raw):
+    if raw.isascii():
+        return raw.decode('ascii')
+    match = _STR_WORD.match(_decode(raw))
+    return match.group() if match else None
+
+
+def scan_buffer(buffer, scan=None):
+    # buffer can be bytes or an mmap, both support the bytes regex and slicing
+    scan = scan if scan is not None else DocumentScan()
+    scan.size = len(buffer)
+    line = 1
+    last = 0
+    # bytes.count takes bounds and avoids copying the gap, mmap has no count() so slice there
+    count = buffer.count if isinstance(buffer, bytes) else (lambda sub, lo, hi: buffer[lo:hi].count(sub))
+    for match in TOKEN_PATTERN.finditer(buffer):
+        start = match.start()
+        line += count(b'\n', last, start)
+        last = start
+        link, tag, ref = match.groups()
+        if link is not None:
+            scan.links.append((_decode(link), line))
+            for inner in INNER_PATTERN.finditer(link):
+                inner_tag, inner_ref = inner.groups()
+                word = _word(inner_tag if inner_tag is not None else inner_ref)
+                if word is None:
+                    continue
+                (scan.tags if inner_tag is not None else scan.references).append((word, line))
+        else:
+            word = _word(tag if tag is not None else ref)
+            if word is not None:
+                (scan.tags if tag is not None else scan.references).append((word, line))
+    return scan
+
+
+def scan_text(text):
+    return scan_buffer(text.encode('utf-8'))
+
+
+def scan_document(file_path):
+    scan = DocumentScan()
+    try:
+        with open(file_path, 'rb') as f:
+            size = f.seek(0, 2)
+            if size == 0:
+                return scan
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return scan_buffer(buffer, scan)
+            f.seek(0)
+            return scan_buffer(f.read(), scan)
+    except (OSError, ValueError) as e:
+        logging.error(f"Error scanning document {file_path}: {str(e)}")
+        return scan
@@ -0,0 +1,126 @@
+#file_search.py
+# Fuzzy content search over a list of files, fanned out over a process pool (fuzzywuzzy is pure Python and
+# holds the GIL, threads would not help). Results come back in batches and only the best max_results are
+# kept; every search carries its own cancel token so a new query can drop the previous one mid-flight.
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fuzzywuzzy import fuzz
+
+from NITTY_GRITTY.search_index import MATCH_THRESHOLD, match_lines, read_text
+from NITTY_GRITTY.vault_indexer import default_worker_count
+
+MAX_RESULTS = 1000
+BATCH_SIZE = 200
+PARALLEL_THRESHOLD = 64  # fewer files than this are searched inline, the pool round trip isn't worth it
+SHARD_SIZE = 16
+FILENAME_MATCH = "[Filename Match]"
+
+
+def search_file(query, file_path, threshold=MATCH_THRESHOLD):
+    # (score, file_path, line_number, text) tuples; line 0 is a filename match.
+    # Binaries and files over the size cap are only matched by name.
+    results = []
+    filename_score = fuzz.partial_ratio(query, os.path.basename(file_path))
+    if filename_score > threshold:
+        results.append((filename_score, file_path, 0, FILENAME_MATCH))
+    data = read_text(file_path)
+    if data is not None:
+        text = data.decode('utf-8', errors='replace')
+        results.extend((score, file_path, line_number, line)
+                       for line_number, score, line in match_lines(query, text, threshold))
+    return results
+
+
+def search_shard(query, file_paths, threshold=MATCH_THRESHOLD):
+    # Runs in a worker process
+    results = []
+    for file_path in file_paths:
+        try:
+            results.extend(search_file(query, file_path, threshold))
+        except OSError as e:
+            logging.warning(f"Skipping {file_path} while searching: {e}")
+    return results
+
+
+class FileSearchEngine:
+    def __init__(self, workers=None, max_results=MAX_RESULTS, batch_size=BATCH_SIZE,
+                 parallel_threshold=PARALLEL_THRESHOLD, shard_size=SHARD_SIZE, threshold=MATCH_THRESHOLD):
+        self.workers = workers or default_worker_count()
+        self.max_results = max_results
+        self.batch_size = batch_size
+        self.parallel_threshold = parallel_threshold
+        self.shard_size = shard_size
+        self.threshold = threshold
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def _executor(self):
+        # Kept across searches, spawning worker processes costs more than a typical query. Spawned workers
+        # re-import __main__, which main.py keeps empty outside its guard, so they only load this module.
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            return self.executor
+
+    def search(self, query, file_paths, cancelled=None):
+        """Yield batches of (score, file_path, line_number, text) as files are searched.
+
+        Only results that make it into the running top ``max_results`` are
+        yielded, so a consumer keeping the best ``max_results`` it has seen ends
+        up with the exact top-k. Stops as soon as ``cancelled`` (a
+        threading.Event) is set.
+        """
+        cancelled = cancelled or threading.Event()
+        top = []  # min-heap of (score, sequence)
+        batch = []
+        sequence = 0
+        for results in self._shard_results(query, file_paths, cancelled):
+            for result in results:
+                sequence += 1
+                if len(top) < self.max_results:
+                    heapq.heappush(top, (result[0], -sequence))
+                elif result[0] > top[0][0]:
+                    heapq.heapreplace(top, (result[0], -sequence))
+                else:
+                    continue
+                batch.append(result)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+                batch = []
+
+    def _shard_results(self, query, file_paths, cancelled):
+        shards = [file_paths[i:i + self.shard_size] for i in range(0, len(file_paths), self.shard_size)]
+        if self.workers <= 1 or len(file_paths) < self.parallel_threshold:
+            for shard in shards:
+                if cancelled.is_set():
+                    return
+                yield search_shard(query, shard, self.threshold)
+            return
+
+        executor = self._executor()
+        futures = [executor.submit(search_shard, query, shard, self.threshold) for shard in shards]
+        try:
+            for future in as_completed(futures):
+                if cancelled.is_set():
+                    logging.debug(f"Search for '{query}' cancelled")
+                    return
+                yield future.result()
+        finally:
+            # Queued shards of a cancelled (or abandoned) search must not hold up the next one
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
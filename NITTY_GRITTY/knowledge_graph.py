@@ -1,4 +1,204 @@
-from collections import defaultdict
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter, defaultdict
+from itertools import accumulate, chain, repeat
+from operator import sub
+
+# Node names are interned to integer ids and every relation (links, tags, references) is stored as a
+# compressed sparse row table over those ids, forward and reverse. Edits go to a per-source overlay
+# that supersedes the CSR row; the writer folds the overlay back in after a batch of edits once it has
+# grown big enough, so a bulk build pays for one compaction and reads never modify the tables.
+COMPACT_MIN_OVERLAY = 1024
+
+# Snapshot file: header, then length-prefixed blobs (name tables, CSR arrays per relation, filesets).
+# The signature ties a snapshot to the index fingerprints it was built from.
+SNAPSHOT_NAME = '.vault_graph.snapshot'
+SNAPSHOT_MAGIC = b'CCKG'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sIB32s')  # magic, version, little-endian flag, signature
+BLOB_LENGTH = struct.Struct('<Q')
+COMPACT_OVERLAY_RATIO = 1.0  # overlay at least as big as the CSR base, so rebuilds double in size
+
+
+class Interner:
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return node_id
+
+    def get(self, name):
+        return self.ids.get(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Relation:
+    def __init__(self, source_names, target_names):
+        self.source_names = source_names
+        self.target_names = target_names
+        self.clear()
+
+    def clear(self):
+        self.offsets = array('q', [0])
+        self.targets = array('i')
+        self.rev_offsets = array('q', [0])
+        self.rev_sources = array('i')
+        self.overlay = {}
+        self.overlay_rev = defaultdict(set)
+
+    def _base_row(self, source):
+        if source + 1 < len(self.offsets):
+            return self.targets[self.offsets[source]:self.offsets[source + 1]]
+        return ()
+
+    def _base_rev_row(self, target):
+        if target + 1 < len(self.rev_offsets):
+            return self.rev_sources[self.rev_offsets[target]:self.rev_offsets[target + 1]]
+        return ()
+
+    def _editable_row(self, source):
+        row = self.overlay.get(source)
+        if row is None:
+            row = self.overlay[source] = set(self._base_row(source))
+            for target in row:
+                self.overlay_rev[target].add(source)
+        return row
+
+    def add(self, source, target):
+        row = self.overlay.get(source)
+        if row is None:
+            row = self._editable_row(source)
+        if target not in row:
+            row.add(target)
+            self.overlay_rev[target].add(source)
+
+    def set_row(self, source, targets):
+        row = self._editable_row(source)
+        new_row = set(targets)
+        for target in row - new_row:
+            self.overlay_rev[target].discard(source)
+        for target in new_row - row:
+            self.overlay_rev[target].add(source)
+        self.overlay[source] = new_row
+
+    def row(self, source):
+        row = self.overlay.get(source)
+        return row if row is not None else self._base_row(source)
+
+    def rev_row(self, target):
+        # Base sources that have an overlay row are stale, the overlay reverse index covers them
+        sources = [s for s in self._base_rev_row(target) if s not in self.overlay]
+        extra = self.overlay_rev.get(target)
+        if extra:
+            sources.extend(extra)
+        return sources
+
+    def sources(self):
+        base = (s for s in range(len(self.offsets) - 1)
+                if s not in self.overlay and self.offsets[s] != self.offsets[s + 1])
+        return [*base, *(s for s, row in self.overlay.items() if row)]
+
+    def targets_in_use(self):
+        base = (t for t in range(len(self.rev_offsets) - 1) if self.rev_row(t))
+        return [*base, *(t for t in self.overlay_rev if t + 1 >= len(self.rev_offsets) and self.overlay_rev[t])]
+
+    def maybe_compact(self):
+        if len(self.overlay) > max(COMPACT_MIN_OVERLAY, COMPACT_OVERLAY_RATIO * len(self.targets)):
+            self.compact()
+
+    def compact(self):
+        if not self.overlay:
+            return
+        source_count = len(self.source_names)
+        target_count = len(self.target_names)
+        old_offsets, old_targets = self.offsets, self.targets
+        base_count = len(old_offsets) - 1
+        lengths = array('q', map(sub, old_offsets[1:], old_offsets[:-1]))
+        lengths.extend(repeat(0, source_count - base_count))
+        # Unchanged runs of base rows are copied slice by slice, only overlay rows are touched one at a time
+        targets = array('i')
+        position = 0
+        for source in sorted(self.overlay):
+            end = min(source, base_count)
+            if position < end:
+                targets.extend(old_targets[old_offsets[position]:old_offsets[end]])
+            row = sorted(self.overlay[source])
+            targets.extend(row)
+            lengths[source] = len(row)
+            position = source + 1
+        if position < base_count:
+            targets.extend(old_targets[old_offsets[position]:old_offsets[base_count]])
+        offsets = array('q', [0])
+        offsets.extend(accumulate(lengths))
+        # Reverse CSR: stable sort of the edges by target, then prefix sums of the per-target counts
+        edge_sources = array('i', chain.from_iterable(repeat(source, n) for source, n in enumerate(lengths) if n))
+        order = sorted(range(len(targets)), key=targets.__getitem__)
+        rev_sources = array('i', map(edge_sources.__getitem__, order))
+        counts = Counter(targets)
+        rev_offsets = array('q', [0])
+        rev_offsets.extend(accumulate(counts.get(target, 0) for target in range(target_count)))
+        self.offsets, self.targets = offsets, targets
+        self.rev_offsets, self.rev_sources = rev_offsets, rev_sources
+        self.overlay = {}
+        self.overlay_rev = defaultdict(set)
+
+
+class RelationView:
+    # Read-only dict-like face of a relation so code written against the old defaultdict(set)
+    # attributes (graph.links[file], graph.tags.get(file, []), graph.links.items()) keeps working
+    def __init__(self, relation, source_names, target_names, reverse=False):
+        self.relation = relation
+        self.source_names = source_names
+        self.target_names = target_names
+        self.reverse = reverse
+
+    def _lookup(self, key):
+        key_id = self.source_names.get(key)
+        if key_id is None:
+            return None
+        ids = self.relation.rev_row(key_id) if self.reverse else self.relation.row(key_id)
+        names = self.target_names.names
+        return {names[i] for i in ids}
+
+    def __getitem__(self, key):
+        return self._lookup(key) or set()
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return value if value else default
+
+    def __contains__(self, key):
+        return bool(self._lookup(key))
+
+    def keys(self):
+        ids = self.relation.targets_in_use() if self.reverse else self.relation.sources()
+        names = self.source_names.names
+        return [names[i] for i in ids]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
 
 class KnowledgeGraph:
     def __init__(self):
@@ -6,26 +206,149 @@ class KnowledgeGraph:
         self._is_dirty = False
 
     def clear(self):
-        self.links = defaultdict(set)
-        self.tags = defaultdict(set)
-        self.references = defaultdict(set)
-        self.backlinks = defaultdict(set)
+        self.nodes = Interner()  # files and link targets
+        self.tag_names = Interner()
+        self.reference_names = Interner()
+        self.link_relation = Relation(self.nodes, self.nodes)
+        self.tag_relation = Relation(self.nodes, self.tag_names)
+        self.reference_relation = Relation(self.nodes, self.reference_names)
+        self.links = RelationView(self.link_relation, self.nodes, self.nodes)
+        self.backlinks = RelationView(self.link_relation, self.nodes, self.nodes, reverse=True)
+        self.tags = RelationView(self.tag_relation, self.nodes, self.tag_names)
+        self.files_by_tag = RelationView(self.tag_relation, self.tag_names, self.nodes, reverse=True)
+        self.references = RelationView(self.reference_relation, self.nodes, self.reference_names)
+        self.files_by_reference = RelationView(self.reference_relation, self.reference_names, self.nodes, reverse=True)
         self.filesets = defaultdict(set)
+        self._aggregates = {}
         self._is_dirty = True
 
+    def _changed(self):
+        self._aggregates.clear()
+        self._is_dirty = True
+
+    def compact(self):
+        # Fold all pending edits into the CSR tables; cheap when there is nothing pending
+        for relation in (self.link_relation, self.tag_relation, self.reference_relation):
+            relation.compact()
+
+    def maybe_compact(self):
+        # Writer side only, after a batch of edits: reads must not rebuild tables another thread is using
+        for relation in (self.link_relation, self.tag_relation, self.reference_relation):
+            relation.maybe_compact()
+
     def add_link(self, source, target):
-        self.links[source].add(target)
-        self.backlinks[target].add(source)
+        self.link_relation.add(self.nodes.intern(source), self.nodes.intern(target))
+        self._changed()
 
     def add_tag(self, file, tag):
-        self.tags[file].add(tag)
+        self.tag_relation.add(self.nodes.intern(file), self.tag_names.intern(tag))
+        self._changed()
 
     def add_reference(self, file, reference):
-        self.references[file].add(reference)
+        self.reference_relation.add(self.nodes.intern(file), self.reference_names.intern(reference))
+        self._changed()
+
+    def replace_file_edges(self, file, links=(), tags=(), references=()):
+        # Retracts the file's old outgoing edges (and the backlinks they produced) and adds the new ones,
+        # touching only this file's rows
+        node = self.nodes.intern(file)
+        self.link_relation.set_row(node, [self.nodes.intern(link) for link in links])
+        self.tag_relation.set_row(node, [self.tag_names.intern(tag) for tag in tags])
+        self.reference_relation.set_row(node, [self.reference_names.intern(ref) for ref in references])
+        self._changed()
+
+    def remove_file(self, file):
+        # Links pointing at the file are other files' edges and stay, as do fileset memberships
+        node = self.nodes.get(file)
+        if node is None:
+            return
+        for relation in (self.link_relation, self.tag_relation, self.reference_relation):
+            relation.set_row(node, ())
+        self._changed()
 
     def get_backlinks(self, file):
         return self.backlinks[file]
 
+    def save_snapshot(self, snapshot_path, signature):
+        self.compact()
+        blobs = [
+            '\0'.join(self.nodes.names).encode('utf-8'),
+            '\0'.join(self.tag_names.names).encode('utf-8'),
+            '\0'.join(self.reference_names.names).encode('utf-8'),
+        ]
+        for relation in (self.link_relation, self.tag_relation, self.reference_relation):
+            blobs.extend(table.tobytes() for table in
+                         (relation.offsets, relation.targets, relation.rev_offsets, relation.rev_sources))
+        blobs.append(json.dumps({name: sorted(files) for name, files in self.filesets.items()}).encode('utf-8'))
+
+        tmp_path = f"{snapshot_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == 'little', signature))
+            for blob in blobs:
+                f.write(BLOB_LENGTH.pack(len(blob)))
+                f.write(blob)
+        os.replace(tmp_path, snapshot_path)
+
+    @staticmethod
+    def read_snapshot_signature(snapshot_path):
+        # Header only, so a stale snapshot is rejected without reading the tables
+        try:
+            with open(snapshot_path, 'rb') as f:
+                header = f.read(SNAPSHOT_HEADER.size)
+        except OSError:
+            return None
+        if len(header) != SNAPSHOT_HEADER.size:
+            return None
+        magic, version, little_endian, signature = SNAPSHOT_HEADER.unpack(header)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or little_endian != (sys.byteorder == 'little'):
+            return None
+        return signature
+
+    def load_snapshot(self, snapshot_path, signature=None):
+        # Returns False (graph untouched) when the file is missing, corrupt or built from another index state
+        stored_signature = self.read_snapshot_signature(snapshot_path)
+        if stored_signature is None or (signature is not None and stored_signature != signature):
+            return False
+        try:
+            with open(snapshot_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                blobs = []
+                position = SNAPSHOT_HEADER.size
+                while position < len(data):
+                    (length,) = BLOB_LENGTH.unpack_from(data, position)
+                    position += BLOB_LENGTH.size
+                    if position + length > len(data):
+                        raise ValueError("truncated snapshot")
+                    blobs.append(data[position:position + length])
+                    position += length
+            if len(blobs) != 16:
+                raise ValueError(f"expected 16 sections, found {len(blobs)}")
+
+            self.clear()
+            for interner, blob in zip((self.nodes, self.tag_names, self.reference_names), blobs[:3]):
+                names = blob.decode('utf-8').split('\0') if blob else []
+                interner.names = names
+                interner.ids = {name: i for i, name in enumerate(names)}
+            tables = iter(blobs[3:15])
+            for relation in (self.link_relation, self.tag_relation, self.reference_relation):
+                relation.offsets = array('q', next(tables))
+                relation.targets = array('i', next(tables))
+                relation.rev_offsets = array('q', next(tables))
+                relation.rev_sources = array('i', next(tables))
+            for name, files in json.loads(blobs[15].decode('utf-8')).items():
+                self.filesets[name] = set(files)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring knowledge graph snapshot {snapshot_path}: {e}")
+            self.clear()
+            return False
+        self._is_dirty = False
+        return True
+
+    def get_files_with_tag(self, tag):
+        return self.files_by_tag[tag]
+
+    def get_files_with_reference(self, reference):
+        return self.files_by_reference[reference]
+
     def get_connected_nodes(self, file):
         connected = set()
         connected.update(self.links[file])
@@ -34,17 +357,24 @@ class KnowledgeGraph:
         connected.update(self.references[file])
         return connected
 
+    def _aggregate(self, key, compute):
+        value = self._aggregates.get(key)
+        if value is None:
+            value = self._aggregates[key] = compute()
+        return list(value)
+
     def get_all_tags(self):
-        return list(set(tag for tags in self.tags.values() for tag in tags))
+        return self._aggregate('tags', self.files_by_tag.keys)
 
     def get_all_references(self):
-        return list(set(ref for refs in self.references.values() for ref in refs))
+        return self._aggregate('references', self.files_by_reference.keys)
 
     def get_all_files(self):
-        return list(self.links.keys())
+        return self._aggregate('files', self.links.keys)
 
     def get_all_backlinks(self):
-        return list(set(file for backlinks in self.backlinks.values() for file in backlinks))
+        # Every file that links somewhere is somebody's backlink
+        return self._aggregate('backlinks', self.links.keys)
 
     def add_file_to_fileset(self, fileset_name, file_path):
         self.filesets[fileset_name].add(file_path)
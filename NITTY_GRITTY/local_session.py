@@ -0,0 +1,110 @@
+#local_session.py
+# A resident llama.cpp model plus what it has already evaluated. llama.cpp keeps the tokens of the last
+# prompt+reply in its KV cache and only evaluates the part of the next prompt that differs, so a chat that
+# resends the same system instructions, attached context and history only pays for the new turn - as long
+# as the model stays loaded and nothing else ran on it in between. This keeps it that way: one session per
+# loaded model, one generation at a time, the evaluated state can be saved to disk and restored after a
+# restart, and every generation records how much of the prompt was reused vs. evaluated.
+import logging
+import os
+import pickle
+import threading
+import time
+
+from llama_cpp import Llama, LlamaRAMCache
+
+SESSION_FORMAT = 1
+
+
+class LocalInferenceSession:
+    def __init__(self, model, name, prompt_cache_bytes=0):
+        self.model = model
+        self.name = name
+        self.lock = threading.Lock()  # a llama context can't run two generations at once
+        self.last_timings = None
+        if prompt_cache_bytes:
+            # Snapshots of earlier conversations, so switching back to one doesn't re-evaluate it. Every
+            # reply copies the whole context state in, so it's opt-in
+            model.set_cache(LlamaRAMCache(capacity_bytes=prompt_cache_bytes))
+
+    def evaluated_tokens(self):
+        return self.model.input_ids[:self.model.n_tokens].tolist()
+
+    def stream_chat(self, messages, max_tokens):
+        """create_chat_completion(stream=True) chunks; timings land in last_timings when the stream ends."""
+        with self.lock:
+            evaluated = self.evaluated_tokens()
+            start = time.perf_counter()
+            first_chunk = None
+            generated = 0
+            try:
+                for chunk in self.model.create_chat_completion(messages=messages, max_tokens=max_tokens,
+                                                               stream=True):
+                    if first_chunk is None:
+                        # The first chunk only comes once the whole prompt has been evaluated
+                        first_chunk = time.perf_counter()
+                    if chunk['choices'][0]['delta'].get('content'):
+                        generated += 1
+                    yield chunk
+            finally:
+                self.last_timings = self._timings(evaluated, start, first_chunk, time.perf_counter(), generated)
+
+    def _timings(self, evaluated, start, first_chunk, end, generated):
+        context = self.evaluated_tokens()
+        prompt_tokens = max(0, len(context) - generated)
+        reused = min(Llama.longest_token_prefix(evaluated, context), prompt_tokens)
+        prompt_time = (first_chunk or end) - start
+        generation_time = end - first_chunk if first_chunk is not None else 0.0
+        return {
+            'prompt_tokens': prompt_tokens,
+            'reused_tokens': reused,
+            'evaluated_tokens': prompt_tokens - reused,
+            'prompt_eval_time': prompt_time,
+            'prompt_tokens_per_second': (prompt_tokens - reused) / prompt_time if prompt_time > 0 else 0.0,
+            'generated_tokens': generated,
+            'generation_time': generation_time,
+            'generation_tokens_per_second': generated / generation_time if generation_time > 0 else 0.0,
+        }
+
+    def save(self, path):
+        """Write the evaluated context (KV cache and tokens) to path. Returns False if there's nothing to save."""
+        with self.lock:
+            if self.model.n_tokens == 0:
+                return False
+            state = self.model.save_state()
+        # Logits of every batch row come along (hundreds of MB with a large vocabulary) but only the last
+        # one is ever sampled from; load_state broadcasts a single row back over the rest
+        state.scores = state.scores[-1:].copy()
+        data = {'format': SESSION_FORMAT, 'model_path': self.model.model_path, 'n_ctx': self.model.n_ctx(),
+                'state': state}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        logging.info(f"Saved {state.n_tokens}-token session for {self.name} ({state.llama_state_size} bytes)")
+        return True
+
+    def restore(self, path):
+        """Load a context saved by save() for this same model. Returns False if there is none that fits."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Could not read session {path}: {e}")
+            return False
+        if (data.get('format') != SESSION_FORMAT or data.get('model_path') != self.model.model_path
+                or data.get('n_ctx') != self.model.n_ctx()):
+            logging.info(f"Session {path} was saved for a different model or context size, ignoring it")
+            return False
+        with self.lock:
+            try:
+                self.model.load_state(data['state'])
+            except Exception as e:
+                logging.warning(f"Could not restore session {path}: {e}")
+                self.model.reset()
+                return False
+        logging.info(f"Restored {data['state'].n_tokens}-token session for {self.name}")
+        return True
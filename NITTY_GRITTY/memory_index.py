@@ -0,0 +1,75 @@
+#memory_index.py
+# BM25 ranking over the AI memory store as one sparse matrix. Each memory is vectorized once (hashed term
+# counts, so there is no vocabulary to refit when memories come and go); a query is one sparse
+# matrix-vector product plus argpartition for the top-k.
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+N_FEATURES = 2 ** 18
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+class MemoryIndex:
+    def __init__(self, n_features=N_FEATURES, k1=BM25_K1, b=BM25_B):
+        # \w+ rather than sklearn's 2+ char default: single-letter identifiers matter in code
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None,
+                                            stop_words='english', token_pattern=r'(?u)\b\w+\b')
+        self.k1 = k1
+        self.b = b
+        self.term_counts = {}  # content -> 1 x n_features csr row of raw term counts
+        self.memories = []  # the memories self.weights was built for, in row order
+        self.weights = None
+        self.idf = None
+
+    def add(self, content):
+        # Vectorize at add time so the first query after a burst of adds only has to stack rows
+        if content not in self.term_counts:
+            self.term_counts[content] = self.vectorizer.transform([content])
+
+    def sync(self, memories):
+        """Rebuild the weight matrix if the (description, content) list changed since the last query.
+
+        The memory lists are plain lists other code edits directly, so the
+        comparison is against a copy of what was indexed; equal entries are
+        the same objects, which makes the check a pointer walk.
+        """
+        if memories == self.memories and self.weights is not None:
+            return
+        self.memories = list(memories)
+        live = set()
+        for _, content in self.memories:
+            self.add(content)
+            live.add(content)
+        for content in [c for c in self.term_counts if c not in live]:
+            del self.term_counts[content]
+        if not self.memories:
+            self.weights = self.idf = None
+            return
+
+        counts = sp.vstack([self.term_counts[content] for _, content in self.memories], format='csr')
+        n_docs = counts.shape[0]
+        doc_lengths = np.asarray(counts.sum(axis=1)).ravel()
+        average_length = doc_lengths.mean() or 1.0
+        doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+        self.idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        # BM25 term saturation and length normalisation folded into the stored weights
+        row_lengths = np.repeat(doc_lengths, np.diff(counts.indptr))
+        tf = counts.data
+        counts.data = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * row_lengths / average_length))
+        self.weights = counts
+
+    def top_k(self, query, memories, k):
+        """Return [(memory_position, score)] for the k best memories, best first."""
+        self.sync(memories)
+        if self.weights is None or k <= 0:
+            return []
+        query_terms = self.vectorizer.transform([query])
+        query_vector = np.zeros(self.weights.shape[1])
+        query_vector[query_terms.indices] = self.idf[query_terms.indices]
+        scores = self.weights @ query_vector
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(i), float(scores[i])) for i in best]
@@ -0,0 +1,171 @@
+#merge_engine.py
+# Three-way line merge, for applying a change (theirs) that was made against an older copy of a file (base)
+# to the file as it is now (ours). Both sides are diffed against base with diff_engine; the base lines
+# neither side touched split the file into stable stretches, and each stretch in between is a hunk:
+# changed on one side only -> that side wins, changed identically on both -> taken once, changed differently
+# -> a MergeConflict (after moving lines both sides agree on at its start and end out of it, as git does).
+# Works on lists of lines with their line endings, so a clean merge reproduces the text exactly.
+from NITTY_GRITTY import diff_engine
+
+MARKER_SIZE = 7
+SIDES = ('ours', 'theirs', 'base', 'both')
+
+
+class MergeConflict:
+    # One overlapping hunk. The *_range are (start, end) line ranges in each input.
+    def __init__(self, index, base, ours, theirs, base_range, ours_range, theirs_range):
+        self.index = index
+        self.base = base
+        self.ours = ours
+        self.theirs = theirs
+        self.base_range = base_range
+        self.ours_range = ours_range
+        self.theirs_range = theirs_range
+
+    def lines(self, side):
+        if side == 'both':
+            return self.ours + self.theirs
+        return getattr(self, side)
+
+    def __repr__(self):
+        return f"MergeConflict({self.index}, base={self.base_range}, ours={self.ours_range}, theirs={self.theirs_range})"
+
+
+class MergeResult:
+    # chunks: ('stable' | 'ours' | 'theirs' | 'same', lines) or ('conflict', MergeConflict), in file order
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.conflicts = [chunk for kind, chunk in chunks if kind == 'conflict']
+        self.auto_merged = sum(1 for kind, _ in chunks if kind in ('ours', 'theirs', 'same'))
+
+    @property
+    def clean(self):
+        return not self.conflicts
+
+    def lines(self, resolution=None, labels=('ours', 'theirs'), show_base=False):
+        """Merged lines. Conflicts are resolved by resolution (a side name, or a dict conflict index -> side
+        name or list of lines) where given, and written out between git-style markers otherwise."""
+        merged = []
+        for kind, chunk in self.chunks:
+            if kind != 'conflict':
+                merged.extend(chunk)
+                continue
+            choice = resolution.get(chunk.index) if isinstance(resolution, dict) else resolution
+            if isinstance(choice, list):
+                merged.extend(choice)
+            elif choice is not None:
+                merged.extend(chunk.lines(choice))
+            else:
+                merged.extend(_marked(chunk, labels, show_base))
+        return merged
+
+    def text(self, resolution=None, labels=('ours', 'theirs'), show_base=False):
+        return ''.join(self.lines(resolution, labels, show_base))
+
+    def conflict_ranges(self, labels=('ours', 'theirs'), show_base=False):
+        """(start, end) line range of each conflict's marked-up block in lines() with no resolution."""
+        ranges = []
+        position = 0
+        for kind, chunk in self.chunks:
+            length = len(_marked(chunk, labels, show_base)) if kind == 'conflict' else len(chunk)
+            if kind == 'conflict':
+                ranges.append((position, position + length))
+            position += length
+        return ranges
+
+
+def _marked(conflict, labels, show_base):
+    lines = [f"{'<' * MARKER_SIZE} {labels[0]}\n"] + _terminated(conflict.ours)
+    if show_base:
+        lines += [f"{'|' * MARKER_SIZE} base\n"] + _terminated(conflict.base)
+    lines += [f"{'=' * MARKER_SIZE}\n"] + _terminated(conflict.theirs) + [f"{'>' * MARKER_SIZE} {labels[1]}\n"]
+    return lines
+
+
+def _terminated(lines):
+    # A side ending without a newline would run into the following marker
+    if lines and not lines[-1].endswith('\n'):
+        return lines[:-1] + [lines[-1] + '\n']
+    return lines
+
+
+def _as_lines(text):
+    return text.splitlines(keepends=True) if isinstance(text, str) else list(text)
+
+
+def _sync_regions(base_ours, base_theirs, base_len, ours_len, theirs_len):
+    # Base stretches matched unchanged on both sides: (base start, base end, ours start, theirs start)
+    regions = []
+    i = j = 0
+    while i < len(base_ours) and j < len(base_theirs):
+        ours_base, ours_start, ours_size = base_ours[i]
+        theirs_base, theirs_start, theirs_size = base_theirs[j]
+        start = max(ours_base, theirs_base)
+        end = min(ours_base + ours_size, theirs_base + theirs_size)
+        if start < end:
+            regions.append((start, end, ours_start + start - ours_base, theirs_start + start - theirs_base))
+        if ours_base + ours_size < theirs_base + theirs_size:
+            i += 1
+        else:
+            j += 1
+    regions.append((base_len, base_len, ours_len, theirs_len))
+    return regions
+
+
+def merge3(base, ours, theirs, algorithm=diff_engine.DEFAULT_ALGORITHM):
+    """Merge the changes base -> theirs into ours. Each argument is a string or a list of lines."""
+    base, ours, theirs = _as_lines(base), _as_lines(ours), _as_lines(theirs)
+    # Whole-file shortcuts, the common case when merging a fileset
+    if ours == theirs or theirs == base:
+        return MergeResult([('stable', ours)])
+    if ours == base:
+        return MergeResult([('stable', theirs)])
+
+    regions = _sync_regions(diff_engine.matching_blocks(base, ours, algorithm)[:-1],
+                            diff_engine.matching_blocks(base, theirs, algorithm)[:-1],
+                            len(base), len(ours), len(theirs))
+    chunks = []
+    conflicts = 0
+    base_at = ours_at = theirs_at = 0
+    for base_start, base_end, ours_start, theirs_start in regions:
+        base_hunk = base[base_at:base_start]
+        ours_hunk = ours[ours_at:ours_start]
+        theirs_hunk = theirs[theirs_at:theirs_start]
+        if base_hunk or ours_hunk or theirs_hunk:
+            if ours_hunk == base_hunk:
+                chunks.append(('theirs', theirs_hunk))
+            elif theirs_hunk == base_hunk:
+                chunks.append(('ours', ours_hunk))
+            elif ours_hunk == theirs_hunk:
+                chunks.append(('same', ours_hunk))
+            else:
+                # Lines both sides agree on at the edges of the hunk aren't part of the conflict
+                head = 0
+                while head < min(len(ours_hunk), len(theirs_hunk)) and ours_hunk[head] == theirs_hunk[head]:
+                    head += 1
+                tail = 0
+                while (tail < min(len(ours_hunk), len(theirs_hunk)) - head
+                       and ours_hunk[-1 - tail] == theirs_hunk[-1 - tail]):
+                    tail += 1
+                if head:
+                    chunks.append(('same', ours_hunk[:head]))
+                chunks.append(('conflict', MergeConflict(
+                    conflicts, base_hunk,
+                    ours_hunk[head:len(ours_hunk) - tail], theirs_hunk[head:len(theirs_hunk) - tail],
+                    (base_at, base_start),
+                    (ours_at + head, ours_start - tail), (theirs_at + head, theirs_start - tail))))
+                conflicts += 1
+                if tail:
+                    chunks.append(('same', ours_hunk[len(ours_hunk) - tail:]))
+        if base_end > base_start:
+            chunks.append(('stable', base[base_start:base_end]))
+        base_at = base_end
+        ours_at = ours_start + base_end - base_start
+        theirs_at = theirs_start + base_end - base_start
+    return MergeResult(chunks)
+
+
+def merge_fileset(jobs, algorithm=diff_engine.DEFAULT_ALGORITHM):
+    """jobs: iterable of (path, base, ours, theirs). Yields (path, MergeResult)."""
+    for path, base, ours, theirs in jobs:
+        yield path, merge3(base, ours, theirs, algorithm)
@@ -0,0 +1,66 @@
+#message_parser.py
+# Splits a streamed AI reply into text and fenced code parts while it streams, so the chat does not have
+# to regex the whole response again when it finishes. Produces exactly what AIChatWidget.process_message
+# produces for the full text:
+#   ('text', text) and ('code', language, file_path, code)
+# for fences of the form ```language:file_path\n code \n```.
+import re
+
+HEADER_PATTERN = re.compile(r'(\w+)?:?(.*)', re.DOTALL)
+
+
+class StreamingMessageParser:
+    def __init__(self):
+        self.text = ''
+        self.parts = []
+        self.done = 0  # everything before this offset has been turned into parts
+        self.fence = None  # offset of the open ``` while inside a code block
+        self.header_end = None  # offset of the newline ending the open fence's header line
+        self.search_from = 0  # where the next fence/newline search resumes, nothing before it is rescanned
+
+    def feed(self, chunk):
+        """Add streamed text, return the parts that became complete."""
+        self.text += chunk
+        completed = []
+        while True:
+            if self.fence is None:
+                # Back up two characters so a ``` split across chunks is still found
+                start = self.text.find('```', max(self.done, self.search_from - 2))
+                if start < 0:
+                    self.search_from = len(self.text)
+                    break
+                self.fence = start
+                self.search_from = start + 3
+            if self.header_end is None:
+                newline = self.text.find('\n', self.search_from)
+                if newline < 0:
+                    self.search_from = len(self.text)
+                    break
+                self.header_end = newline
+                self.search_from = newline + 1
+            close = self.text.find('\n```', max(self.header_end + 1, self.search_from - 3))
+            if close < 0:
+                self.search_from = len(self.text)
+                break
+            completed.extend(self._close_block(close))
+        self.parts.extend(completed)
+        return completed
+
+    def _close_block(self, close):
+        parts = []
+        if self.fence > self.done:
+            parts.append(('text', self.text[self.done:self.fence]))
+        language, file_path = HEADER_PATTERN.match(self.text, self.fence + 3, self.header_end).groups()
+        code = self.text[self.header_end + 1:close]
+        parts.append(('code', language or 'text', file_path.strip() if file_path else None, code))
+        self.done = self.search_from = close + 4
+        self.fence = self.header_end = None
+        return parts
+
+    def finish(self):
+        """Flush the tail (including an unclosed fence, as text) and return all parts."""
+        if self.done < len(self.text):
+            self.parts.append(('text', self.text[self.done:]))
+            self.done = len(self.text)
+        self.fence = self.header_end = None
+        return self.parts
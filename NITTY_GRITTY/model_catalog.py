@@ -0,0 +1,141 @@
+#model_catalog.py
+# Which local models there are to pick from: GGUFs already on disk (where the download manager puts them)
+# and the GGUF files of the Hugging Face repo. The repo listing is cached on disk with a TTL, so the chat
+# doesn't hit the network on every start and still has a list when offline; an expired listing is shown
+# right away and refreshed behind it. ModelCatalogWorker does all of this off the UI thread and reports
+# each source as soon as it has it.
+import json
+import logging
+import os
+import time
+
+import requests
+from PyQt6.QtCore import pyqtSignal
+
+from NITTY_GRITTY.ThreadTrackers import SafeQThread
+
+DEFAULT_REPO_ID = "Joseph717171/Llama-3.1-SuperNova-Lite-8.0B-OQ8_0.EF32.IQ4_K-Q8_0-GGUF"
+LOCAL_MODEL_DIRS = [os.path.join(os.path.expanduser("~"), ".cache", "ollama_models")]
+CATALOG_TTL = 24 * 3600  # seconds a fetched repo listing is trusted
+FETCH_TIMEOUT = 10
+CATALOG_FORMAT = 1
+GGUF_MAGIC = b'GGUF'
+
+
+def is_gguf(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == GGUF_MAGIC
+    except OSError:
+        return False
+
+
+def scan_local_models(directories=None):
+    """GGUF files under directories as [{'name', 'path', 'size', 'source': 'local'}]."""
+    models = []
+    for directory in directories or LOCAL_MODEL_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for root, _, files in os.walk(directory):
+            for file_name in sorted(files):
+                if not file_name.lower().endswith('.gguf'):
+                    continue
+                path = os.path.join(root, file_name)
+                # Skips leftovers that aren't models at all (an HTML error page saved as .gguf)
+                if not is_gguf(path):
+                    logging.info(f"Skipping {path}: not a GGUF file")
+                    continue
+                models.append({'name': file_name, 'path': path, 'size': os.path.getsize(path), 'source': 'local'})
+    return models
+
+
+def fetch_repo_models(repo_id, timeout=FETCH_TIMEOUT):
+    """GGUF files of a Hugging Face model repo as [{'name', 'size', 'source': 'remote'}]."""
+    response = requests.get(f"https://huggingface.co/api/models/{repo_id}", params={'blobs': 'true'},
+                            timeout=timeout)
+    response.raise_for_status()
+    return [{'name': sibling['rfilename'], 'size': sibling.get('size'), 'source': 'remote'}
+            for sibling in response.json().get('siblings', [])
+            if sibling['rfilename'].lower().endswith('.gguf')]
+
+
+class ModelCatalogCache:
+    # {repo_id: {'fetched_at': epoch, 'models': [...]}} in one JSON file
+    def __init__(self, path, ttl=CATALOG_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable model catalog cache {self.path}: {e}")
+            return {}
+        return data.get('repos', {}) if data.get('format') == CATALOG_FORMAT else {}
+
+    def get(self, repo_id):
+        """(models, fresh) from the cache; models is None if the repo was never fetched."""
+        entry = self._load().get(repo_id)
+        if entry is None:
+            return None, False
+        try:
+            return list(entry['models']), time.time() - entry['fetched_at'] < self.ttl
+        except (KeyError, TypeError) as e:
+            logging.warning(f"Ignoring malformed model catalog entry for {repo_id}: {e!r}")
+            return None, False
+
+    def put(self, repo_id, models):
+        repos = self._load()
+        repos[repo_id] = {'fetched_at': time.time(), 'models': models}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': CATALOG_FORMAT, 'repos': repos}, f)
+        os.replace(temp_path, self.path)
+
+
+class ModelCatalogWorker(SafeQThread):
+    models_found = pyqtSignal(list)  # one batch per source, local files first
+    catalog_error = pyqtSignal(str)  # the repo listing couldn't be fetched and nothing was cached
+
+    def __init__(self, cache, repo_id=DEFAULT_REPO_ID, local_dirs=None, force_refresh=False):
+        super().__init__()
+        self.cache = cache
+        self.repo_id = repo_id
+        self.local_dirs = local_dirs
+        self.force_refresh = force_refresh
+
+    def run(self):
+        # Whatever goes wrong, the model list must hear about it instead of waiting forever
+        try:
+            self.discover()
+        except Exception as e:
+            logging.exception(f"Model discovery for {self.repo_id} failed")
+            self.catalog_error.emit(str(e))
+
+    def discover(self):
+        local_models = scan_local_models(self.local_dirs)
+        if local_models:
+            self.models_found.emit(local_models)
+
+        cached, fresh = self.cache.get(self.repo_id)
+        if cached:
+            self.models_found.emit(cached)
+        if fresh and not self.force_refresh:
+            return
+        try:
+            models = fetch_repo_models(self.repo_id)
+        except Exception as e:
+            if cached is None:
+                self.catalog_error.emit(str(e))
+            else:
+                logging.warning(f"Could not refresh model list for {self.repo_id}, using cached list: {e}")
+            return
+        try:
+            self.cache.put(self.repo_id, models)
+        except OSError as e:
+            logging.warning(f"Could not write model catalog cache {self.cache.path}: {e}")
+        self.models_found.emit(models)
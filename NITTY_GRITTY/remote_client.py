@@ -0,0 +1,244 @@
+#remote_client.py
+# Streaming chat completions from remote providers without tying up the caller. One asyncio loop runs in a
+# background thread and keeps one pooled httpx.AsyncClient per provider, so connections (and their TLS
+# sessions) are reused across requests and any number of requests can be in flight at once. Responses are
+# read as server-sent events and handed to a callback delta by delta. Connection failures, timeouts, 429s
+# and 5xx answers are retried with exponential backoff, but only before the first delta arrived - a stream
+# that already produced text can't be replayed without duplicating it.
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+
+import httpx
+
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 60.0  # longest silence tolerated between two streamed chunks
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+MAX_CONNECTIONS = 10  # per provider
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class RemoteGenerationError(Exception):
+    def __init__(self, message, status=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class OpenAIProvider:
+    name = 'openai'
+    default_base_url = 'https://api.openai.com'
+    key_env = 'OPENAI_API_KEY'
+    url_env = 'OPENAI_BASE_URL'
+
+    def headers(self, api_key):
+        return {'Authorization': f'Bearer {api_key}'}
+
+    def request(self, model, messages, max_tokens):
+        return '/v1/chat/completions', {
+            'model': model, 'messages': messages, 'max_tokens': max_tokens, 'stream': True,
+        }
+
+    def delta(self, event, data):
+        """Text carried by one SSE event, None if it carries none. Raises on an error event."""
+        if data == '[DONE]':
+            return None
+        payload = json.loads(data)
+        if 'error' in payload:
+            raise RemoteGenerationError(payload['error'].get('message', str(payload['error'])))
+        choices = payload.get('choices') or [{}]
+        return choices[0].get('delta', {}).get('content')
+
+
+class AnthropicProvider:
+    name = 'anthropic'
+    default_base_url = 'https://api.anthropic.com'
+    key_env = 'ANTHROPIC_API_KEY'
+    url_env = 'ANTHROPIC_BASE_URL'
+    api_version = '2023-06-01'
+
+    def headers(self, api_key):
+        return {'x-api-key': api_key, 'anthropic-version': self.api_version}
+
+    def request(self, model, messages, max_tokens):
+        # The Messages API takes the system prompt separately from the turns
+        system = '\n\n'.join(m['content'] for m in messages if m['role'] == 'system')
+        body = {
+            'model': model.lower(), 'max_tokens': max_tokens, 'stream': True,
+            'messages': [{'role': m['role'], 'content': m['content']} for m in messages if m['role'] != 'system'],
+        }
+        if system:
+            body['system'] = system
+        return '/v1/messages', body
+
+    def delta(self, event, data):
+        if event == 'error':
+            error = json.loads(data).get('error', {})
+            raise RemoteGenerationError(error.get('message', data),
+                                        retryable=error.get('type') == 'overloaded_error')
+        if event != 'content_block_delta':
+            return None
+        return json.loads(data).get('delta', {}).get('text')
+
+
+PROVIDERS = {provider.name: provider for provider in (OpenAIProvider(), AnthropicProvider())}
+
+
+def provider_for_model(model_name):
+    name = (model_name or '').lower()
+    if name.startswith('claude'):
+        return 'anthropic'
+    if name.startswith(('gpt', 'o1', 'o3', 'chatgpt')):
+        return 'openai'
+    raise ValueError(f"Unknown remote model: {model_name}")
+
+
+async def iter_sse(response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event, data = None, []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield event, '\n'.join(data)
+            event, data = None, []
+        elif line.startswith(':'):
+            continue  # keep-alive comment
+        elif line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data.append(line[5:].lstrip())
+    if data:
+        yield event, '\n'.join(data)
+
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    # Full jitter so concurrent requests that failed together don't retry together
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class RemoteClient:
+    def __init__(self, max_retries=MAX_RETRIES, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_connections=MAX_CONNECTIONS):
+        self.max_retries = max_retries
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.clients = {}  # (provider, base_url) -> httpx.AsyncClient, only touched on the loop thread
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, daemon=True, name="remote-client")
+                self.thread.start()
+            return self.loop
+
+    def _client(self, provider, base_url):
+        key = (provider.name, base_url)
+        client = self.clients.get(key)
+        if client is None:
+            client = httpx.AsyncClient(base_url=base_url, timeout=self.timeout, limits=self.limits)
+            self.clients[key] = client
+        return client
+
+    def submit(self, provider_name, model, messages, max_tokens, api_key, on_delta, base_url=None):
+        """Start a streamed generation; returns a concurrent.futures.Future with the full text.
+
+        on_delta(text) is called from the client's loop thread for every
+        streamed piece. cancel(future) stops the request at once, closing
+        its connection (a waiting retry is dropped as well).
+        """
+        provider = PROVIDERS[provider_name]
+        api_key = api_key or os.environ.get(provider.key_env, '')
+        base_url = base_url or os.environ.get(provider.url_env) or provider.default_base_url
+        coroutine = self._generate(provider, base_url, model, messages, max_tokens, api_key, on_delta)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def cancel(self, future):
+        # Done callbacks run in the thread that cancels; doing it on the loop thread keeps them ordered
+        # after every on_delta already called there
+        with self.lock:
+            loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(future.cancel)
+
+    async def _generate(self, provider, base_url, model, messages, max_tokens, api_key, on_delta):
+        client = self._client(provider, base_url)
+        path, body = provider.request(model, messages, max_tokens)
+        headers = provider.headers(api_key)
+        parts = []
+        attempt = 0
+        while True:
+            try:
+                await self._stream(client, provider, path, body, headers, parts, on_delta)
+                return ''.join(parts)
+            except (httpx.TransportError, RemoteGenerationError) as e:
+                # httpx timeouts and connection errors are TransportErrors
+                retryable = isinstance(e, httpx.TransportError) or e.retryable
+                if parts or not retryable or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, getattr(e, 'retry_after', None))
+                attempt += 1
+                logging.warning(f"{provider.name} request failed ({e}), retry {attempt}/{self.max_retries} "
+                                f"in {delay:.1f} s")
+                await asyncio.sleep(delay)
+
+    async def _stream(self, client, provider, path, body, headers, parts, on_delta):
+        async with client.stream('POST', path, json=body, headers=headers) as response:
+            if response.status_code != 200:
+                detail = (await response.aread()).decode('utf-8', errors='replace')[:500]
+                raise RemoteGenerationError(f"{provider.name} returned HTTP {response.status_code}: {detail}",
+                                            status=response.status_code,
+                                            retryable=response.status_code in RETRY_STATUSES,
+                                            retry_after=parse_retry_after(response.headers.get('retry-after')))
+            async for event, data in iter_sse(response):
+                text = provider.delta(event, data)
+                if text:
+                    parts.append(text)
+                    on_delta(text)
+
+    def close(self):
+        with self.lock:
+            loop, self.loop = self.loop, None
+            thread, self.thread = self.thread, None
+        if loop is None:
+            return
+
+        async def close_clients():
+            for client in self.clients.values():
+                await client.aclose()
+            self.clients.clear()
+
+        asyncio.run_coroutine_threadsafe(close_clients(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_remote_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = RemoteClient()
+        return _client
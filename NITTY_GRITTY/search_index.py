@@ -0,0 +1,139 @@
+#search_index.py
+# Persistent content index for file search, kept next to the vault index in .vault_search.db.
+# Every text file is reduced to its distinct lowercase words and stored in an FTS5 trigram table, so a
+# query only has to fuzzy-match the lines of the files that share the most trigrams with it instead of
+# every line of every file in the vault.
+# Needs SQLite >= 3.34 for the trigram tokenizer; without it the index reports unavailable and search
+# falls back to scanning the vault.
+import math
+import re
+from collections import Counter
+
+from fuzzywuzzy import fuzz
+
+from NITTY_GRITTY.vault_database import VaultDatabase
+
+SEARCH_INDEX_NAME = '.vault_search.db'
+SEARCH_INDEX_FILES = {
+    SEARCH_INDEX_NAME, SEARCH_INDEX_NAME + '-wal', SEARCH_INDEX_NAME + '-shm', SEARCH_INDEX_NAME + '-journal',
+}
+MAX_INDEXED_SIZE = 8 * 1024 * 1024  # bigger files are logs/dumps, not something you search by content
+BINARY_SNIFF_SIZE = 8192
+CANDIDATE_LIMIT = 500
+MIN_TRIGRAM_SHARE = 0.5
+MATCH_THRESHOLD = 70
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def read_text(file_path, max_size=MAX_INDEXED_SIZE):
+    # Raw bytes of a searchable file, None for binaries (NUL in the first block) and oversized files
+    with open(file_path, 'rb') as f:
+        data = f.read(max_size + 1)
+    if len(data) > max_size or b'\0' in data[:BINARY_SNIFF_SIZE]:
+        return None
+    return data
+
+
+def extract_terms(data, rel_path=''):
+    text = data.decode('utf-8', errors='replace').lower()
+    words = dict.fromkeys(WORD_PATTERN.findall(rel_path.lower()))
+    words.update(dict.fromkeys(WORD_PATTERN.findall(text)))
+    return ' '.join(words)
+
+
+def query_trigrams(query):
+    trigrams = []
+    for word in WORD_PATTERN.findall(query.lower()):
+        trigrams.extend(word[i:i + 3] for i in range(len(word) - 2))
+    return list(dict.fromkeys(trigrams))
+
+
+def match_lines(query, text, threshold=MATCH_THRESHOLD):
+    """Return (line_number, score, line) for every line scoring above threshold, best first."""
+    matches = []
+    for i, line in enumerate(text.splitlines(), 1):
+        score = fuzz.partial_ratio(query, line)
+        if score > threshold:
+            matches.append((i, score, line.strip()))
+    matches.sort(key=lambda match: (-match[1], match[0]))
+    return matches
+
+
+class SearchIndex(VaultDatabase):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            terms TEXT NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS document_terms USING fts5(
+            terms, content='documents', content_rowid='id', tokenize='trigram', detail='none'
+        );
+        CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+            INSERT INTO document_terms (rowid, terms) VALUES (new.id, new.terms);
+        END;
+        CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+            INSERT INTO document_terms (document_terms, rowid, terms) VALUES ('delete', old.id, old.terms);
+        END;
+        CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+            INSERT INTO document_terms (document_terms, rowid, terms) VALUES ('delete', old.id, old.terms);
+            INSERT INTO document_terms (rowid, terms) VALUES (new.id, new.terms);
+        END;
+    """
+
+    def __init__(self, vault_path):
+        super().__init__(vault_path, SEARCH_INDEX_NAME)
+
+    def update(self, rel_path, terms):
+        """Store the terms of one file, None removes it (it became binary or too big)."""
+        if terms is None:
+            self.remove(rel_path)
+            return
+        if not self.available:
+            return
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO documents (path, terms) VALUES (?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET terms = excluded.terms WHERE terms != excluded.terms",
+                (rel_path, terms))
+
+    def remove(self, rel_path):
+        if not self.available:
+            return
+        with self.transaction():
+            self.conn.execute("DELETE FROM documents WHERE path = ?", (rel_path,))
+
+    def candidates(self, query, limit=CANDIDATE_LIMIT):
+        """Paths of the files sharing the most query trigrams, best first.
+
+        A file qualifies when it has at least MIN_TRIGRAM_SHARE of them, so a
+        typo in the query (which breaks up to three trigrams) still finds it.
+        Returns None when the index can't narrow the query (too short, or no
+        index), callers then have to scan everything.
+        """
+        if not self.is_complete():
+            return None
+        trigrams = query_trigrams(query)
+        if not trigrams:
+            return None
+        reader = self._reader()
+        counts = Counter()
+        for trigram in trigrams:
+            match = '"' + trigram.replace('"', '""') + '"'
+            counts.update(row[0] for row in reader.execute(
+                "SELECT rowid FROM document_terms WHERE document_terms MATCH ?", (match,)))
+        needed = max(1, math.ceil(len(trigrams) * MIN_TRIGRAM_SHARE))
+        ranked = [doc_id for doc_id, count in counts.most_common() if count >= needed][:limit]
+        paths = {}
+        for start in range(0, len(ranked), 500):
+            chunk = ranked[start:start + 500]
+            rows = reader.execute(
+                f"SELECT id, path FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            paths.update(rows)
+        return [paths[doc_id] for doc_id in ranked if doc_id in paths]
+
+    def __len__(self):
+        if not self.available:
+            return 0
+        return self._reader().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
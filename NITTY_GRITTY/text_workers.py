@@ -2,22 +2,23 @@
 
 from PyQt6.QtCore import QThreadPool, pyqtSignal, QObject
 from NITTY_GRITTY.ThreadTrackers import SafeQRunnable
-import difflib
+from NITTY_GRITTY import diff_engine
 
 class WorkerSignals(QObject):
     result = pyqtSignal(object)
 
 class LineComparisonWorker(SafeQRunnable):
-    def __init__(self, text1, text2):
+    # Emits (key, matching blocks); the key comes back unchanged so the receiver can drop stale results
+    def __init__(self, text1, text2, key=None):
         super().__init__(target=self.run)
         self.text1 = text1
         self.text2 = text2
+        self.key = key
         self.signals = WorkerSignals()
 
     def run(self):
         # Ensure both inputs are lists of strings
         lines1 = self.text1.splitlines() if isinstance(self.text1, str) else self.text1
         lines2 = self.text2 if isinstance(self.text2, list) else self.text2.splitlines()
-        
-        diff = list(difflib.ndiff(lines1, lines2))
-        self.signals.result.emit(diff)
\ No newline at end of file
+
+        self.signals.result.emit((self.key, diff_engine.matching_blocks(lines1, lines2)))
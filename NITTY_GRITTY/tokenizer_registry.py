@@ -0,0 +1,85 @@
+#tokenizer_registry.py
+# Process-wide, lazily loaded tokenizers. Loading a Hugging Face tokenizer costs an import of transformers,
+# a hub metadata request and parsing tokenizer.json, so it never happens on the caller's thread: get()
+# hands back the tiktoken fallback right away and the real tokenizer replaces it once a background thread
+# has loaded it. The on-disk HF cache is tried first with local_files_only, so a cached tokenizer never
+# touches the network; only an uncached one is downloaded (still in the background).
+import logging
+import threading
+
+import tiktoken
+
+FALLBACK_ENCODING = "cl100k_base"
+DEFAULT_TOKENIZER_MODEL = "arcee-ai/Llama-3.1-SuperNova-Lite"
+
+
+class TokenizerRegistry:
+    def __init__(self, fallback_encoding=FALLBACK_ENCODING):
+        self.fallback_encoding = fallback_encoding
+        self.lock = threading.Lock()
+        self.tokenizers = {}  # model_name -> tokenizer, or None when it couldn't be loaded
+        self.loaders = {}  # model_name -> loading thread
+        self.fallback_tokenizer = None
+
+    def fallback(self):
+        with self.lock:
+            if self.fallback_tokenizer is None:
+                self.fallback_tokenizer = tiktoken.get_encoding(self.fallback_encoding)
+            return self.fallback_tokenizer
+
+    def request(self, model_name):
+        """Start loading model_name in the background unless it's loaded or loading already."""
+        with self.lock:
+            if model_name in self.tokenizers or model_name in self.loaders:
+                return
+            loader = threading.Thread(target=self._load, args=(model_name,), daemon=True,
+                                      name=f"tokenizer-{model_name}")
+            self.loaders[model_name] = loader
+        loader.start()
+
+    def is_loaded(self, model_name):
+        return self.tokenizers.get(model_name) is not None
+
+    def wait(self, model_name, timeout=None):
+        with self.lock:
+            loader = self.loaders.get(model_name)
+        if loader is not None:
+            loader.join(timeout)
+        return self.is_loaded(model_name)
+
+    def get(self, model_name):
+        # Never blocks on the model tokenizer, the fallback stands in until it's there
+        tokenizer = self.tokenizers.get(model_name)
+        if tokenizer is not None:
+            return tokenizer
+        if model_name:
+            self.request(model_name)
+        return self.fallback()
+
+    def _load(self, model_name):
+        tokenizer = None
+        try:
+            from transformers import AutoTokenizer
+            try:
+                tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=True)
+                logging.info(f"Loaded tokenizer for {model_name} from the local cache")
+            except Exception:
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                logging.info(f"Downloaded tokenizer for {model_name}")
+        except Exception as e:
+            logging.warning(f"Failed to load AutoTokenizer for {model_name}, using {self.fallback_encoding}: {e}")
+        with self.lock:
+            self.tokenizers[model_name] = tokenizer
+            self.loaders.pop(model_name, None)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tokenizer_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TokenizerRegistry()
+        return _registry
@@ -0,0 +1,92 @@
+#vault_database.py
+# Shared plumbing for the derived per-vault SQLite indexes (search trigrams, retrieval chunks).
+# Same threading model as SQLiteIndexStore: writes go through one connection behind a lock, every other
+# thread reads through its own connection, which WAL lets run alongside an open write transaction.
+# A database whose schema can't be created (FTS5 missing from the SQLite build) reports available = False
+# and its users fall back to working without it.
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+META_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+
+class VaultDatabase:
+    SCHEMA = ""
+
+    def __init__(self, vault_path, db_name):
+        self.db_file = Path(vault_path) / db_name
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        self.readers = []
+        self._depth = 0
+        self._owner = None
+        self.available = True
+        self.conn = self._connect()
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(META_SCHEMA + self.SCHEMA)
+        except sqlite3.OperationalError as e:
+            logging.warning(f"{db_name} disabled, SQLite {sqlite3.sqlite_version} can't create it: {e}")
+            self.available = False
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        # The thread inside a transaction must see its own uncommitted rows
+        if self._owner == threading.get_ident():
+            return self.conn
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+            self.readers.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            if self._depth == 0 and self.available:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._owner = threading.get_ident()
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0 and self._owner is not None:
+                    self._owner = None
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0 and self._owner is not None:
+                self._owner = None
+                self.conn.execute("COMMIT")
+
+    def is_complete(self):
+        # False until one full vault pass has gone through the index, i.e. it covers the whole vault
+        if not self.available:
+            return False
+        row = self._reader().execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+        return row is not None and row[0] == '1'
+
+    def mark_complete(self):
+        if self.available:
+            with self.transaction():
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+
+    def close(self):
+        with self.lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers.clear()
+            self.conn.close()
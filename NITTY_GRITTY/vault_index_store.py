@@ -0,0 +1,292 @@
+#vault_index_store.py
+# Storage backends for the per-vault file index. Both behave like a dict of rel_path -> file_info so the
+# Vault code (and anything still reading vault.index['files']) doesn't care which one is in use.
+#   json   - the original .vault_index.json, loaded and dumped wholesale
+#   sqlite - .vault_index.db in WAL mode, one row per file, point lookups and transactional upserts
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from pathlib import Path
+
+JSON_INDEX_NAME = '.vault_index.json'
+SQLITE_INDEX_NAME = '.vault_index.db'
+INDEX_STORE_FILES = {
+    JSON_INDEX_NAME, JSON_INDEX_NAME + '.tmp',
+    SQLITE_INDEX_NAME, SQLITE_INDEX_NAME + '-wal', SQLITE_INDEX_NAME + '-shm', SQLITE_INDEX_NAME + '-journal',
+}
+
+
+class VaultIndexStore(MutableMapping):
+    def fingerprint(self, rel_path):
+        info = self.get(rel_path)
+        return info.get('fingerprint') if info else None
+
+    def backlinks(self, target):
+        return [rel_path for rel_path, info in self.items() if target in info.get('links', [])]
+
+    def files_with_tag(self, tag):
+        return [rel_path for rel_path, info in self.items() if tag in info.get('tags', [])]
+
+    def paths_under(self, rel_dir):
+        prefix = rel_dir.rstrip('/\\') + os.sep
+        return [rel_path for rel_path in self if rel_path.startswith(prefix)]
+
+    def fingerprint_digest(self, file_type='document'):
+        # Identifies the exact set of (path, fingerprint) pairs, used to validate derived caches
+        digest = hashlib.sha256()
+        for rel_path, info in sorted(self.items()):
+            if info.get('type') == file_type:
+                digest.update(f"{rel_path}\0{info.get('fingerprint')}\n".encode('utf-8'))
+        return digest.digest()
+
+    def files_of_type(self, file_type):
+        return [rel_path for rel_path, info in self.items() if info.get('type') == file_type]
+
+    def replace_all(self, files):
+        with self.transaction():
+            self.clear()
+            for rel_path, info in files.items():
+                self[rel_path] = info
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+    def save(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonIndexStore(VaultIndexStore):
+    def __init__(self, vault_path):
+        self.index_file = Path(vault_path) / JSON_INDEX_NAME
+        self.files = {}
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r') as f:
+                    self.files = json.load(f).get('files', {})
+            except (OSError, ValueError) as e:
+                logging.error(f"Could not read {self.index_file}, starting with an empty index: {e}")
+
+    def __getitem__(self, rel_path):
+        return self.files[rel_path]
+
+    def __setitem__(self, rel_path, info):
+        self.files[rel_path] = info
+
+    def __delitem__(self, rel_path):
+        del self.files[rel_path]
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, rel_path):
+        return rel_path in self.files
+
+    def save(self):
+        # Write to a temp file and swap it in so a crash can't leave a truncated index
+        tmp_file = self.index_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({'files': self.files}, f)
+        os.replace(tmp_file, self.index_file)
+
+
+class SQLiteIndexStore(VaultIndexStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            type TEXT,
+            mtime_ns INTEGER,
+            size INTEGER,
+            inode INTEGER,
+            info TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS files_type ON files(type);
+        CREATE INDEX IF NOT EXISTS files_mtime ON files(mtime_ns);
+        CREATE TABLE IF NOT EXISTS file_tags (
+            path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+            tag TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS file_tags_tag ON file_tags(tag);
+        CREATE INDEX IF NOT EXISTS file_tags_path ON file_tags(path);
+        CREATE TABLE IF NOT EXISTS file_links (
+            path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+            target TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS file_links_target ON file_links(target);
+        CREATE INDEX IF NOT EXISTS file_links_path ON file_links(path);
+    """
+
+    def __init__(self, vault_path):
+        self.db_file = Path(vault_path) / SQLITE_INDEX_NAME
+        is_new = not self.db_file.exists()
+        # Writes go through one connection guarded by a lock (the indexing thread). Every other thread
+        # reads through its own connection, which WAL lets run alongside an open write transaction.
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        self.readers = []
+        self.conn = self._connect()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        self._depth = 0
+        self._owner = None
+        if is_new:
+            self._import_json(Path(vault_path) / JSON_INDEX_NAME)
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _reader(self):
+        # The thread inside a transaction must see its own uncommitted rows
+        if self._owner == threading.get_ident():
+            return self.conn
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+            self.readers.append(conn)
+        return conn
+
+    def _import_json(self, json_file):
+        if not json_file.exists():
+            return
+        try:
+            with open(json_file, 'r') as f:
+                files = json.load(f).get('files', {})
+        except (OSError, ValueError) as e:
+            logging.warning(f"Skipping import of {json_file}: {e}")
+            return
+        self.replace_all(files)
+        logging.info(f"Imported {len(files)} entries from {json_file} into {self.db_file}")
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._owner = threading.get_ident()
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._owner = None
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self.conn.execute("COMMIT")
+
+    def __getitem__(self, rel_path):
+        row = self._reader().execute("SELECT info FROM files WHERE path = ?", (rel_path,)).fetchone()
+        if row is None:
+            raise KeyError(rel_path)
+        return json.loads(row[0])
+
+    def __setitem__(self, rel_path, info):
+        mtime_ns, size, inode = info.get('fingerprint') or (None, info.get('size'), None)
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO files (path, type, mtime_ns, size, inode, info) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET type = excluded.type, mtime_ns = excluded.mtime_ns, "
+                "size = excluded.size, inode = excluded.inode, info = excluded.info",
+                (rel_path, info.get('type'), mtime_ns, size, inode, json.dumps(info)))
+            self.conn.execute("DELETE FROM file_tags WHERE path = ?", (rel_path,))
+            self.conn.execute("DELETE FROM file_links WHERE path = ?", (rel_path,))
+            self.conn.executemany("INSERT INTO file_tags (path, tag) VALUES (?, ?)",
+                                  [(rel_path, tag) for tag in info.get('tags', [])])
+            self.conn.executemany("INSERT INTO file_links (path, target) VALUES (?, ?)",
+                                  [(rel_path, target) for target in info.get('links', [])])
+
+    def __delitem__(self, rel_path):
+        with self.transaction():
+            cursor = self.conn.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+        if cursor.rowcount == 0:
+            raise KeyError(rel_path)
+
+    def __iter__(self):
+        paths = [row[0] for row in self._reader().execute("SELECT path FROM files")]
+        return iter(paths)
+
+    def __len__(self):
+        return self._reader().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def __contains__(self, rel_path):
+        return self._reader().execute("SELECT 1 FROM files WHERE path = ?", (rel_path,)).fetchone() is not None
+
+    def items(self):
+        rows = self._reader().execute("SELECT path, info FROM files").fetchall()
+        return [(path, json.loads(info)) for path, info in rows]
+
+    def values(self):
+        return [info for _, info in self.items()]
+
+    def clear(self):
+        with self.transaction():
+            self.conn.execute("DELETE FROM files")
+
+    def fingerprint(self, rel_path):
+        row = self._reader().execute(
+            "SELECT mtime_ns, size, inode FROM files WHERE path = ?", (rel_path,)).fetchone()
+        return list(row) if row is not None else None
+
+    def backlinks(self, target):
+        return [row[0] for row in self._reader().execute(
+            "SELECT DISTINCT path FROM file_links WHERE target = ?", (target,))]
+
+    def files_with_tag(self, tag):
+        return [row[0] for row in self._reader().execute(
+            "SELECT DISTINCT path FROM file_tags WHERE tag = ?", (tag,))]
+
+    def files_of_type(self, file_type):
+        return [row[0] for row in self._reader().execute("SELECT path FROM files WHERE type = ?", (file_type,))]
+
+    def fingerprint_digest(self, file_type='document'):
+        digest = hashlib.sha256()
+        rows = self._reader().execute(
+            "SELECT path, mtime_ns, size, inode FROM files WHERE type = ? ORDER BY path", (file_type,))
+        for rel_path, mtime_ns, size, inode in rows:
+            digest.update(f"{rel_path}\0{[mtime_ns, size, inode]}\n".encode('utf-8'))
+        return digest.digest()
+
+    def paths_under(self, rel_dir):
+        # Range scan on the primary key instead of LIKE, so '%' and '_' in names need no escaping
+        prefix = rel_dir.rstrip('/\\') + os.sep
+        return [row[0] for row in self._reader().execute(
+            "SELECT path FROM files WHERE path >= ? AND path < ?", (prefix, prefix + '\U0010ffff'))]
+
+    def close(self):
+        with self.lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers.clear()
+            self.conn.close()
+
+
+INDEX_BACKENDS = {
+    'json': JsonIndexStore,
+    'sqlite': SQLiteIndexStore,
+}
+DEFAULT_INDEX_BACKEND = 'sqlite'
+
+
+def open_index_store(vault_path, backend=DEFAULT_INDEX_BACKEND):
+    store_class = INDEX_BACKENDS.get(backend)
+    if store_class is None:
+        logging.warning(f"Unknown index backend '{backend}', using {DEFAULT_INDEX_BACKEND}")
+        store_class = INDEX_BACKENDS[DEFAULT_INDEX_BACKEND]
+    return store_class(vault_path)
@@ -0,0 +1,147 @@
+#vault_indexer.py
+# Builds vault index entries, either inline or sharded across a process pool for big batches.
+# Everything a worker process needs lives at module level here so it pickles cleanly. Workers are
+# spawned, which re-imports __main__ in each of them; main.py keeps the application behind its guard,
+# so all a worker imports is this module and the scanners it uses, never Qt.
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from NITTY_GRITTY.document_scanner import scan_buffer, scan_document
+from NITTY_GRITTY.search_index import extract_terms, read_text
+from NITTY_GRITTY.chunk_index import chunk_text, content_hash
+
+PARALLEL_THRESHOLD = 256  # below this many changed files the pool start-up costs more than it saves
+SHARD_SIZE = 128
+
+
+def default_worker_count():
+    return max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+def get_file_type(file_path):
+    extension = Path(file_path).suffix.lower()
+    if extension in ['.md', '.txt']:
+        return 'document'
+    elif extension in ['.png', '.jpg', '.jpeg', '.gif']:
+        return 'image'
+    elif extension in ['.py', '.js', '.html', '.css']:
+        return 'code'
+    else:
+        return 'other'
+
+
+def build_file_info(vault_path, file_path, stat=None, scan=None):
+    file_path = Path(file_path)
+    if stat is None:
+        stat = file_path.stat()
+    file_type = get_file_type(file_path)
+    if file_type == 'document' and scan is None:
+        scan = scan_document(file_path)
+    return {
+        'path': str(file_path.relative_to(vault_path)),
+        'name': file_path.name,
+        'type': file_type,
+        'size': stat.st_size,
+        'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
+        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        'fingerprint': [stat.st_mtime_ns, stat.st_size, stat.st_ino],
+        'tags': scan.unique_tags() if file_type == 'document' else [],
+        'links': scan.unique_links() if file_type == 'document' else [],
+        'references': scan.unique_references() if file_type == 'document' else [],
+    }
+
+
+def build_text_index(rel_path, file_type, data):
+    # What the derived indexes need from a text file: search terms always, retrieval chunks for
+    # documents and code. None for binaries and oversized files.
+    if data is None:
+        return None
+    text_index = {'terms': extract_terms(data, rel_path)}
+    if file_type in ('document', 'code'):
+        text_index['content_hash'] = content_hash(data)
+        text_index['chunks'] = chunk_text(rel_path, data.decode('utf-8', errors='replace'))
+    return text_index
+
+
+def index_shard(vault_path, rel_paths):
+    # Runs in a worker process, files that vanished since the walk are simply left out.
+    # Text files are read once and feed the document scan, the search terms and the chunks.
+    vault_path = Path(vault_path)
+    results = []
+    for rel_path in rel_paths:
+        file_path = vault_path / rel_path
+        try:
+            file_type = get_file_type(file_path)
+            data = read_text(file_path)
+            scan = scan_buffer(data) if data is not None and file_type == 'document' else None
+            results.append((rel_path, build_file_info(vault_path, file_path, scan=scan),
+                            build_text_index(rel_path, file_type, data)))
+        except OSError as e:
+            logging.warning(f"Skipping {rel_path} while indexing: {e}")
+    return results
+
+
+class ParallelIndexer:
+    def __init__(self, workers=None, parallel_threshold=PARALLEL_THRESHOLD, shard_size=SHARD_SIZE):
+        self.workers = workers or default_worker_count()
+        self.parallel_threshold = parallel_threshold
+        self.shard_size = shard_size
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def reset(self):
+        # When a job is queued, not when its pass starts: a cancel in between must stick
+        self.cancelled.clear()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
+
+    def index_files(self, vault_path, rel_paths, progress=None):
+        """Yield lists of (rel_path, file_info, text_index) as shards complete.
+
+        ``progress(done, total)`` is called after every shard. Stops early once
+        ``cancel()`` is called; whatever was yielded before that is still valid.
+        A cancel stays in effect until ``reset()``.
+        """
+        total = len(rel_paths)
+        if total == 0:
+            return
+        if self.workers <= 1 or total < self.parallel_threshold:
+            yield from self._index_inline(vault_path, rel_paths, total, progress)
+            return
+
+        shards = [rel_paths[i:i + self.shard_size] for i in range(0, total, self.shard_size)]
+        done = 0
+        # spawn, not fork: forking a running Qt application is not safe
+        executor = ProcessPoolExecutor(max_workers=min(self.workers, len(shards)),
+                                       mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {executor.submit(index_shard, str(vault_path), shard): len(shard) for shard in shards}
+            for future in as_completed(futures):
+                if self.cancelled.is_set():
+                    logging.info(f"Indexing of {vault_path} cancelled after {done}/{total} files")
+                    return
+                results = future.result()
+                done += futures[future]
+                yield results
+                if progress:
+                    progress(done, total)
+        finally:
+            # Only block on the pool when it drained normally, a cancel just drops the queued shards
+            executor.shutdown(wait=not self.cancelled.is_set(), cancel_futures=True)
+
+    def _index_inline(self, vault_path, rel_paths, total, progress):
+        for start in range(0, total, self.shard_size):
+            if self.cancelled.is_set():
+                logging.info(f"Indexing of {vault_path} cancelled after {start}/{total} files")
+                return
+            yield index_shard(vault_path, rel_paths[start:start + self.shard_size])
+            if progress:
+                progress(min(start + self.shard_size, total), total)
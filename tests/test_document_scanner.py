@@ -0,0 +1,45 @@
+#test_document_scanner.py
+import os
+import tempfile
+
+from NITTY_GRITTY import document_scanner
+from NITTY_GRITTY.document_scanner import scan_document, scan_text
+
+
+def test_ascii_tokens():
+    scan = scan_text("intro #alpha and @bob\nsee [[Note#heading]] #beta_2\n")
+    assert scan.tags == [('alpha', 1), ('heading', 2), ('beta_2', 2)]
+    assert scan.references == [('bob', 1)]
+    assert scan.links == [('Note#heading', 2)]
+
+
+def test_unicode_punctuation_ends_words():
+    scan = scan_text("“#tag” and #foo—bar, ask @bob’s friend\n‘@ann’ #end…\n")
+    assert scan.unique_tags() == ['tag', 'foo', 'end']
+    assert scan.unique_references() == ['bob', 'ann']
+
+
+def test_non_latin_words():
+    scan = scan_text("#日本語 #привет_мир @José «#café»\n")
+    assert scan.unique_tags() == ['日本語', 'привет_мир', 'café']
+    assert scan.unique_references() == ['José']
+
+
+def test_punctuation_only_token_is_skipped():
+    scan = scan_text("#” @— [[x#—]]\n")
+    assert scan.tags == []
+    assert scan.references == []
+    assert scan.links == [('x#—', 1)]
+
+
+def test_mmap_path_matches_read_path(monkeypatch):
+    text = "line\n" * 10 + "“#tag” #ünï—code @bob’s\n"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'note.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        read = scan_document(path)
+        monkeypatch.setattr(document_scanner, 'MMAP_THRESHOLD', 1)
+        mapped = scan_document(path)
+    assert read.tags == mapped.tags == [('tag', 11), ('ünï', 11)]
+    assert read.references == mapped.references == [('bob', 11)]
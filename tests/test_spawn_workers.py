@@ -0,0 +1,71 @@
+#test_spawn_workers.py
+# Indexer and search pools use spawn, which re-imports __main__ in every worker. Started from main.py,
+# the workers must not pull in the application (Qt, the managers) or run its logging setup.
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = '''
+import sys
+
+
+def app_modules():
+    return sorted(name for name in sys.modules
+                  if name.split('.')[0] in ('PyQt6', 'HMC', 'GUX', 'computinator', 'AuraText'))
+'''
+
+
+def run_from_main(tmp_path, body):
+    (tmp_path / 'probe.py').write_text(PROBE)
+    script = textwrap.dedent('''
+        import sys
+        import __main__
+        sys.path[:0] = [{root!r}, {probe_dir!r}]
+        __main__.__file__ = {main!r}  # what spawn sees when the app was started with python main.py
+        from probe import app_modules
+    ''').format(root=str(ROOT), probe_dir=str(tmp_path), main=str(ROOT / 'main.py')) + textwrap.dedent(body)
+    return subprocess.run([sys.executable, '-c', script], cwd=tmp_path, capture_output=True, text=True, timeout=120)
+
+
+def test_indexer_workers_stay_import_light(tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    for i in range(8):
+        (vault / f'note{i}.md').write_text(f"# Note {i}\n#tag{i} [[note{i + 1}]]\n")
+    result = run_from_main(tmp_path, f'''
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from NITTY_GRITTY.vault_indexer import ParallelIndexer
+
+        indexer = ParallelIndexer(workers=2, parallel_threshold=1, shard_size=2)
+        entries = [entry for batch in indexer.index_files({str(vault)!r}, sorted(__import__('os').listdir({str(vault)!r})))
+                   for entry in batch]
+        assert len(entries) == 8, entries
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            print(executor.submit(app_modules).result())
+    ''')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+    assert not (tmp_path / 'logs').exists()
+
+
+def test_search_workers_stay_import_light(tmp_path):
+    for i in range(8):
+        (tmp_path / f'file{i}.py').write_text(f"def handler_{i}():\n    return {i}\n")
+    result = run_from_main(tmp_path, f'''
+        from NITTY_GRITTY.file_search import FileSearchEngine
+
+        engine = FileSearchEngine(workers=2, parallel_threshold=1, shard_size=2)
+        try:
+            files = [{str(tmp_path)!r} + f'/file{{i}}.py' for i in range(8)]
+            assert [batch for batch in engine.search('handler_3', files)]
+            print(engine._executor().submit(app_modules).result())
+        finally:
+            engine.shutdown()
+    ''')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+    assert not (tmp_path / 'logs').exists()